@@ -0,0 +1,185 @@
+"""
+code_generation Job 실행.
+
+codegen_worker 관리 명령의 작업자 스레드에서 호출되며, 모델 호출은 flash_server.llm_gateway를 거칩니다.
+응답은 스트리밍으로 받아 CODEGEN_STREAM_FLUSH_SECONDS마다 모인 조각을 output JobEvent로 추가하므로,
+클라이언트는 완료 전에도 이벤트 스트림/증분 조회로 생성 중인 코드를 볼 수 있습니다.
+같은 요청의 이전 결과는 codegen_cache에서 찾아 모델 호출 없이 바로 완료합니다.
+"""
+import os
+import time
+
+from django.utils import timezone
+
+from flash_server import llm_gateway
+from . import codegen_cache
+from .models import JobEvent
+from .job_events import append_job_events
+from .retrieval import build_project_context
+
+# codegen_worker 작업자 풀 크기 (제공자별 속도/동시 요청 제한은 llm_gateway 설정을 따릅니다)
+CODEGEN_WORKERS = int(os.getenv('CODEGEN_WORKERS', '4'))
+# 스트리밍 출력 조각을 JobEvent로 기록하는 최소 간격(초)
+CODEGEN_STREAM_FLUSH_SECONDS = float(os.getenv('CODEGEN_STREAM_FLUSH_SECONDS', '0.5'))
+# 시스템 프롬프트 템플릿을 바꾸면 올려서 이전 템플릿으로 만든 캐시 결과를 쓰지 않게 합니다.
+CODEGEN_SYSTEM_PROMPT_VERSION = 1
+
+
+class _OutputStream:
+    """
+    모델 응답 조각을 모아 일정 간격으로 output JobEvent({'text', 'offset'})로 추가합니다.
+    job 인스턴스의 event_seq를 함께 갱신해, 이후 job.save()가 예약된 seq를 되돌리지 않도록 합니다.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.parts = []
+        self.offset = 0
+        self.flushed_at = time.monotonic()
+        self.started_at = time.monotonic()
+        self.first_chunk_at = None
+
+    def __call__(self, text):
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.monotonic()
+            self.job.progress_log.append({
+                'percent_complete': 50,
+                'log_message': f'코드 생성 중... (첫 응답 {self.first_chunk_at - self.started_at:.1f}초)',
+            })
+            self.job.save(update_fields=['progress_log', 'updated_at'])
+        self.parts.append(text)
+        if time.monotonic() - self.flushed_at >= CODEGEN_STREAM_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        if not self.parts:
+            return
+        text = ''.join(self.parts)
+        self.parts = []
+        self.job.event_seq = append_job_events(self.job.id, JobEvent.KIND_OUTPUT, [{'text': text, 'offset': self.offset}])
+        self.offset += len(text)
+
+
+def generate_code(job):
+    """코드 생성 (Anthropic 또는 OpenAI) - code_generation job만 처리"""
+    try:
+        # code_generation job만 처리
+        if job.job_type != 'code_generation':
+            job.status = 'failed'
+            job.error_message = f'This method only handles code_generation jobs, not {job.job_type}'
+            job.save()
+            return
+
+        payload = job.payload or {}
+        prompt = payload.get('prompt', '')
+        language = payload.get('language', 'python')
+
+        if not prompt:
+            job.status = 'failed'
+            job.error_message = 'Prompt is required'
+            job.save()
+            return
+
+        # 진행 상태 로그 시작
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.progress_log = [
+            {'percent_complete': 10, 'log_message': f'{language.upper()} 코드 생성 준비 중...'},
+        ]
+        job.save()
+
+        # 공통 시스템 프롬프트
+        system_prompt = (
+            f"You are an expert {language} programmer. Generate production-ready code based on the user's request.\n\n"
+            f"Requirements:\n"
+            f"- Write clean, well-commented code\n"
+            f"- Follow {language} best practices\n"
+            f"- Include error handling where appropriate\n"
+            f"- Return ONLY the code, no explanation or markdown formatting"
+        )
+
+        # 프로젝트에 연결된 Job이면 관련 파일 조각을 토큰 예산 안에서 시스템 프롬프트에 추가
+        repo_context = ''
+        if job.project_id and payload.get('use_repo_context', True):
+            try:
+                repo_context = build_project_context(job.project, prompt, payload.get('context_tokens'))
+            except Exception as ce:
+                job.progress_log.append({'percent_complete': 20, 'log_message': f'프로젝트 컨텍스트 검색 실패: {ce}'})
+            if repo_context:
+                system_prompt += "\n\n" + repo_context
+                job.progress_log.append({'percent_complete': 20, 'log_message': '프로젝트 컨텍스트 검색 완료'})
+
+        # 진행 상황 업데이트
+        job.progress_log.append({'percent_complete': 30, 'log_message': '모델 API에 요청 중...'})
+        job.save()
+
+        provider = os.getenv('CODEGEN_PROVIDER', 'anthropic').lower()
+        openai_model = os.getenv('OPENAI_CODEGEN_MODEL', 'gpt-4o-mini')
+        if provider == 'langchain':
+            job.progress_log.append({'percent_complete': 40, 'log_message': 'LangChain 서버 요청 중...'})
+            job.save()
+
+        # 같은 요청의 이전 결과가 있으면 모델을 호출하지 않고 바로 완료합니다 (payload의 no_cache로 조회 생략).
+        model = openai_model if provider == 'openai' else llm_gateway.DEFAULT_MODELS.get(provider)
+        cache_key = None
+        if codegen_cache.CODEGEN_CACHE:
+            cache_key = codegen_cache.cache_key(
+                provider, model, prompt, language, CODEGEN_SYSTEM_PROMPT_VERSION, repo_context,
+            )
+            cached = None if payload.get('no_cache') else codegen_cache.lookup(cache_key)
+            if cached is not None:
+                output = _OutputStream(job)
+                output.parts.append(cached)
+                output.flush()
+                job.progress_log.append({
+                    'percent_complete': 100,
+                    'log_message': '✓ 캐시된 결과 사용 (cache hit)',
+                    'cache_hit': True,
+                })
+                job.status = 'completed'
+                job.summary = cached
+                job.completed_at = timezone.now()
+                job.save()
+                return
+
+        # Anthropic 호출이 실패하면 OpenAI로 폴백합니다 (OPENAI_API_KEY가 있을 때, 첫 응답 조각 전까지만).
+        output = _OutputStream(job)
+        result = llm_gateway.complete(
+            prompt,
+            system_prompt,
+            provider=provider,
+            model=openai_model if provider == 'openai' else None,
+            max_tokens=2000,
+            temperature=0.2,
+            fallbacks=[('openai', openai_model)] if provider == 'anthropic' else [],
+            extra_body={'context': repo_context} if repo_context else None,
+            on_chunk=output,
+        )
+        output.flush()
+        if result['fallback']:
+            job.progress_log.append({'percent_complete': 50, 'log_message': f"{provider} 응답 실패/지연: {result['provider']} 응답을 사용합니다."})
+        generated_code = result['text'].strip()
+        # 요청한 제공자가 직접 만든 결과만 저장합니다 (폴백/LLM_MOCK 응답은 같은 키로 재사용하지 않음).
+        if cache_key and generated_code and not result['fallback'] and result['provider'] == provider:
+            codegen_cache.store(cache_key, provider, model, language, generated_code)
+
+        # 진행 상황 업데이트
+        job.progress_log.append({'percent_complete': 75, 'log_message': '코드 생성 완료, 최종 처리 중...'})
+        job.save()
+
+        # 최종 상태 업데이트
+        job.progress_log.append({'percent_complete': 100, 'log_message': '✓ 코드 생성 완료!'})
+        job.status = 'completed'
+        job.summary = generated_code
+        job.completed_at = timezone.now()
+        job.save()
+
+    except Exception as e:
+        error_msg = str(e)
+        job.status = 'failed'
+        job.error_message = error_msg
+        job.progress_log = [
+            {'percent_complete': 0, 'log_message': f'⚠ 오류 발생: {error_msg}'}
+        ]
+        job.save()
@@ -0,0 +1,99 @@
+"""
+동일한 code_generation 요청의 결과를 재사용하는 DB 캐시.
+
+키는 (제공자, 모델, 정규화한 프롬프트, 언어, 시스템 프롬프트 버전, 프로젝트 컨텍스트)의 SHA-256이라,
+같은 요청은 같은 키가 되고 프롬프트 템플릿이나 검색된 컨텍스트가 바뀌면 다른 키가 됩니다.
+항목은 CODEGEN_CACHE_TTL_SECONDS가 지나면 만료되고, 전체 크기가 CODEGEN_CACHE_MAX_BYTES를 넘으면
+가장 오래 사용되지 않은 항목부터 삭제합니다. 정리는 프로세스마다 CODEGEN_CACHE_PRUNE_SECONDS에 한 번, 저장할 때 실행합니다.
+"""
+import os
+import re
+import json
+import hashlib
+import time
+import logging
+import threading
+import unicodedata
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import CodegenCacheEntry
+
+logger = logging.getLogger(__name__)
+
+CODEGEN_CACHE = os.getenv('CODEGEN_CACHE', 'True').lower() == 'true'
+CODEGEN_CACHE_TTL_SECONDS = int(os.getenv('CODEGEN_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+CODEGEN_CACHE_MAX_BYTES = int(os.getenv('CODEGEN_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# 저장할 때 만료/크기 정리를 실행하는 최소 간격(초). 정리는 테이블 전체를 훑으므로 매 저장마다 하지 않습니다.
+CODEGEN_CACHE_PRUNE_SECONDS = float(os.getenv('CODEGEN_CACHE_PRUNE_SECONDS', '300'))
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def normalize_prompt(prompt):
+    """유니코드 정규화(NFKC) 후 연속 공백을 하나로 줄이고 앞뒤 공백을 제거합니다."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', prompt or '')).strip()
+
+
+def cache_key(provider, model, prompt, language, prompt_version, context=''):
+    material = json.dumps(
+        [provider, model or '', normalize_prompt(prompt), language, prompt_version, context or ''],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def lookup(key):
+    """만료되지 않은 캐시 결과를 반환하고 사용 기록을 갱신합니다. 없으면 None."""
+    now = timezone.now()
+    entry = CodegenCacheEntry.objects.filter(key=key, expires_at__gt=now).values_list('result', flat=True).first()
+    if entry is None:
+        return None
+    CodegenCacheEntry.objects.filter(key=key).update(hits=F('hits') + 1, last_used_at=now)
+    return entry
+
+
+def store(key, provider, model, language, result):
+    """결과를 저장(같은 키면 덮어쓰기)하고, 마지막 정리 후 CODEGEN_CACHE_PRUNE_SECONDS가 지났으면 만료/크기 한도에 따라 정리합니다."""
+    now = timezone.now()
+    CodegenCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={
+            'provider': provider,
+            'model': model or '',
+            'language': language,
+            'result': result,
+            'size': len(result.encode('utf-8')),
+            'last_used_at': now,
+            'expires_at': now + timedelta(seconds=CODEGEN_CACHE_TTL_SECONDS),
+        },
+    )
+    global _last_prune
+    with _prune_lock:
+        due = time.monotonic() - _last_prune >= CODEGEN_CACHE_PRUNE_SECONDS
+        if due:
+            _last_prune = time.monotonic()
+    if due:
+        prune(now)
+
+
+def prune(now=None, max_bytes=None):
+    """만료된 항목을 지우고, 전체 크기가 max_bytes 이하가 될 때까지 가장 오래 사용되지 않은 항목을 지웁니다."""
+    now = now or timezone.now()
+    max_bytes = CODEGEN_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    removed = CodegenCacheEntry.objects.filter(expires_at__lte=now).delete()[0]
+    total = CodegenCacheEntry.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total > max_bytes:
+        evict = []
+        for key, size in CodegenCacheEntry.objects.order_by('last_used_at').values_list('key', 'size').iterator():
+            if total <= max_bytes:
+                break
+            evict.append(key)
+            total -= size
+        removed += CodegenCacheEntry.objects.filter(key__in=evict).delete()[0]
+    if removed:
+        logger.info(f'코드 생성 캐시 정리: {removed}개 삭제')
+    return removed
@@ -0,0 +1,178 @@
+"""
+에이전트의 Job 요청에 어떤 pending Job을 줄지 고르고 원자적으로 할당하는 디스패처.
+
+- capability: payload.tool_name이 지정된 Job은 그 도구를 capabilities에 가진 에이전트에게만 줍니다.
+- locality(sticky): 같은 프로젝트를 마지막으로 처리한 (살아 있는) 에이전트에게 우선 줍니다.
+  그 에이전트가 STICKY_WAIT_SECONDS 안에 가져가지 않으면 다른 에이전트도 가져갈 수 있습니다.
+- priority: 우선순위 클래스(interactive > normal > batch) 순서로 할당합니다.
+- fair share: 같은 클래스 안에서는 흐름(요청 사용자 + 프로젝트)별 가상 시간이 가장 작은 흐름의 Job을 먼저 줍니다
+  (start-time fair queuing). 한 사용자가 Job을 대량으로 만들어도 다른 사용자의 Job이 번갈아 할당됩니다.
+"""
+import os
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import (
+    Avg, Case, Count, DurationField, ExpressionWrapper, F, FloatField, IntegerField, Max, Min, OuterRef, Q, Subquery,
+    Value, When,
+)
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Job, QueueFlow
+
+# 선호 에이전트가 가져가기를 기다리는 시간 (이후에는 아무 에이전트나 할당 가능)
+STICKY_WAIT_SECONDS = int(os.getenv('JOB_STICKY_WAIT_SECONDS', '30'))
+# 이 시간 동안 heartbeat가 없는 에이전트는 선호 대상에서 제외
+AGENT_STALE_SECONDS = int(os.getenv('AGENT_STALE_SECONDS', '120'))
+
+
+def routable_jobs(agent, job_types, now=None, sticky=True):
+    """
+    agent가 가져갈 수 있는 pending Job을 우선순위(선호 프로젝트 먼저, 오래된 순) 순서의 QuerySet으로 반환합니다.
+    sticky=False이면 프로젝트 선호 에이전트를 고려하지 않습니다. (저장소에 접근하지 않는 서버 측 작업자용)
+    """
+    now = now or timezone.now()
+    pending = Job.objects.filter(status='pending', job_type__in=job_types)
+
+    capabilities = agent.capabilities or []
+    if capabilities:
+        # 도구가 지정되지 않은 Job은 모든 에이전트가 처리할 수 있습니다.
+        pending = pending.filter(
+            Q(payload__tool_name__isnull=True)
+            | Q(payload__tool_name=None)
+            | Q(payload__tool_name='')
+            | Q(payload__tool_name__in=capabilities)
+        )
+    if not sticky:
+        return pending.order_by('created_at')
+
+    # 같은 종류의 Job을 처리한 에이전트만 선호 대상으로 봅니다.
+    # (다른 종류만 처리하는 codegen_worker 같은 작업자가 프로젝트 Job을 붙잡아 두지 않도록)
+    last_agent = Job.objects.filter(
+        project_id=OuterRef('project_id'),
+        job_type__in=job_types,
+        agent__isnull=False,
+        agent__last_heartbeat__gte=now - timedelta(seconds=AGENT_STALE_SECONDS),
+    ).exclude(assigned_at__isnull=True).order_by('-assigned_at').values('agent_id')[:1]
+
+    return pending.annotate(
+        preferred_agent=Subquery(last_agent),
+    ).filter(
+        Q(preferred_agent__isnull=True)
+        | Q(preferred_agent=agent.agent_id)
+        | Q(created_at__lte=now - timedelta(seconds=STICKY_WAIT_SECONDS))
+    ).annotate(
+        sticky_rank=Case(When(preferred_agent=agent.agent_id, then=Value(0)), default=Value(1), output_field=IntegerField()),
+    ).order_by('sticky_rank', 'created_at')
+
+
+def _next_flow(candidates):
+    """
+    후보 Job이 있는 흐름 중 가상 시작 시간(max(흐름 가상 시간, 전역 시계))이 가장 작은 흐름을 고릅니다.
+    동률이면 가장 오래 기다린 Job이 있는 흐름을 고릅니다. (흐름 단위 집계이므로 Job 수와 무관하게 작습니다.)
+    흐름/시계 행은 할당 트랜잭션이 끝날 때까지 잠가, 동시에 요청한 에이전트가 같은 가상 시간을 읽지 않게 합니다.
+    """
+    flows = list(candidates.order_by().values('flow_key').annotate(oldest=Min('created_at')))
+    if not flows:
+        return None, None, None
+    states = {
+        flow.key: flow
+        for flow in QueueFlow.objects.select_for_update().filter(
+            key__in=[f['flow_key'] for f in flows] + [QueueFlow.CLOCK_KEY],
+        )
+    }
+    clock = states[QueueFlow.CLOCK_KEY].virtual_time if QueueFlow.CLOCK_KEY in states else 0.0
+
+    def start_tag(flow_key):
+        state = states.get(flow_key)
+        return max(state.virtual_time if state else 0.0, clock)
+
+    best = min(flows, key=lambda f: (start_tag(f['flow_key']), f['oldest']))
+    state = states.get(best['flow_key'])
+    return best['flow_key'], start_tag(best['flow_key']), (state.weight if state else 1.0)
+
+
+def _charge_flow(flow_key, start, weight):
+    """
+    흐름이 Job 하나를 할당받았음을 기록합니다: 흐름 가상 시간 = max(현재 값, 시작 시간) + 1/weight, 전역 시계 = max(현재 값, 시작 시간).
+    행 잠금을 지원하지 않는 DB에서 두 요청이 같은 시작 시간을 읽었더라도 F() 식으로 갱신하므로 할당이 누락되지 않습니다.
+    """
+    start = Value(start, output_field=FloatField())
+    for key in (flow_key, QueueFlow.CLOCK_KEY):
+        QueueFlow.objects.get_or_create(key=key)
+    QueueFlow.objects.filter(key=flow_key).update(
+        virtual_time=Greatest(F('virtual_time'), start) + Value(1.0 / max(weight, 0.01), output_field=FloatField()),
+    )
+    QueueFlow.objects.filter(key=QueueFlow.CLOCK_KEY).update(virtual_time=Greatest(F('virtual_time'), start))
+
+
+def _claim(agent, queryset, max_jobs, now):
+    """
+    queryset의 앞쪽 Job을 최대 max_jobs개 agent에 원자적으로 할당합니다.
+    - SKIP LOCKED를 지원하는 DB(PostgreSQL 등): 다른 에이전트가 잠근 행은 건너뛰고 잠근 뒤 한 번에 갱신합니다.
+    - 그 외(SQLite): status='pending' 조건을 건 단일 UPDATE(compare-and-set)로 할당해, 동시에 요청해도 중복 할당되지 않습니다.
+    """
+    if connection.features.has_select_for_update_skip_locked:
+        claim_ids = list(queryset.select_for_update(skip_locked=True).values_list('id', flat=True)[:max_jobs])
+        if not claim_ids:
+            return []
+        Job.objects.filter(id__in=claim_ids).update(agent=agent, status='assigned', assigned_at=now, updated_at=now)
+        return list(Job.objects.filter(id__in=claim_ids).order_by('created_at'))
+
+    claim_ids = list(queryset.values_list('id', flat=True)[:max_jobs])
+    claimed = Job.objects.filter(id__in=claim_ids, status='pending').update(
+        agent=agent, status='assigned', assigned_at=now, updated_at=now,
+    )
+    if not claimed:
+        return []
+    # 다른 에이전트가 먼저 가져간 Job은 제외하고 이번 UPDATE로 할당된 Job만 다시 읽습니다.
+    return list(Job.objects.filter(id__in=claim_ids, agent=agent, assigned_at=now).order_by('created_at'))
+
+
+def claim_pending_jobs(agent, job_types, max_jobs, sticky=True):
+    """agent에게 줄 pending Job을 우선순위 클래스와 흐름별 공정 분배 순서로 최대 max_jobs개 할당하고 반환합니다."""
+    now = timezone.now()
+    routable = routable_jobs(agent, job_types, now, sticky)
+    claimed = []
+    with transaction.atomic():
+        for priority, _label in Job.PRIORITY_CHOICES:
+            candidates = routable.filter(priority=priority)
+            while len(claimed) < max_jobs:
+                flow_key, start, weight = _next_flow(candidates)
+                if flow_key is None:
+                    break
+                jobs = _claim(agent, candidates.filter(flow_key=flow_key), 1, now)
+                if not jobs:
+                    # 이 흐름의 Job을 모두 다른 에이전트가 잡고 있으면 이번 요청에서는 건너뜁니다.
+                    candidates = candidates.exclude(flow_key=flow_key)
+                    continue
+                _charge_flow(flow_key, start, weight)
+                claimed.extend(jobs)
+            if len(claimed) >= max_jobs:
+                break
+    return claimed
+
+
+def queue_stats(now=None):
+    """우선순위 클래스별 대기 Job 수, 흐름 수, 가장 오래 기다린 시간과 최근 1시간 동안의 할당 대기 시간을 반환합니다."""
+    now = now or timezone.now()
+    assign_wait = ExpressionWrapper(F('assigned_at') - F('created_at'), output_field=DurationField())
+    stats = []
+    for priority, label in Job.PRIORITY_CHOICES:
+        pending = Job.objects.filter(status='pending', priority=priority).aggregate(
+            depth=Count('id'), flows=Count('flow_key', distinct=True), oldest=Min('created_at'),
+        )
+        recent = Job.objects.filter(priority=priority, assigned_at__gte=now - timedelta(hours=1)).aggregate(
+            assigned=Count('id'), avg_wait=Avg(assign_wait), max_wait=Max(assign_wait),
+        )
+        stats.append({
+            'priority': label.lower(),
+            'pending': pending['depth'],
+            'flows': pending['flows'],
+            'oldest_wait_seconds': round((now - pending['oldest']).total_seconds(), 3) if pending['oldest'] else 0.0,
+            'assigned_last_hour': recent['assigned'],
+            'avg_assign_wait_seconds': round(recent['avg_wait'].total_seconds(), 3) if recent['avg_wait'] else None,
+            'max_assign_wait_seconds': round(recent['max_wait'].total_seconds(), 3) if recent['max_wait'] else None,
+        })
+    return stats
@@ -0,0 +1,78 @@
+"""
+JobEvent 추가 전용 로그.
+
+진행 로그와 도구 호출은 Job의 JSON 목록을 다시 쓰지 않고 JobEvent 행으로 추가합니다.
+Job.event_seq를 한 번의 UPDATE로 늘려 seq 구간을 예약하므로, 동시에 들어온 콜백도 잃지 않고 순서대로 저장됩니다.
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobEvent
+
+
+def append_job_events(job_id, kind, payloads):
+    """
+    payload 목록을 JobEvent로 한 번에 추가하고 마지막 seq를 반환합니다.
+    Job이 없으면 Job.DoesNotExist를 발생시킵니다.
+    """
+    if not payloads:
+        return None
+    now = timezone.now()
+    with transaction.atomic():
+        reserved = Job.objects.filter(id=job_id).update(event_seq=F('event_seq') + len(payloads), updated_at=now)
+        if not reserved:
+            raise Job.DoesNotExist(f'Job {job_id} not found')
+        last_seq = Job.objects.filter(id=job_id).values_list('event_seq', flat=True).get()
+        first_seq = last_seq - len(payloads) + 1
+        JobEvent.objects.bulk_create([
+            JobEvent(job_id=job_id, seq=first_seq + offset, kind=kind, timestamp=now, payload=payload)
+            for offset, payload in enumerate(payloads)
+        ])
+    return last_seq
+
+
+def event_entry(event):
+    """JobEvent를 기존 progress_log/tool_invocations 항목 형식({'timestamp': ..., ...payload})으로 바꿉니다."""
+    return {'timestamp': event.timestamp.isoformat(), **(event.payload or {})}
+
+
+def legacy_job_logs(job):
+    """
+    기존 JSON 필드와 JobEvent를 합친 (progress_log, tool_invocations)를 반환합니다.
+    서버가 직접 쓰는 JSON 항목(code_generation 등)이 먼저 오고, 에이전트가 보낸 이벤트가 seq 순서로 뒤에 붙습니다.
+    """
+    progress_log = list(job.progress_log or [])
+    tool_invocations = list(job.tool_invocations or [])
+    if job.event_seq:
+        for event in job.events.order_by('seq'):
+            if event.kind == JobEvent.KIND_PROGRESS:
+                progress_log.append(event_entry(event))
+            elif event.kind == JobEvent.KIND_TOOL:
+                tool_invocations.append(event_entry(event))
+    return progress_log, tool_invocations
+
+
+def job_etag(job, since=None):
+    """
+    Job 응답 버전을 나타내는 약한 ETag. 상태, 마지막 수정 시각, 이벤트 seq, 서버 로그 길이와
+    응답 형식(전체 / since 이후 증분)이 같으면 응답도 같습니다.
+    증분 응답의 ETag로 전체 조회나 다른 since 조회에 304를 받아, 일부만 담긴 본문을 전체로 쓰지 않도록 since를 포함합니다.
+    """
+    variant = 'full' if since is None else f'since={since}'
+    version = (
+        f"{job.id}:{job.status}:{job.updated_at.isoformat() if job.updated_at else ''}:{job.event_seq}:"
+        f"{len(job.progress_log or [])}:{variant}"
+    )
+    return 'W/"' + hashlib.md5(version.encode('utf-8')).hexdigest() + '"'
+
+
+def etag_matches(request, etag):
+    """If-None-Match 헤더에 etag(또는 *)가 있으면 True."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in candidates
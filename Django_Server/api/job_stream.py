@@ -0,0 +1,154 @@
+"""
+Job 진행 상황을 Server-Sent Events로 보내는 스트림.
+
+클라이언트는 GET /projects/<id>/jobs/<job_id>/events/stream 에 연결해 진행 로그, 도구 호출, 상태 변경,
+완료 결과를 받습니다. 각 메시지의 id(`<event_seq>-<서버 로그 수>`)를 Last-Event-ID로 보내면 끊긴 지점부터 이어 받습니다.
+Job 행의 (status, updated_at, event_seq)만 짧은 주기로 확인하고, 바뀐 경우에만 새 이벤트를 읽습니다.
+ASGI에서는 비동기 제너레이터로, WSGI(runserver 등)에서는 동기 제너레이터로 스트리밍합니다.
+"""
+import os
+import json
+import time
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import Job, JobEvent
+from .job_events import event_entry
+
+# 변경 확인 주기, 하트비트 주기, 연결당 최대 유지 시간(초)
+SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', '0.5'))
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_MAX_SECONDS = float(os.getenv('SSE_MAX_SECONDS', '3600'))
+SSE_RETRY_MS = 2000
+EVENT_BATCH_SIZE = 200
+TERMINAL_STATUSES = ('completed', 'success', 'failed')
+
+
+def format_sse(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def parse_last_event_id(value):
+    """'<event_seq>-<서버 로그 수>' 형식의 이벤트 ID를 (seq, 서버 로그 수)로 바꿉니다. 잘못된 값은 처음부터로 봅니다."""
+    seq, _, server_logs = (value or '').partition('-')
+    try:
+        return max(int(seq or 0), 0), max(int(server_logs or 0), 0)
+    except ValueError:
+        return 0, 0
+
+
+class JobStreamCursor:
+    """스트림 하나의 진행 위치. poll()은 마지막 호출 이후 새로 보낼 SSE 메시지와 종료 여부를 반환합니다."""
+
+    def __init__(self, job_id, seq=0, server_logs=0):
+        self.job_id = job_id
+        self.seq = seq
+        self.server_logs = server_logs
+        self.status = None
+        self.version = None
+
+    def event_id(self):
+        return f'{self.seq}-{self.server_logs}'
+
+    def poll(self):
+        row = Job.objects.filter(id=self.job_id).values('status', 'updated_at', 'event_seq').first()
+        if row is None:
+            return [format_sse('error', {'detail': 'Job not found.'})], True
+        version = (row['status'], row['updated_at'], row['event_seq'])
+        if version == self.version:
+            return [], False
+        self.version = version
+
+        messages = []
+        if row['event_seq'] > self.seq:
+            events = list(JobEvent.objects.filter(job_id=self.job_id, seq__gt=self.seq).order_by('seq')[:EVENT_BATCH_SIZE])
+            for event in events:
+                self.seq = event.seq
+                messages.append(format_sse(event.kind, {'seq': event.seq, **event_entry(event)}, self.event_id()))
+            if len(events) == EVENT_BATCH_SIZE:
+                # 남은 이벤트는 다음 poll에서 이어서 보냅니다.
+                self.version = None
+
+        # 서버가 직접 쓰는 진행 로그(code_generation 등). 목록이 새로 시작되면 처음부터 다시 보냅니다.
+        server_log = Job.objects.filter(id=self.job_id).values_list('progress_log', flat=True).first() or []
+        if len(server_log) < self.server_logs:
+            self.server_logs = 0
+        for entry in server_log[self.server_logs:]:
+            self.server_logs += 1
+            messages.append(format_sse('progress', entry, self.event_id()))
+
+        if row['status'] != self.status:
+            self.status = row['status']
+            if self.status in TERMINAL_STATUSES:
+                result = Job.objects.filter(id=self.job_id).values(
+                    'status', 'summary', 'error_message', 'final_result_url', 'completed_at',
+                ).first()
+                messages.append(format_sse('complete', result, self.event_id()))
+                return messages, True
+            messages.append(format_sse('status', {'status': self.status}, self.event_id()))
+        return messages, False
+
+
+async def _stream_async(cursor):
+    yield f'retry: {SSE_RETRY_MS}\n\n'
+    started = last_sent = time.monotonic()
+    while True:
+        messages, finished = await sync_to_async(cursor.poll)()
+        for message in messages:
+            yield message
+        now = time.monotonic()
+        if messages:
+            last_sent = now
+        if finished or now - started >= SSE_MAX_SECONDS:
+            return
+        if now - last_sent >= SSE_HEARTBEAT_SECONDS:
+            yield ': keep-alive\n\n'
+            last_sent = now
+        await asyncio.sleep(SSE_POLL_INTERVAL)
+
+
+def _stream_sync(cursor):
+    yield f'retry: {SSE_RETRY_MS}\n\n'
+    started = last_sent = time.monotonic()
+    while True:
+        messages, finished = cursor.poll()
+        yield from messages
+        now = time.monotonic()
+        if messages:
+            last_sent = now
+        if finished or now - started >= SSE_MAX_SECONDS:
+            return
+        if now - last_sent >= SSE_HEARTBEAT_SECONDS:
+            yield ': keep-alive\n\n'
+            last_sent = now
+        time.sleep(SSE_POLL_INTERVAL)
+
+
+async def job_event_stream(request, project_id, job_id):
+    """Job 진행 상황 SSE 스트림 (JWT 인증 필요, Last-Event-ID 헤더 또는 ?last_event_id=로 이어 받기)."""
+    try:
+        auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=401)
+    if auth is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    if not await Job.objects.filter(id=job_id, project_id=project_id).aexists():
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    seq, server_logs = parse_last_event_id(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    cursor = JobStreamCursor(job_id, seq, server_logs)
+    content = _stream_async(cursor) if isinstance(request, ASGIRequest) else _stream_sync(cursor)
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
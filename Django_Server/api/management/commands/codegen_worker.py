@@ -0,0 +1,130 @@
+"""
+code_generation Job 전용 작업자.
+
+    python manage.py codegen_worker [--workers N] [--worker-id ID] [--once]
+
+pending code_generation Job을 에이전트와 같은 원자적 할당(claim_pending_jobs)으로 가져와 크기가 정해진 스레드 풀에서 실행합니다.
+작업자는 Agent 행으로 등록되어 heartbeat를 남기고, 시작할 때와 주기적으로 끝나지 못한 Job을 다시 pending으로 돌립니다.
+"""
+import os
+import time
+import signal
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from api.codegen import CODEGEN_WORKERS, generate_code
+from api.dispatch import AGENT_STALE_SECONDS, claim_pending_jobs
+from api.models import Agent, Job
+
+logger = logging.getLogger(__name__)
+
+# 새 Job 확인 주기, heartbeat 주기, 중단된 Job 확인 주기(초)
+CODEGEN_POLL_SECONDS = float(os.getenv('CODEGEN_POLL_SECONDS', '1'))
+CODEGEN_HEARTBEAT_SECONDS = 15
+CODEGEN_RECOVERY_SECONDS = 60
+JOB_TYPES = ['code_generation']
+
+
+def recover_orphaned_jobs(agent, include_own=False, now=None):
+    """
+    끝나지 못한 code_generation Job을 pending으로 되돌리고 그 수를 반환합니다.
+    - heartbeat가 AGENT_STALE_SECONDS 이상 끊긴 작업자에 할당된 assigned/running Job
+    - 작업자 없이 AGENT_STALE_SECONDS 이상 갱신되지 않은 running Job (요청 스레드에서 실행하던 이전 방식)
+    - include_own=True이면 이 작업자 ID에 할당된 Job 전부 (재시작 직후에는 실행 중일 수 없으므로)
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=AGENT_STALE_SECONDS)
+    orphaned = Q(agent__last_heartbeat__lt=cutoff) | Q(agent__isnull=True, updated_at__lt=cutoff)
+    if include_own:
+        orphaned |= Q(agent=agent)
+    active = Job.objects.filter(job_type__in=JOB_TYPES, status__in=('assigned', 'running'))
+    job_ids = list(active.filter(orphaned).values_list('id', flat=True))
+    if not job_ids:
+        return 0
+    recovered = active.filter(id__in=job_ids).update(
+        status='pending', agent=None, assigned_at=None, started_at=None, updated_at=now,
+    )
+    logger.warning(f'중단된 code_generation Job {recovered}개를 다시 대기열에 넣었습니다: {job_ids}')
+    return recovered
+
+
+def run_job(job_id):
+    """작업자 스레드에서 Job 하나를 실행합니다."""
+    try:
+        generate_code(Job.objects.select_related('project').get(id=job_id))
+    except Exception:
+        logger.exception(f'code_generation Job 실행 실패: job_id={job_id}')
+    finally:
+        # 스레드별 DB 연결은 요청 주기가 없으므로 직접 닫습니다.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'pending code_generation Job을 가져와 제한된 스레드 풀에서 실행합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=CODEGEN_WORKERS,
+                            help='동시에 실행할 Job 수 (기본: CODEGEN_WORKERS)')
+        parser.add_argument('--worker-id', default=os.getenv('CODEGEN_WORKER_ID') or f'codegen-{socket.gethostname()}',
+                            help='Agent로 등록할 작업자 ID (재시작해도 같은 ID를 써야 중단된 Job을 바로 복구합니다)')
+        parser.add_argument('--once', action='store_true', help='대기 중인 Job을 모두 처리하면 종료합니다.')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        agent, _ = Agent.objects.update_or_create(
+            agent_id=options['worker_id'],
+            defaults={
+                'capabilities': JOB_TYPES,
+                'status': 'idle',
+                'version': 'codegen-worker',
+                'last_heartbeat': timezone.now(),
+            },
+        )
+        recovered = recover_orphaned_jobs(agent, include_own=True)
+        self.stdout.write(f'codegen_worker 시작: id={agent.agent_id}, workers={workers}, 복구한 Job {recovered}개')
+
+        running = set()
+        last_heartbeat = last_recovery = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='codegen') as executor:
+            while not stop.is_set():
+                close_old_connections()
+                running = {future for future in running if not future.done()}
+
+                now = time.monotonic()
+                if now - last_heartbeat >= CODEGEN_HEARTBEAT_SECONDS:
+                    Agent.objects.filter(agent_id=agent.agent_id).update(
+                        last_heartbeat=timezone.now(), status='processing' if running else 'idle',
+                    )
+                    last_heartbeat = now
+                if now - last_recovery >= CODEGEN_RECOVERY_SECONDS:
+                    recover_orphaned_jobs(agent)
+                    last_recovery = now
+
+                free = workers - len(running)
+                jobs = claim_pending_jobs(agent, JOB_TYPES, free, sticky=False) if free else []
+                for job in jobs:
+                    logger.info(f'code_generation Job 실행: job_id={job.id}')
+                    running.add(executor.submit(run_job, job.id))
+
+                if options['once'] and not jobs and not running:
+                    break
+                if not jobs:
+                    stop.wait(CODEGEN_POLL_SECONDS)
+
+            if running:
+                self.stdout.write(f'실행 중인 Job {len(running)}개가 끝나기를 기다립니다...')
+
+        Agent.objects.filter(agent_id=agent.agent_id).update(status='offline', current_job_id=None)
+        self.stdout.write('codegen_worker 종료')
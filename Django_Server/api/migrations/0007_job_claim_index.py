@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_agent_job_payload_updates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('assigned', 'Assigned'), ('running', 'Running'), ('completed', 'Completed'), ('success', 'Success'), ('failed', 'Failed')], default='pending', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'job_type', 'created_at'], name='job_claim_idx'),
+        ),
+    ]
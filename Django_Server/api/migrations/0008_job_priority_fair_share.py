@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+
+
+def backfill_flow_keys(apps, schema_editor):
+    # 기존 Job은 요청 사용자를 알 수 없으므로 프로젝트 단위 흐름(u0:p<project_id>)으로 채웁니다.
+    Job = apps.get_model('api', 'Job')
+    Job.objects.filter(flow_key='').update(
+        flow_key=Concat(Value('u0:p'), Coalesce(Cast('project_id', CharField()), Value('0')), output_field=CharField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_job_claim_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueueFlow',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('weight', models.FloatField(default=1.0)),
+                ('virtual_time', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_claim_idx',
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='flow_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Interactive'), (1, 'Normal'), (2, 'Batch')], default=1),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='requested_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'priority', 'flow_key', 'created_at'], name='job_queue_idx'),
+        ),
+        migrations.RunPython(backfill_flow_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_job_event'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobevent',
+            name='kind',
+            field=models.CharField(choices=[('progress', 'Progress'), ('tool', 'Tool invocation'), ('output', 'Output chunk')], max_length=20),
+        ),
+    ]
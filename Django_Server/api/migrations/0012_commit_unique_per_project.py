@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_codegen_cache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='commit',
+            name='commit_hash',
+            field=models.CharField(max_length=40),
+        ),
+        migrations.AddConstraint(
+            model_name='commit',
+            constraint=models.UniqueConstraint(fields=('project', 'commit_hash'), name='commit_project_hash_unique'),
+        ),
+    ]
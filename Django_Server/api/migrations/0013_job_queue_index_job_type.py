@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 03:05
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+
+
+def backfill_flow_keys(apps, schema_editor):
+    # save()를 거치지 않고 만들어져 흐름 키가 비어 있는 Job을 Job.make_flow_key와 같은 형식(u<user>:p<project>)으로 채웁니다.
+    Job = apps.get_model('api', 'Job')
+
+    def as_text(field):
+        return Coalesce(Cast(field, CharField()), Value('0'))
+
+    Job.objects.filter(flow_key='').update(
+        flow_key=Concat(Value('u'), as_text('requested_by_id'), Value(':p'), as_text('project_id'), output_field=CharField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_commit_unique_per_project'),
+    ]
+
+    operations = [
+        # 할당 쿼리는 job_type으로도 거르므로 0007의 job_claim_idx처럼 job_type을 색인에 포함합니다.
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_queue_idx',
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'job_type', 'priority', 'flow_key', 'created_at'], name='job_queue_idx'),
+        ),
+        migrations.RunPython(backfill_flow_keys, migrations.RunPython.noop),
+    ]
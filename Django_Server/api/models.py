@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from django.contrib.auth.models import User
 
 
 class Project(models.Model):
@@ -32,6 +34,16 @@ class Agent(models.Model):
         return str(self.agent_id)
 
 
+class JobQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create는 save()를 거치지 않으므로 흐름 키를 여기서 채웁니다.
+        objs = list(objs)
+        for job in objs:
+            if not job.flow_key:
+                job.flow_key = Job.make_flow_key(job.requested_by_id, job.project_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Job(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -41,8 +53,21 @@ class Job(models.Model):
         ('success', 'Success'),
         ('failed', 'Failed'),
     ]
+    # 우선순위 클래스 (숫자가 작을수록 먼저 할당)
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_BATCH = 2
+    PRIORITY_CHOICES = [
+        (PRIORITY_INTERACTIVE, 'Interactive'),
+        (PRIORITY_NORMAL, 'Normal'),
+        (PRIORITY_BATCH, 'Batch'),
+    ]
     agent = models.ForeignKey(Agent, on_delete=models.SET_NULL, null=True, blank=True)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=PRIORITY_NORMAL)
+    # 공정 분배 단위 (요청 사용자 + 프로젝트)
+    flow_key = models.CharField(max_length=64, blank=True, default='')
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='pending')
     job_type = models.CharField(max_length=100)
     payload = models.JSONField(default=dict, blank=True)
@@ -56,11 +81,95 @@ class Job(models.Model):
     summary = models.TextField(null=True, blank=True)
     final_result_url = models.URLField(null=True, blank=True)
     error_message = models.TextField(null=True, blank=True)
+    # 마지막으로 발급한 JobEvent.seq
+    event_seq = models.PositiveIntegerField(default=0)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # 에이전트의 Job 요청: 요청한 Job 종류 중 우선순위 클래스별 흐름 목록과 흐름 안에서 가장 오래된 Job 조회용
+            models.Index(fields=['status', 'job_type', 'priority', 'flow_key', 'created_at'], name='job_queue_idx'),
+        ]
+
+    @staticmethod
+    def make_flow_key(user_id, project_id):
+        return f'u{user_id or 0}:p{project_id or 0}'
+
+    def save(self, *args, **kwargs):
+        if not self.flow_key:
+            self.flow_key = self.make_flow_key(self.requested_by_id, self.project_id)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.job_type} - {self.status}'
 
 
+class JobEvent(models.Model):
+    """
+    Job 진행 로그/도구 호출/스트리밍 출력 조각을 한 줄씩 쌓는 추가 전용 테이블.
+    seq는 Job 안에서 1부터 증가하며 커서로 사용합니다.
+    """
+    KIND_PROGRESS = 'progress'
+    KIND_TOOL = 'tool'
+    KIND_OUTPUT = 'output'
+    KIND_CHOICES = [
+        (KIND_PROGRESS, 'Progress'),
+        (KIND_TOOL, 'Tool invocation'),
+        (KIND_OUTPUT, 'Output chunk'),
+    ]
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='events')
+    seq = models.PositiveIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    timestamp = models.DateTimeField(default=timezone.now)
+    payload = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'seq'], name='job_event_seq_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.job_id}#{self.seq} {self.kind}'
+
+
+class QueueFlow(models.Model):
+    """
+    Job 큐 공정 분배(가중치 공정 큐잉)용 흐름별 가상 시간.
+    흐름이 Job을 하나 할당받을 때마다 virtual_time이 1/weight만큼 늘어나며, 가장 작은 흐름이 다음 차례가 됩니다.
+    """
+    CLOCK_KEY = '*'
+
+    key = models.CharField(max_length=64, primary_key=True)
+    weight = models.FloatField(default=1.0)
+    virtual_time = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.key} ({self.virtual_time:.2f})'
+
+
+class CodegenCacheEntry(models.Model):
+    """
+    code_generation 결과 캐시. key는 (제공자, 모델, 정규화한 프롬프트, 언어, 시스템 프롬프트 버전, 컨텍스트)의 SHA-256입니다.
+    expires_at이 지나거나 전체 크기가 한도를 넘으면 오래 사용되지 않은 항목부터 삭제합니다.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    provider = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)
+    language = models.CharField(max_length=50)
+    result = models.TextField()
+    size = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'{self.provider}/{self.model} {self.key[:12]} ({self.hits} hits)'
+
+
 class Issue(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     analyzer = models.CharField(max_length=100)
@@ -77,11 +186,17 @@ class Issue(models.Model):
 
 class Commit(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
-    commit_hash = models.CharField(max_length=40, unique=True)
+    commit_hash = models.CharField(max_length=40)
     author_email = models.EmailField()
     message = models.TextField()
     timestamp = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # 포크/재등록한 저장소는 같은 커밋을 공유하므로 프로젝트 안에서만 유일합니다.
+            models.UniqueConstraint(fields=['project', 'commit_hash'], name='commit_project_hash_unique'),
+        ]
+
     def __str__(self):
         return self.commit_hash
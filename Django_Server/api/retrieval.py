@@ -0,0 +1,269 @@
+"""
+code_generation Job에 프로젝트 컨텍스트를 붙이기 위한 검색 단계.
+
+프로젝트의 local_path를 줄 단위 청크로 나눈 역색인(토큰 -> 청크별 빈도, BM25)을 프로세스 안에 캐시해 두고,
+프롬프트와 관련도가 높은 청크를 토큰 예산 안에서 골라 시스템 프롬프트에 넣을 텍스트로 만듭니다.
+local_path는 클라이언트가 등록한 값이므로 settings.CODEGEN_CONTEXT_ROOTS 아래에 있을 때만 디스크에서 읽고,
+그 밖이거나 접근할 수 없으면 저장된 file_tree의 경로만으로 관련 파일 목록을 만듭니다.
+"""
+import os
+import re
+import math
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+# 기본 컨텍스트 토큰 예산 (payload의 context_tokens로 Job별 변경 가능, 0이면 비활성화)
+DEFAULT_CONTEXT_TOKENS = int(os.getenv('CODEGEN_CONTEXT_TOKENS', '3000'))
+# 메모리에 유지할 프로젝트 색인 수
+MAX_CACHED_PROJECTS = int(os.getenv('CODEGEN_CONTEXT_CACHE_SIZE', '8'))
+
+CHUNK_LINES = 40
+MAX_FILE_BYTES = 256 * 1024
+MAX_INDEXED_FILES = 20000
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+IGNORE_DIRS = {'.git', '__pycache__', '.mypy_cache', '.pytest_cache', '.venv', 'venv', 'node_modules', 'dist', 'build'}
+TEXT_EXTENSIONS = {
+    '.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.c', '.h', '.cpp', '.hpp', '.cs', '.go', '.rs',
+    '.rb', '.php', '.kt', '.swift', '.scala', '.sql', '.html', '.css', '.md', '.json', '.yaml', '.yml', '.toml',
+}
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+SUBWORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def tokenize(text):
+    """식별자와 그 snake_case/camelCase 부분 단어를 소문자 토큰으로 만듭니다."""
+    tokens = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        lowered = identifier.lower()
+        if len(lowered) > 1:
+            tokens.append(lowered)
+        parts = [part.lower() for chunk in identifier.split('_') for part in SUBWORD_PATTERN.findall(chunk)]
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if len(part) > 1 and not part.isdigit())
+    return tokens
+
+
+def estimate_tokens(text):
+    # 모델별 토크나이저 없이 쓰는 근사값 (영문 코드 기준 약 4글자당 1토큰)
+    return len(text) // 4 + 1
+
+
+class ProjectIndex:
+    """프로젝트 하나의 청크 역색인. 파일의 (mtime, size)가 바뀐 경우에만 다시 읽습니다."""
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}     # 상대 경로 -> {'stat': (mtime_ns, size), 'chunk_ids': [...]}
+        self.chunks = {}    # 청크 ID -> (경로, 시작 줄, 텍스트, 길이, 토큰 목록)
+        self.postings = {}  # 토큰 -> {청크 ID: 빈도}
+        self.total_length = 0
+        self.next_chunk_id = 0
+        self.lock = threading.Lock()
+
+    def _iter_source_files(self):
+        count = 0
+        for current_dir, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in IGNORE_DIRS and not d.startswith('.')]
+            for name in files:
+                if os.path.splitext(name)[1].lower() not in TEXT_EXTENSIONS:
+                    continue
+                full_path = os.path.join(current_dir, name)
+                # 심볼릭 링크는 루트 밖의 파일을 가리킬 수 있으므로 읽지 않습니다.
+                if os.path.islink(full_path):
+                    continue
+                try:
+                    file_stat = os.stat(full_path)
+                except OSError:
+                    continue
+                if file_stat.st_size > MAX_FILE_BYTES:
+                    continue
+                count += 1
+                if count > MAX_INDEXED_FILES:
+                    return
+                rel_path = os.path.relpath(full_path, self.root).replace('\\', '/')
+                yield rel_path, full_path, (file_stat.st_mtime_ns, file_stat.st_size)
+
+    def _chunk_file(self, rel_path, full_path):
+        try:
+            with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return []
+        path_tokens = tokenize(rel_path.replace('/', ' ').replace('.', ' '))
+        chunks = []
+        for start in range(0, len(lines), CHUNK_LINES):
+            text = '\n'.join(lines[start:start + CHUNK_LINES])
+            tokens = tokenize(text) + path_tokens
+            frequencies = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            chunks.append((start + 1, text, frequencies, len(tokens)))
+        return chunks
+
+    def _add_file(self, rel_path, file_stat, chunks):
+        chunk_ids = []
+        for start, text, frequencies, length in chunks:
+            chunk_id = self.next_chunk_id
+            self.next_chunk_id += 1
+            self.chunks[chunk_id] = (rel_path, start, text, length, list(frequencies))
+            for token, tf in frequencies.items():
+                self.postings.setdefault(token, {})[chunk_id] = tf
+            self.total_length += length
+            chunk_ids.append(chunk_id)
+        self.files[rel_path] = {'stat': file_stat, 'chunk_ids': chunk_ids}
+
+    def _remove_file(self, rel_path):
+        entry = self.files.pop(rel_path, None)
+        if entry is None:
+            return
+        for chunk_id in entry['chunk_ids']:
+            _path, _start, _text, length, tokens = self.chunks.pop(chunk_id)
+            for token in tokens:
+                posting = self.postings[token]
+                del posting[chunk_id]
+                if not posting:
+                    del self.postings[token]
+            self.total_length -= length
+
+    def refresh(self):
+        """디스크와 비교해 바뀐 파일만 다시 청크로 나누고, 사라진 파일은 제거합니다."""
+        with self.lock:
+            seen = set()
+            for rel_path, full_path, file_stat in self._iter_source_files():
+                seen.add(rel_path)
+                entry = self.files.get(rel_path)
+                if entry is None or entry['stat'] != file_stat:
+                    self._remove_file(rel_path)
+                    self._add_file(rel_path, file_stat, self._chunk_file(rel_path, full_path))
+            for rel_path in [path for path in self.files if path not in seen]:
+                self._remove_file(rel_path)
+
+    def search(self, query_tokens):
+        """질의 토큰의 posting만 읽어 청크를 BM25 점수 순으로 정렬해 [(점수, 경로, 시작 줄, 텍스트)]로 반환합니다."""
+        with self.lock:
+            chunk_count = len(self.chunks)
+            if not chunk_count or not query_tokens:
+                return []
+            avg_length = self.total_length / chunk_count or 1
+            scores = {}
+            for token in query_tokens:
+                posting = self.postings.get(token)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (chunk_count - df + 0.5) / (df + 0.5))
+                for chunk_id, tf in posting.items():
+                    length = self.chunks[chunk_id][3]
+                    score = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + score
+            results = [(score, *self.chunks[chunk_id][:3]) for chunk_id, score in scores.items()]
+        results.sort(key=lambda item: item[0], reverse=True)
+        return results
+
+
+def _allowed_root(path):
+    """path가 settings.CODEGEN_CONTEXT_ROOTS 중 하나의 하위 디렉터리이면 실제 경로를, 아니면 None을 반환합니다."""
+    real_path = os.path.realpath(path)
+    for allowed in getattr(settings, 'CODEGEN_CONTEXT_ROOTS', []):
+        allowed = os.path.realpath(allowed)
+        if real_path == allowed or real_path.startswith(allowed.rstrip(os.sep) + os.sep):
+            return real_path
+    return None
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_project_index(project):
+    """
+    프로젝트별 색인을 가져오거나 만들고, 디스크 변경분을 반영해 반환합니다.
+    local_path가 없거나 허용된 루트(CODEGEN_CONTEXT_ROOTS) 밖이면 None.
+    """
+    root = _allowed_root(project.local_path) if project.local_path else None
+    if not root or not os.path.isdir(root):
+        return None
+    key = (project.id, root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ProjectIndex(root)
+            _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_CACHED_PROJECTS:
+            _indexes.popitem(last=False)
+    index.refresh()
+    return index
+
+
+def _file_tree_paths(node, paths):
+    if not isinstance(node, dict):
+        return
+    if node.get('type') == 'file' and node.get('path'):
+        paths.append(node['path'])
+    for child in node.get('children') or []:
+        _file_tree_paths(child, paths)
+
+
+def _rank_tree_paths(project, query_tokens, limit=30):
+    """local_path를 읽을 수 없거나 허용되지 않을 때 저장된 file_tree의 경로 토큰으로 관련 파일을 고릅니다."""
+    paths = []
+    _file_tree_paths(project.file_tree, paths)
+    wanted = set(query_tokens)
+    scored = []
+    for path in paths:
+        overlap = len(wanted.intersection(tokenize(path.replace('/', ' ').replace('.', ' '))))
+        if overlap:
+            scored.append((overlap, path))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [path for _, path in scored[:limit]]
+
+
+def build_project_context(project, prompt, token_budget=None):
+    """
+    프롬프트와 관련된 프로젝트 파일 청크를 token_budget 안에서 골라 시스템 프롬프트용 텍스트로 반환합니다.
+    넣을 내용이 없으면 빈 문자열을 반환합니다.
+    """
+    budget = DEFAULT_CONTEXT_TOKENS if token_budget is None else int(token_budget)
+    if project is None or budget <= 0:
+        return ''
+    query_tokens = list(dict.fromkeys(tokenize(prompt)))
+    header = f"Relevant context from project '{project.name}' (use its conventions and existing APIs):\n"
+    remaining = budget - estimate_tokens(header)
+
+    index = get_project_index(project)
+    if index is None:
+        paths = _rank_tree_paths(project, query_tokens)
+        if not paths:
+            return ''
+        lines = []
+        for path in paths:
+            remaining -= estimate_tokens(path) + 1
+            if remaining < 0:
+                break
+            lines.append(f"- {path}")
+        return header + "Related files:\n" + '\n'.join(lines) if lines else ''
+
+    sections = []
+    per_file = {}
+    for _score, path, start, text in index.search(query_tokens):
+        # 한 파일이 예산을 독점하지 않도록 파일당 청크 수를 제한합니다.
+        if per_file.get(path, 0) >= 2:
+            continue
+        section = f"### {path} (line {start})\n{text}\n"
+        cost = estimate_tokens(section)
+        if cost > remaining:
+            if remaining < 200:
+                break
+            continue
+        sections.append(section)
+        per_file[path] = per_file.get(path, 0) + 1
+        remaining -= cost
+    if not sections:
+        return ''
+    return header + '\n'.join(sections)
@@ -2,6 +2,7 @@ import copy
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Project, Agent, Job, Issue, Commit
+from .job_events import legacy_job_logs
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -56,6 +57,10 @@ class AgentSerializer(serializers.ModelSerializer):
 
 
 class JobSerializer(serializers.ModelSerializer):
+    # 에이전트 로그는 JobEvent에 쌓이므로 기존 JSON 필드와 합쳐 이전과 같은 형식으로 제공합니다.
+    progress_log = serializers.SerializerMethodField()
+    tool_invocations = serializers.SerializerMethodField()
+
     class Meta:
         model = Job
         fields = [
@@ -64,6 +69,7 @@ class JobSerializer(serializers.ModelSerializer):
             'project',
             'status',
             'job_type',
+            'priority',
             'payload',
             'assigned_at',
             'summary',
@@ -71,6 +77,45 @@ class JobSerializer(serializers.ModelSerializer):
             'error_message',
             'progress_log',
             'tool_invocations',
+            'event_seq',
+            'created_at',
+            'started_at',
+            'completed_at',
+        ]
+
+    def _legacy_logs(self, obj):
+        cached = getattr(obj, '_legacy_logs_cache', None)
+        if cached is None:
+            cached = legacy_job_logs(obj)
+            obj._legacy_logs_cache = cached
+        return cached
+
+    def get_progress_log(self, obj):
+        return self._legacy_logs(obj)[0]
+
+    def get_tool_invocations(self, obj):
+        return self._legacy_logs(obj)[1]
+
+
+class JobDeltaSerializer(serializers.ModelSerializer):
+    """
+    증분 조회(?since=<event_seq>)용 Job 요약. 크기가 큰 payload/summary와 합쳐진 로그는 빼고,
+    서버가 직접 쓴 progress_log(JSON 필드)만 그대로 포함합니다. 새 이벤트는 뷰에서 events로 붙입니다.
+    """
+    class Meta:
+        model = Job
+        fields = [
+            'id',
+            'agent',
+            'project',
+            'status',
+            'job_type',
+            'priority',
+            'assigned_at',
+            'final_result_url',
+            'error_message',
+            'progress_log',
+            'event_seq',
             'created_at',
             'started_at',
             'completed_at',
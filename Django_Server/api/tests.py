@@ -1,7 +1,14 @@
+import os
+import time
+import tempfile
+from unittest import mock
+from datetime import timedelta
 from django.contrib.auth.models import User
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Project
+from .models import Project, Issue, Commit, Job, Agent
+from .retrieval import build_project_context, estimate_tokens, get_project_index
 
 class ApiTests(APITestCase):
     def setUp(self):
@@ -75,4 +82,490 @@ class ApiTests(APITestCase):
         self.client.credentials() # 인증 정보 제거
         list_url = '/api/v1/projects'
         response = self.client.get(list_url, format='json')
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_scan_partial_update(self):
+        """
+        partial 스캔 업로드가 요청에 포함된 필드만 갱신하는지 테스트합니다.
+        """
+        project = Project.objects.create(name="Watch Project", local_path="/path/to/project")
+        url = f'/api/v1/git/{project.id}/scan'
+        response = self.client.post(url, {"file_tree": {"name": "repo"}, "language_stats": {"Python": 10}, "total_loc": 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        project.refresh_from_db()
+        scanned_at = project.updated_at
+
+        response = self.client.post(url, {"partial": True, "language_stats": {"Python": 12}, "total_loc": 12}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        project.refresh_from_db()
+        self.assertEqual(project.file_tree, {"name": "repo"})
+        self.assertEqual(project.total_loc, 12)
+        self.assertGreater(project.updated_at, scanned_at)
+
+    def test_upload_issues_batch_replace(self):
+        """
+        이슈 배치 업로드 시 replace 플래그가 같은 analyzer의 이전 결과를 교체하는지 테스트합니다.
+        """
+        project = Project.objects.create(name="Scan Project", local_path="/path/to/project")
+        url = f'/api/v1/git/{project.id}/issues'
+        issue = {"file": "a.py", "line": 1, "rule_id": "todo-todo", "severity": "info", "message": "fix"}
+
+        response = self.client.post(url, {"analyzer": "flash-scanner", "issues": [issue, issue], "replace": True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+
+        response = self.client.post(url, {"analyzer": "flash-scanner", "issues": [issue], "replace": True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Issue.objects.filter(project=project).count(), 1)
+
+    def test_bulk_commits_and_latest(self):
+        """
+        커밋 bulk 업로드가 중복을 건너뛰고, 목록 조회가 최신 커밋을 먼저 반환하는지 테스트합니다.
+        """
+        project = Project.objects.create(name="History Project", local_path="/path/to/project")
+        commits = [
+            {"commit_hash": f"{i:040x}", "author_email": "dev@example.com", "message": f"c{i}",
+             "timestamp": f"2024-01-01T00:00:0{i}Z"}
+            for i in range(3)
+        ]
+        bulk_url = f'/api/v1/git/{project.id}/commits/bulk'
+        response = self.client.post(bulk_url, {"commits": commits}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        response = self.client.post(bulk_url, {"commits": commits[1:]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'received': 2, 'created': 0})
+        self.assertEqual(Commit.objects.filter(project=project).count(), 3)
+
+        # 같은 저장소를 다른 프로젝트로 등록해도 커밋이 모두 저장됩니다.
+        fork = Project.objects.create(name="History Fork", local_path="/path/to/fork")
+        response = self.client.post(f'/api/v1/git/{fork.id}/commits/bulk', {"commits": commits}, format='json')
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(Commit.objects.filter(project=fork).count(), 3)
+
+        response = self.client.get(f'/api/v1/git/{project.id}/commits?limit=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['commit_hash'], commits[-1]['commit_hash'])
+
+    def test_project_context_retrieval(self):
+        """
+        코드 생성 컨텍스트가 프롬프트와 관련된 파일 조각을 토큰 예산 안에서 고르는지 테스트합니다.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'billing'))
+            with open(os.path.join(root, 'billing', 'invoice.py'), 'w') as f:
+                f.write("class InvoiceService:\n    def create_invoice(self, customer_id):\n        return customer_id\n")
+            with open(os.path.join(root, 'README.md'), 'w') as f:
+                f.write("# Sample\nUnrelated text\n")
+            project = Project.objects.create(name="Context Project", local_path=root)
+
+            # 허용된 루트 밖의 경로는 디스크에서 읽지 않습니다.
+            self.assertEqual(build_project_context(project, "add a refund method to InvoiceService", token_budget=500), '')
+
+            with self.settings(CODEGEN_CONTEXT_ROOTS=[os.path.dirname(root)]):
+                context = build_project_context(project, "add a refund method to InvoiceService", token_budget=500)
+                self.assertIn('billing/invoice.py', context)
+                self.assertNotIn('README.md', context)
+                self.assertLessEqual(estimate_tokens(context), 500)
+                self.assertEqual(build_project_context(project, "InvoiceService", token_budget=0), '')
+
+                # 파일이 지워지면 역색인의 posting에서도 제거됩니다.
+                os.remove(os.path.join(root, 'billing', 'invoice.py'))
+                self.assertEqual(build_project_context(project, "InvoiceService", token_budget=500), '')
+                self.assertNotIn('invoiceservice', get_project_index(project).postings)
+
+        project.local_path = '/nonexistent/path'
+        project.file_tree = {"type": "directory", "children": [{"type": "file", "path": "billing/invoice.py"}]}
+        self.assertIn('billing/invoice.py', build_project_context(project, "invoice refund", token_budget=500))
+
+    def test_agent_job_claim_is_exclusive(self):
+        """
+        여러 에이전트가 Job을 요청해도 같은 pending Job이 두 번 할당되지 않는지 테스트합니다.
+        """
+        jobs = [Job.objects.create(job_type='repository_analysis', payload={'n': i}) for i in range(3)]
+        Job.objects.create(job_type='code_generation', payload={})
+        url = '/api/v1/agent/jobs/request'
+
+        response = self.client.post(url, {'agent_id': 'agent-a', 'max_jobs': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([job['job_id'] for job in response.data['jobs']], [jobs[0].id, jobs[1].id])
+
+        response = self.client.post(url, {'agent_id': 'agent-b', 'max_jobs': 2}, format='json')
+        self.assertEqual([job['job_id'] for job in response.data['jobs']], [jobs[2].id])
+        self.assertEqual(Job.objects.filter(agent_id='agent-b', status='assigned').count(), 1)
+
+        response = self.client.post(url, {'agent_id': 'agent-c'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_agent_job_routing(self):
+        """
+        도구가 지정된 Job은 해당 capability를 가진 에이전트에게만, 프로젝트 Job은 마지막 처리 에이전트에게 먼저 할당되는지 테스트합니다.
+        """
+        url = '/api/v1/agent/jobs/request'
+        project = Project.objects.create(name="Routing Project", local_path="/path/to/project")
+        warm = Agent.objects.create(agent_id='agent-warm', last_heartbeat=timezone.now())
+        Job.objects.create(project=project, job_type='repository_analysis', agent=warm, status='success',
+                           assigned_at=timezone.now())
+        sticky_job = Job.objects.create(project=project, job_type='repository_analysis', payload={})
+        tool_job = Job.objects.create(job_type='repository_analysis', payload={'tool_name': 'search_code'})
+
+        response = self.client.post(url, {'agent_id': 'agent-cold', 'capabilities': ['get_diff']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.post(url, {'agent_id': 'agent-warm', 'capabilities': ['search_code'], 'max_jobs': 2},
+                                    format='json')
+        self.assertEqual([job['job_id'] for job in response.data['jobs']], [sticky_job.id, tool_job.id])
+
+        # 선호 에이전트가 대기 시간 안에 가져가지 않으면 다른 에이전트에게도 할당됩니다.
+        waiting_job = Job.objects.create(project=project, job_type='repository_analysis', payload={})
+        Job.objects.filter(id=waiting_job.id).update(created_at=timezone.now() - timedelta(hours=1))
+        response = self.client.post(url, {'agent_id': 'agent-cold', 'capabilities': ['get_diff']}, format='json')
+        self.assertEqual([job['job_id'] for job in response.data['jobs']], [waiting_job.id])
+
+    def test_codegen_worker_does_not_hold_project_jobs(self):
+        """
+        codegen_worker가 프로젝트의 code_generation Job을 가져가도, 그 프로젝트의 에이전트 Job 선호 대상이 되지 않는지 테스트합니다.
+        """
+        from .dispatch import claim_pending_jobs
+
+        project = Project.objects.create(name="Mixed Project", local_path="/path/to/project")
+        worker = Agent.objects.create(agent_id='codegen-test', capabilities=['code_generation'],
+                                      last_heartbeat=timezone.now())
+        Job.objects.create(project=project, job_type='code_generation', payload={'prompt': 'hi'})
+        self.assertEqual(len(claim_pending_jobs(worker, ['code_generation'], 1, sticky=False)), 1)
+
+        diff_job = Job.objects.create(project=project, job_type='repository_analysis', payload={'tool_name': 'get_diff'},
+                                      priority=Job.PRIORITY_INTERACTIVE)
+        desktop = Agent.objects.create(agent_id='desktop-test', capabilities=['get_diff'], last_heartbeat=timezone.now())
+        self.assertEqual([job.id for job in claim_pending_jobs(desktop, ['repository_analysis'], 1)], [diff_job.id])
+
+    def test_job_priority_and_fair_share(self):
+        """
+        interactive Job이 batch Job보다 먼저, 같은 클래스 안에서는 사용자별로 번갈아 할당되는지 테스트합니다.
+        """
+        project = Project.objects.create(name="Queue Project", local_path="/path/to/project")
+        jobs_url = f'/api/v1/projects/{project.id}/jobs'
+        bulk = [
+            self.client.post(jobs_url, {'job_type': 'repository_analysis', 'payload': {'n': i}, 'priority': 'batch'},
+                             format='json').data['id']
+            for i in range(3)
+        ]
+        other_user = User.objects.create_user(username="other", password=self.password)
+        other_job = Job.objects.create(project=project, requested_by=other_user, job_type='repository_analysis',
+                                       priority=Job.PRIORITY_BATCH)
+        response = self.client.post(jobs_url, {'job_type': 'repository_analysis', 'payload': {'tool_name': 'get_diff'}},
+                                    format='json')
+        self.assertEqual(response.data['priority'], Job.PRIORITY_INTERACTIVE)
+        interactive = response.data['id']
+
+        response = self.client.post(jobs_url, {'job_type': 'repository_analysis', 'priority': 'urgent'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get('/api/v1/jobs/queue/stats')
+        by_class = {entry['priority']: entry for entry in response.data['classes']}
+        self.assertEqual(by_class['batch']['pending'], 4)
+        self.assertEqual(by_class['batch']['flows'], 2)
+        self.assertEqual(by_class['interactive']['pending'], 1)
+
+        response = self.client.post('/api/v1/agent/jobs/request', {'agent_id': 'agent-q', 'max_jobs': 4}, format='json')
+        claimed = [job['job_id'] for job in response.data['jobs']]
+        self.assertEqual(claimed[0], interactive)
+        # 먼저 만든 batch Job 3개보다 다른 사용자의 Job이 앞서 할당됩니다.
+        self.assertEqual(sorted(claimed[1:]), sorted(bulk[:2] + [other_job.id]))
+        self.assertEqual(Job.objects.get(id=bulk[2]).status, 'pending')
+
+    def test_fair_share_charges_and_bulk_flow_keys(self):
+        """
+        같은 시작 시간으로 동시에 할당해도 흐름 가상 시간이 누락 없이 누적되고, bulk_create로 만든 Job도 사용자별 흐름으로 나뉘는지 테스트합니다.
+        """
+        from .dispatch import _charge_flow, claim_pending_jobs
+        from .models import QueueFlow
+
+        _charge_flow('u1:p1', 0.0, 1.0)
+        _charge_flow('u1:p1', 0.0, 1.0)
+        self.assertEqual(QueueFlow.objects.get(key='u1:p1').virtual_time, 2.0)
+        self.assertEqual(QueueFlow.objects.get(key=QueueFlow.CLOCK_KEY).virtual_time, 0.0)
+
+        project = Project.objects.create(name="Bulk Queue", local_path="/path/to/project")
+        other_user = User.objects.create_user(username="bulk-other", password=self.password)
+        heavy = Job.objects.bulk_create([
+            Job(project=project, requested_by=self.user, job_type='repository_analysis') for _ in range(3)
+        ])
+        light = Job.objects.bulk_create([Job(project=project, requested_by=other_user, job_type='repository_analysis')])
+        self.assertEqual(Job.objects.filter(flow_key='').count(), 0)
+
+        agent = Agent.objects.create(agent_id='agent-bulk', last_heartbeat=timezone.now())
+        claimed = [job.id for job in claim_pending_jobs(agent, ['repository_analysis'], 2)]
+        self.assertEqual(sorted(claimed), sorted([heavy[0].id, light[0].id]))
+        self.assertEqual(Job.objects.get(id=heavy[2].id).flow_key, Job.make_flow_key(self.user.id, project.id))
+
+    def test_job_events_append_and_compat(self):
+        """
+        진행 로그/도구 콜백이 JobEvent로 쌓이고, 기존 필드 형식과 커서 페이지 조회로 모두 볼 수 있는지 테스트합니다.
+        """
+        project = Project.objects.create(name="Event Project", local_path="/path/to/project")
+        job = Job.objects.create(project=project, job_type='repository_analysis', status='running',
+                                 progress_log=[{'percent_complete': 10, 'log_message': 'queued'}])
+
+        progress_url = f'/api/v1/agent/jobs/{job.id}/progress'
+        response = self.client.post(progress_url, {'log_message': 'start', 'percent_complete': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.post(progress_url, [{'log_message': f'step {i}'} for i in range(3)], format='json')
+        self.assertEqual(response.data['seq'], 4)
+        response = self.client.post('/api/v1/agent/callbacks/tool',
+                                    {'run_id': str(job.id), 'tool_name': 'get_diff', 'tool_input': {}, 'tool_output': 'ok'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.post('/api/v1/agent/jobs/999999/progress', {'log_message': 'lost'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # 여러 Job의 콜백 중 하나라도 Job이 없으면 아무것도 저장하지 않습니다.
+        callback = {'tool_name': 'get_diff', 'tool_input': {}, 'tool_output': 'dup'}
+        response = self.client.post('/api/v1/agent/callbacks/tool',
+                                    [dict(callback, run_id=str(job.id)), dict(callback, run_id='999999')], format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(job.events.filter(kind='tool').count(), 1)
+
+        response = self.client.get(f'/api/v1/projects/{project.id}/jobs/{job.id}')
+        self.assertEqual([entry['log_message'] for entry in response.data['progress_log']],
+                         ['queued', 'start', 'step 0', 'step 1', 'step 2'])
+        self.assertEqual(response.data['tool_invocations'][0]['tool_output'], 'ok')
+
+        events_url = f'/api/v1/projects/{project.id}/jobs/{job.id}/events'
+        response = self.client.get(events_url, {'limit': 3})
+        self.assertEqual([event['seq'] for event in response.data['events']], [1, 2, 3])
+        self.assertTrue(response.data['has_more'])
+        response = self.client.get(events_url, {'after': response.data['next_cursor']})
+        self.assertEqual([event['kind'] for event in response.data['events']], ['progress', 'tool'])
+        self.assertFalse(response.data['has_more'])
+
+    def test_job_detail_incremental_and_etag(self):
+        """
+        ?since= 조회가 새 이벤트만 반환하고, 변경이 없으면 If-None-Match에 304로 응답하는지 테스트합니다.
+        """
+        project = Project.objects.create(name="Poll Project", local_path="/path/to/project")
+        job = Job.objects.create(project=project, job_type='repository_analysis', status='running', summary='big')
+        progress_url = f'/api/v1/agent/jobs/{job.id}/progress'
+        detail_url = f'/api/v1/projects/{project.id}/jobs/{job.id}'
+        self.client.post(progress_url, [{'log_message': 'one'}, {'log_message': 'two'}], format='json')
+
+        response = self.client.get(detail_url, {'since': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['log_message'] for event in response.data['events']], ['two'])
+        self.assertNotIn('summary', response.data)
+        self.assertEqual(response.data['event_seq'], 2)
+        etag = response['ETag']
+
+        # ETag는 since마다 다르므로, 다음 커서로 처음 조회할 때는 (빈) 증분 본문을 받습니다.
+        response = self.client.get(detail_url, {'since': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['events'], [])
+        etag = response['ETag']
+        response = self.client.get(detail_url, {'since': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # 증분 응답의 ETag로 처음부터(since=0) 또는 전체를 다시 조회하면 304가 아닌 전체 내용을 받습니다.
+        response = self.client.get(detail_url, {'since': 0}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['events']), 2)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary'], 'big')
+
+        self.client.post(progress_url, {'log_message': 'three'}, format='json')
+        response = self.client.get(detail_url, {'since': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['seq'] for event in response.data['events']], [3])
+
+    def test_job_event_stream_resume(self):
+        """
+        SSE 스트림이 Last-Event-ID 이후의 이벤트와 완료 결과를 보내고 종료하는지 테스트합니다.
+        """
+        project = Project.objects.create(name="Stream Project", local_path="/path/to/project")
+        job = Job.objects.create(project=project, job_type='repository_analysis', status='running')
+        self.client.post(f'/api/v1/agent/jobs/{job.id}/progress',
+                         [{'log_message': 'one'}, {'log_message': 'two'}, {'log_message': 'three'}], format='json')
+        Job.objects.filter(id=job.id).update(status='completed', summary='done')
+        stream_url = f'/api/v1/projects/{project.id}/jobs/{job.id}/events/stream'
+
+        response = self.client.get(stream_url, HTTP_LAST_EVENT_ID='2-0')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertNotIn('"two"', body)
+        self.assertIn('id: 3-0\nevent: progress\ndata: {"seq": 3', body)
+        self.assertIn('event: complete', body)
+        self.assertIn('"summary": "done"', body)
+
+        self.client.credentials()
+        response = self.client.get(stream_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_codegen_worker_claims_and_recovers(self):
+        """
+        code_generation Job이 조회 요청이 아닌 작업자에서 실행되고, 중단된 Job이 다시 대기열에 들어가는지 테스트합니다.
+        """
+        from .codegen import generate_code
+        from .dispatch import claim_pending_jobs
+        from .management.commands.codegen_worker import recover_orphaned_jobs
+
+        project = Project.objects.create(name="Codegen Project", local_path="/path/to/project")
+        job = Job.objects.create(project=project, job_type='code_generation', payload={'prompt': 'hello'})
+        response = self.client.get(f'/api/v1/projects/{project.id}/jobs/{job.id}')
+        self.assertEqual(response.data['status'], 'pending')
+
+        worker = Agent.objects.create(agent_id='codegen-test', capabilities=['code_generation'], last_heartbeat=timezone.now())
+        dead = Agent.objects.create(agent_id='codegen-dead', last_heartbeat=timezone.now() - timedelta(hours=1))
+        orphan = Job.objects.create(project=project, job_type='code_generation', status='running', agent=dead)
+        own = Job.objects.create(project=project, job_type='code_generation', status='assigned', agent=worker)
+
+        self.assertEqual(recover_orphaned_jobs(worker), 1)
+        self.assertEqual(Job.objects.get(id=own.id).status, 'assigned')
+        self.assertEqual(recover_orphaned_jobs(worker, include_own=True), 1)
+        self.assertEqual(Job.objects.get(id=orphan.id).status, 'pending')
+
+        claimed = claim_pending_jobs(worker, ['code_generation'], 2, sticky=False)
+        self.assertEqual([j.id for j in claimed], [job.id, orphan.id])
+        self.assertTrue(all(j.status == 'assigned' and j.agent_id == 'codegen-test' for j in claimed))
+
+        with mock.patch.dict(os.environ, {'CODEGEN_PROVIDER': 'langchain', 'LANGCHAIN_BASE_URL': ''}):
+            generate_code(Job.objects.get(id=job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('LANGCHAIN_BASE_URL', job.error_message)
+
+    def test_llm_gateway_fallback_and_mock(self):
+        """
+        LLM 게이트웨이가 일시적 오류를 재시도하고, 실패 시 fallback 제공자를 쓰며, 지표를 기록하는지 테스트합니다.
+        """
+        from flash_server import llm_gateway
+
+        calls = []
+
+        def flaky(model, request):
+            calls.append(model)
+            raise llm_gateway.LLMGatewayError('overloaded', status_code=529)
+
+        llm_gateway.reset_stats()
+        previous = llm_gateway.set_mock_handler(lambda request: '```json\n{"title": "hi"}\n```')
+        try:
+            with mock.patch.dict(llm_gateway._PROVIDERS, {'anthropic': flaky}), \
+                    mock.patch.object(llm_gateway, 'LLM_RETRY_BACKOFF_SECONDS', 0), \
+                    mock.patch.object(llm_gateway, 'provider_available', lambda name: True):
+                result = llm_gateway.complete('hello', provider='anthropic', model='m1', fallbacks=['mock'])
+                self.assertEqual(result['provider'], 'mock')
+                self.assertTrue(result['fallback'])
+                self.assertEqual(len(calls), llm_gateway.LLM_MAX_RETRIES + 1)
+                self.assertEqual(llm_gateway.extract_json(result['text']), {'title': 'hi'})
+
+                with self.assertRaises(llm_gateway.LLMGatewayError):
+                    llm_gateway.complete('hello', provider='anthropic', model='m1')
+
+            with mock.patch.object(llm_gateway, 'LLM_MOCK', True):
+                self.assertEqual(llm_gateway.complete_json('quests?', provider='openai'), {'title': 'hi'})
+        finally:
+            llm_gateway.set_mock_handler(previous)
+
+        stats = {(entry['provider'], entry['model']): entry for entry in llm_gateway.stats()}
+        self.assertEqual(stats[('anthropic', 'm1')]['retries'], 2 * llm_gateway.LLM_MAX_RETRIES)
+        self.assertEqual(stats[('mock', 'mock')]['calls'], 2)
+        self.assertEqual(stats[('mock', 'mock')]['fallbacks'], 1)
+        self.assertEqual(llm_gateway.extract_json('답변: [1, 2] 입니다'), [1, 2])
+
+        response = self.client.get('/api/v1/llm/stats')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['models']), 2)
+
+    def test_codegen_streams_output_events(self):
+        """
+        code_generation이 모델 응답 조각을 output JobEvent로 기록하고, 조각을 이으면 최종 summary와 같은지 테스트합니다.
+        """
+        from flash_server import llm_gateway
+        from . import codegen
+
+        project = Project.objects.create(name="Stream Codegen", local_path="/path/to/project")
+        job = Job.objects.create(project=project, job_type='code_generation', payload={'prompt': 'print hello'})
+        code = 'def hello():\n    print("hello")\n' * 10
+
+        previous = llm_gateway.set_mock_handler(lambda request: code)
+        try:
+            with mock.patch.object(llm_gateway, 'LLM_MOCK', True), mock.patch.object(codegen, 'CODEGEN_STREAM_FLUSH_SECONDS', 0):
+                codegen.generate_code(Job.objects.get(id=job.id))
+        finally:
+            llm_gateway.set_mock_handler(previous)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        chunks = list(job.events.filter(kind='output').order_by('seq').values_list('payload', flat=True))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunk['text'] for chunk in chunks), job.summary.strip() + '\n')
+        self.assertEqual([chunk['offset'] for chunk in chunks][:2], [0, len(chunks[0]['text'])])
+        self.assertEqual(job.event_seq, len(chunks))
+        self.assertTrue(any('첫 응답' in entry['log_message'] for entry in job.progress_log))
+
+        response = self.client.get(f'/api/v1/projects/{project.id}/jobs/{job.id}', {'since': 0})
+        self.assertEqual(len([e for e in response.data['events'] if e['kind'] == 'output']), len(chunks))
+        self.assertNotIn('첫 응답', ' '.join(e.get('log_message', '') for e in response.data['events']))
+
+    def test_codegen_cache_reuses_identical_requests(self):
+        """
+        공백만 다른 같은 요청은 캐시 결과로 바로 완료되고, no_cache이면 다시 모델을 호출하며, 만료/크기 한도로 정리되는지 테스트합니다.
+        """
+        from flash_server import llm_gateway
+        from . import codegen, codegen_cache
+        from .models import CodegenCacheEntry
+
+        project = Project.objects.create(name="Cache Codegen", local_path="/path/to/project")
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return f'print({len(calls)})\n'
+
+        def run(payload):
+            job = Job.objects.create(project=project, job_type='code_generation',
+                                     payload=dict(payload, use_repo_context=False))
+            codegen.generate_code(Job.objects.get(id=job.id))
+            job.refresh_from_db()
+            return job
+
+        previous = llm_gateway.set_mock_handler(handler)
+        try:
+            with mock.patch.dict(os.environ, {'CODEGEN_PROVIDER': 'mock'}), \
+                    mock.patch.object(codegen_cache, 'CODEGEN_CACHE', True):
+                first = run({'prompt': 'print  hello\n'})
+                second = run({'prompt': ' print hello'})
+                other_language = run({'prompt': 'print hello', 'language': 'javascript'})
+                forced = run({'prompt': 'print hello', 'no_cache': True})
+                after_forced = run({'prompt': 'print hello'})
+        finally:
+            llm_gateway.set_mock_handler(previous)
+
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(second.status, 'completed')
+        self.assertEqual(second.summary, first.summary)
+        self.assertTrue(second.progress_log[-1]['cache_hit'])
+        self.assertEqual(second.event_seq, 1)
+        self.assertEqual(second.events.get().payload, {'text': first.summary, 'offset': 0})
+        self.assertFalse(any(entry.get('cache_hit') for entry in first.progress_log))
+        self.assertNotEqual(other_language.summary, first.summary)
+        self.assertEqual(forced.summary, 'print(3)')
+        self.assertEqual(after_forced.summary, 'print(3)')
+        self.assertEqual(CodegenCacheEntry.objects.count(), 2)
+        self.assertEqual(CodegenCacheEntry.objects.order_by('-hits').first().hits, 2)
+
+        # 만료된 항목은 조회되지 않고, 크기 한도를 넘으면 가장 오래 사용되지 않은 항목부터 삭제됩니다.
+        now = timezone.now()
+        expired = CodegenCacheEntry.objects.order_by('last_used_at').first()
+        CodegenCacheEntry.objects.filter(key=expired.key).update(expires_at=now - timedelta(seconds=1))
+        self.assertIsNone(codegen_cache.lookup(expired.key))
+        with mock.patch.object(codegen_cache, 'CODEGEN_CACHE_PRUNE_SECONDS', 3600), \
+                mock.patch.object(codegen_cache, '_last_prune', time.monotonic()):
+            codegen_cache.store('a' * 64, 'mock', 'm', 'python', 'x' * 10)
+        # 정리 주기 안에서는 저장해도 정리하지 않습니다.
+        self.assertTrue(CodegenCacheEntry.objects.filter(key=expired.key).exists())
+        with mock.patch.object(codegen_cache, 'CODEGEN_CACHE_PRUNE_SECONDS', 0):
+            codegen_cache.store('b' * 64, 'mock', 'm', 'python', 'y' * 10)
+        self.assertFalse(CodegenCacheEntry.objects.filter(key=expired.key).exists())
+        self.assertEqual(codegen_cache.prune(max_bytes=10), 2)
+        self.assertEqual(list(CodegenCacheEntry.objects.values_list('key', flat=True)), ['b' * 64])
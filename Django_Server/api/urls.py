@@ -19,8 +19,12 @@ from .views import (
     ProjectIssuesView,
     ProjectReadmeView,
     ProjectCommitsView,
+    ProjectCommitsBulkView,
     CreateAgentJobView,
     JobDetailView,
+    JobEventListView,
+    JobQueueStatsView,
+    LLMStatsView,
     ProjectListView,
     DeviceLoginView,
     DeviceUpdatesView,
@@ -41,6 +45,7 @@ from .views import (
     QuizRecommendationsView,
     QuizGeneratedSaveView,
 )
+from .job_stream import job_event_stream
 
 # Use real gamification endpoints from the gamification app
 from gamification.views import (
@@ -69,8 +74,13 @@ urlpatterns = [
     path('git/<int:project_id>/issues', ProjectIssuesView.as_view(), name='project_issues'),
     path('git/<int:project_id>/readme', ProjectReadmeView.as_view(), name='project_readme'),
     path('git/<int:project_id>/commits', ProjectCommitsView.as_view(), name='project_commits'),
+    path('git/<int:project_id>/commits/bulk', ProjectCommitsBulkView.as_view(), name='project_commits_bulk'),
     path('projects/<int:project_id>/jobs', CreateAgentJobView.as_view(), name='create_agent_job'),
     path('projects/<int:project_id>/jobs/<int:job_id>', JobDetailView.as_view(), name='job_detail'),
+    path('projects/<int:project_id>/jobs/<int:job_id>/events', JobEventListView.as_view(), name='job_events'),
+    path('projects/<int:project_id>/jobs/<int:job_id>/events/stream', job_event_stream, name='job_event_stream'),
+    path('jobs/queue/stats', JobQueueStatsView.as_view(), name='job_queue_stats'),
+    path('llm/stats', LLMStatsView.as_view(), name='llm_stats'),
     path('projects', ProjectListView.as_view(), name='project_list'),
     path('device/login', DeviceLoginView.as_view(), name='device_login'),
     path('device/updates', DeviceUpdatesView.as_view(), name='device_updates'),
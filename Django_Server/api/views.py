@@ -7,21 +7,23 @@ from rest_framework import generics
 from django.shortcuts import get_object_or_404
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth import authenticate
-from .models import Project, Job, Agent, Issue, Commit
+from django.db import transaction
+from .models import Project, Job, JobEvent, Agent, Issue, Commit
+from .dispatch import claim_pending_jobs, queue_stats
+from .job_events import append_job_events, event_entry, etag_matches, job_etag
+from flash_server import llm_gateway
 
 from gamification.models import UserProfile
-import os
-import anthropic
 import json
-import requests
-import threading
 from gamification.serializers import UserProfileSerializer
 from .serializers import (
     UserSerializer,
     RegisterSerializer,
     ProjectSerializer,
     JobSerializer,
+    JobDeltaSerializer,
     IssueSerializer,
     AgentSerializer,
     CommitSerializer,
@@ -150,20 +152,12 @@ class AgentJobRequestView(APIView):
 
         agent, _ = Agent.objects.update_or_create(agent_id=agent_id, defaults=defaults)
 
-        # repository_analysis와 code_generation 모두 pending 상태로 필터링
-        pending_jobs = list(Job.objects.filter(status='pending', job_type='repository_analysis').order_by('created_at')[:max_jobs])
-        if not pending_jobs:
+        claimed_jobs = claim_pending_jobs(agent, ['repository_analysis'], max_jobs)
+        if not claimed_jobs:
             # 대기할 job이 없으므로 204 No Content 반환
             return Response(status=status.HTTP_204_NO_CONTENT)
 
-        assignments = []
-        now = timezone.now()
-        for job in pending_jobs:
-            job.agent = agent
-            job.status = 'assigned'
-            job.assigned_at = now
-            job.save(update_fields=['agent', 'status', 'assigned_at', 'updated_at'])
-            assignments.append(JobAssignmentSerializer(job).data)
+        assignments = [JobAssignmentSerializer(job).data for job in claimed_jobs]
 
         agent.current_job_id = str(assignments[0]['job_id'])
         agent.status = 'assigned'
@@ -201,25 +195,26 @@ class AgentJobStartView(APIView):
 
 class AgentJobProgressView(APIView):
     def post(self, request, job_id):
-        serializer = AgentJobProgressSerializer(data=request.data)
+        # 항목 하나 또는 여러 항목의 목록을 받아 JobEvent로 한 번에 추가합니다.
+        many = isinstance(request.data, list)
+        serializer = AgentJobProgressSerializer(data=request.data, many=many)
         serializer.is_valid(raise_exception=True)
-        job = get_object_or_404(Job, id=job_id)
-
-        progress_entry = {
-            'timestamp': timezone.now().isoformat(),
-            'log_message': serializer.validated_data.get('log_message'),
-            'intermediate_artifact': serializer.validated_data.get('intermediate_artifact'),
-        }
-        if 'percent_complete' in serializer.validated_data:
-            progress_entry['percent_complete'] = float(serializer.validated_data['percent_complete'])
 
-        progress_entry = {key: value for key, value in progress_entry.items() if value is not None}
+        entries = []
+        for data in (serializer.validated_data if many else [serializer.validated_data]):
+            progress_entry = {
+                'log_message': data.get('log_message'),
+                'intermediate_artifact': data.get('intermediate_artifact'),
+            }
+            if 'percent_complete' in data:
+                progress_entry['percent_complete'] = float(data['percent_complete'])
+            entries.append({key: value for key, value in progress_entry.items() if value is not None})
 
-        current_log = list(job.progress_log or [])
-        current_log.append(progress_entry)
-        job.progress_log = current_log
-        job.save(update_fields=['progress_log', 'updated_at'])
-        return Response(status=status.HTTP_202_ACCEPTED)
+        try:
+            last_seq = append_job_events(job_id, JobEvent.KIND_PROGRESS, entries)
+        except Job.DoesNotExist:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'seq': last_seq}, status=status.HTTP_202_ACCEPTED)
 
 
 class AgentJobCompleteView(APIView):
@@ -247,26 +242,30 @@ class AgentJobCompleteView(APIView):
 
 class AgentToolCallbackView(APIView):
     def post(self, request):
-        serializer = ToolCallbackSerializer(data=request.data)
+        # 콜백 하나 또는 여러 콜백의 목록을 받아 Job별로 묶어 JobEvent로 추가합니다.
+        many = isinstance(request.data, list)
+        serializer = ToolCallbackSerializer(data=request.data, many=many)
         serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
 
-        run_id = data['run_id']
+        entries_by_job = {}
+        for data in (serializer.validated_data if many else [serializer.validated_data]):
+            try:
+                job_id = int(data['run_id'])
+            except ValueError:
+                return Response({'detail': 'Job not found for run_id.'}, status=status.HTTP_404_NOT_FOUND)
+            entries_by_job.setdefault(job_id, []).append({
+                'tool_name': data['tool_name'],
+                'tool_input': data.get('tool_input'),
+                'tool_output': data.get('tool_output'),
+            })
+
+        # 한 Job이라도 없으면 전체를 되돌려, 클라이언트가 재시도해도 앞선 Job의 이벤트가 중복되지 않게 합니다.
         try:
-            job = Job.objects.get(id=int(run_id))
-        except (ValueError, Job.DoesNotExist):
+            with transaction.atomic():
+                for job_id, entries in entries_by_job.items():
+                    append_job_events(job_id, JobEvent.KIND_TOOL, entries)
+        except Job.DoesNotExist:
             return Response({'detail': 'Job not found for run_id.'}, status=status.HTTP_404_NOT_FOUND)
-
-        invocation_entry = {
-            'timestamp': timezone.now().isoformat(),
-            'tool_name': data['tool_name'],
-            'tool_input': data.get('tool_input'),
-            'tool_output': data.get('tool_output'),
-        }
-        invocations = list(job.tool_invocations or [])
-        invocations.append(invocation_entry)
-        job.tool_invocations = invocations
-        job.save(update_fields=['tool_invocations', 'updated_at'])
         return Response(status=status.HTTP_202_ACCEPTED)
 
 
@@ -317,27 +316,14 @@ class ProjectScanView(APIView):
         except Project.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        project.file_tree = request.data.get('file_tree')
-        project.language_stats = request.data.get('language_stats')
-        project.total_loc = request.data.get('total_loc')
-        project.avg_complexity = request.data.get('avg_complexity')
-        project.save()
-
-        return Response(status=status.HTTP_200_OK)
-
-    permission_classes = [IsAuthenticated]
-
-    def post(self, request, project_id):
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
-            return Response(status=status.HTTP_404_NOT_FOUND)
-
-        project.file_tree = request.data.get('file_tree')
-        project.language_stats = request.data.get('language_stats')
-        project.total_loc = request.data.get('total_loc')
-        project.avg_complexity = request.data.get('avg_complexity')
-        project.save()
+        # partial=true 이면 요청에 포함된 필드만 갱신합니다 (에이전트 watcher의 변경분 업로드).
+        fields = ['file_tree', 'language_stats', 'total_loc', 'avg_complexity']
+        if request.data.get('partial'):
+            fields = [field for field in fields if field in request.data]
+        for field in fields:
+            setattr(project, field, request.data.get(field))
+        # update_fields를 지정하면 auto_now 필드도 목록에 있어야 저장됩니다.
+        project.save(update_fields=fields + ['updated_at'])
 
         return Response(status=status.HTTP_200_OK)
 
@@ -353,8 +339,8 @@ class ProjectIssuesView(APIView):
         issues_data = request.data.get('issues', [])
         analyzer = request.data.get('analyzer')
 
-        for issue_data in issues_data:
-            Issue.objects.create(
+        issues = [
+            Issue(
                 project=project,
                 analyzer=analyzer,
                 file=issue_data.get('file'),
@@ -363,8 +349,16 @@ class ProjectIssuesView(APIView):
                 severity=issue_data.get('severity'),
                 message=issue_data.get('message'),
             )
+            for issue_data in issues_data
+        ]
 
-        return Response(status=status.HTTP_201_CREATED)
+        with transaction.atomic():
+            # replace=true 이면 같은 analyzer의 이전 검사 결과를 교체합니다.
+            if request.data.get('replace'):
+                Issue.objects.filter(project=project, analyzer=analyzer).delete()
+            Issue.objects.bulk_create(issues, batch_size=500)
+
+        return Response({'created': len(issues)}, status=status.HTTP_201_CREATED)
 
 class ProjectReadmeView(APIView):
     permission_classes = [IsAuthenticated]
@@ -383,6 +377,17 @@ class ProjectReadmeView(APIView):
 class ProjectCommitsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    def get(self, request, project_id):
+        project = get_object_or_404(Project, id=project_id)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 1000)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        commits = Commit.objects.filter(project=project).order_by('-timestamp', '-id')[:limit]
+        serializer = CommitSerializer(commits, many=True)
+        return Response(serializer.data)
+
     def post(self, request, project_id):
         try:
             project = Project.objects.get(id=project_id)
@@ -399,6 +404,42 @@ class ProjectCommitsView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProjectCommitsBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, project_id):
+        project = get_object_or_404(Project, id=project_id)
+        commits_data = request.data.get('commits', [])
+        if not isinstance(commits_data, list):
+            return Response({'error': 'commits must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        commits = []
+        for commit_data in commits_data:
+            timestamp = parse_datetime(str(commit_data.get('timestamp') or ''))
+            commit_hash = commit_data.get('commit_hash')
+            if not commit_hash or timestamp is None:
+                return Response(
+                    {'error': f'Invalid commit entry: {commit_hash}'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            commits.append(Commit(
+                project=project,
+                commit_hash=commit_hash,
+                author_email=(commit_data.get('author_email') or '')[:254],
+                message=commit_data.get('message') or '',
+                timestamp=timestamp,
+            ))
+
+        # 이 프로젝트에 이미 저장된 커밋(재시도, 이력 재작성 후 재수집)은 건너뜁니다.
+        # ignore_conflicts는 실제로 추가된 행 수를 알려주지 않으므로 전후 개수로 계산합니다.
+        stored = Commit.objects.filter(project=project, commit_hash__in=[c.commit_hash for c in commits])
+        with transaction.atomic():
+            before = stored.count()
+            Commit.objects.bulk_create(commits, batch_size=1000, ignore_conflicts=True)
+            created = stored.count() - before
+        return Response({'received': len(commits), 'created': created}, status=status.HTTP_201_CREATED)
+
+
 class CreateAgentJobView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -410,6 +451,15 @@ class CreateAgentJobView(APIView):
         if not job_type:
             return Response({'error': 'job_type is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # 우선순위: 명시하지 않으면 도구를 바로 실행하는 요청(버튼 클릭)은 interactive, 그 외는 normal
+        priorities = {label.lower(): value for value, label in Job.PRIORITY_CHOICES}
+        priority_name = request.data.get('priority') or ('interactive' if payload.get('tool_name') else 'normal')
+        if priority_name not in priorities:
+            return Response(
+                {'error': f"priority must be one of: {', '.join(priorities)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         # payload에 project 정보 추가 (agent가 올바른 repo 경로를 사용하도록)
         if 'project' not in payload:
             payload['project'] = {
@@ -421,14 +471,60 @@ class CreateAgentJobView(APIView):
 
         job = Job.objects.create(
             project=project,
+            requested_by=request.user,
             job_type=job_type,
             payload=payload,
+            priority=priorities[priority_name],
             status='pending'
         )
         serializer = JobSerializer(job)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class JobEventListView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, project_id, job_id):
+        """
+        JobEvent를 seq 커서로 페이지 단위 조회합니다.
+        ?after=<seq>&limit=<n>&kind=progress|tool|output, 응답의 next_cursor를 다음 요청의 after로 사용합니다.
+        """
+        job = get_object_or_404(Job, id=job_id, project_id=project_id)
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), 1000)
+        except ValueError:
+            return Response({'error': 'after and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        events = job.events.filter(seq__gt=after)
+        kind = request.query_params.get('kind')
+        if kind:
+            events = events.filter(kind=kind)
+        page = list(events.order_by('seq')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        return Response({
+            'events': [{'seq': event.seq, 'kind': event.kind, **event_entry(event)} for event in page],
+            'next_cursor': page[-1].seq if page else after,
+            'has_more': has_more,
+        }, status=status.HTTP_200_OK)
+
+
+class JobQueueStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'classes': queue_stats()}, status=status.HTTP_200_OK)
+
+
+class LLMStatsView(APIView):
+    """이 서버 프로세스에서 LLM 게이트웨이가 기록한 제공자/모델별 호출 수, 지연 시간, 토큰 사용량"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'models': llm_gateway.stats()}, status=status.HTTP_200_OK)
+
+
 class JobDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -436,17 +532,9 @@ class JobDetailView(APIView):
         job = get_object_or_404(Job, id=job_id, project_id=project_id)
 
         # 처음 조회할 때 job 타입에 따라 처리 (pending 상태인 경우)
+        # code_generation Job은 codegen_worker 관리 명령이 가져가 실행하므로 그대로 둡니다.
         if job.status == 'pending' and not job.summary:
-            if job.job_type == 'code_generation':
-                # 상태를 미리 running으로 설정하여 중복 스레드 방지
-                job.status = 'running'
-                job.started_at = timezone.now()
-                job.progress_log = (job.progress_log or []) + [
-                    {'percent_complete': 5, 'log_message': f'{job.job_type} 작업 시작...'}
-                ]
-                job.save(update_fields=['status', 'started_at', 'progress_log', 'updated_at'])
-                threading.Thread(target=self._generate_code, args=(job,), daemon=True).start()
-            elif job.job_type == 'repository_analysis':
+            if job.job_type == 'repository_analysis':
                 # ✅ 수정: Agent가 처리하도록 상태를 'assigned'로 변경
                 # (Agent의 /agent/jobs/request에서 'assigned' 상태의 job을 반환하도록 요청)
                 # repository_analysis는 Agent가 처리해야 하므로 queued 상태로 유지하지 않고
@@ -467,162 +555,39 @@ class JobDetailView(APIView):
                 # ⭐ 중요: status를 pending으로 유지하여 Agent가 /agent/jobs/request에서 가져갈 수 있도록
                 # (AgentJobRequestView에서 pending 상태의 job을 assigned로 변경함)
                 job.save(update_fields=['progress_log', 'updated_at'])
-            else:
+            elif job.job_type != 'code_generation':
                 job.status = 'failed'
                 job.error_message = f'Unknown job type: {job.job_type}'
                 job.save(update_fields=['status', 'error_message'])
 
-        serializer = JobSerializer(job)
-        return Response(serializer.data)
-
-    def _generate_code(self, job):
-        """코드 생성 (Anthropic 또는 OpenAI) - code_generation job만 처리"""
-        try:
-            # code_generation job만 처리
-            if job.job_type != 'code_generation':
-                job.status = 'failed'
-                job.error_message = f'This method only handles code_generation jobs, not {job.job_type}'
-                job.save()
-                return
-
-            payload = job.payload or {}
-            prompt = payload.get('prompt', '')
-            language = payload.get('language', 'python')
-
-            if not prompt:
-                job.status = 'failed'
-                job.error_message = 'Prompt is required'
-                job.save()
-                return
-
-            # 진행 상태 로그 시작
-            job.status = 'running'
-            job.started_at = timezone.now()
-            job.progress_log = [
-                {'percent_complete': 10, 'log_message': f'{language.upper()} 코드 생성 준비 중...'},
-            ]
-            job.save()
-
-            # 진행 상황 업데이트
-            job.progress_log.append({'percent_complete': 30, 'log_message': '모델 API에 요청 중...'})
-            job.save()
-
-            # 공통 시스템 프롬프트
-            system_prompt = (
-                f"You are an expert {language} programmer. Generate production-ready code based on the user's request.\n\n"
-                f"Requirements:\n"
-                f"- Write clean, well-commented code\n"
-                f"- Follow {language} best practices\n"
-                f"- Include error handling where appropriate\n"
-                f"- Return ONLY the code, no explanation or markdown formatting"
-            )
-
-            provider = os.getenv('CODEGEN_PROVIDER', 'anthropic').lower()
-            generated_code = None
-
-            if provider == 'langchain':
-                # LangChain 서버 호출 경로
-                base_url = os.getenv('LANGCHAIN_BASE_URL', '').rstrip('/')
-                route = os.getenv('LANGCHAIN_ROUTE', '/generate')
-                url = f"{base_url}{route}" if base_url else ''
-                if not url:
-                    raise RuntimeError('LANGCHAIN_BASE_URL 가 설정되지 않았습니다.')
-                headers = {'Content-Type': 'application/json'}
-                api_key = os.getenv('LANGCHAIN_API_KEY')
-                if api_key:
-                    headers['Authorization'] = f"Bearer {api_key}"
-                body = {
-                    'prompt': prompt,
-                }
-                # 진행 로그 업데이트
-                job.progress_log.append({'percent_complete': 40, 'log_message': f'LangChain 서버 요청: {url}'})
-                job.save()
-                r = requests.post(url, json=body, headers=headers, timeout=60)
-                if r.status_code >= 400:
-                    raise RuntimeError(f"LangChain error {r.status_code}: {r.text}")
-                # 응답 형태: {"rewritten": str, "code": str}
-                data = r.json() if r.headers.get('Content-Type','').startswith('application/json') else {}
-                generated_code = (
-                    data.get('code')
-                    or (data.get('result') or {}).get('code')
-                    or data.get('content')
-                    or r.text
-                )
-                if not generated_code:
-                    raise RuntimeError('LangChain 응답에 code가 없습니다.')
-            elif provider == 'openai':
-                # OpenAI 경로
-                from openai import OpenAI
-                oa_model = os.getenv('OPENAI_CODEGEN_MODEL', 'gpt-4o-mini')
-                oa_client = OpenAI()
-                oa_resp = oa_client.chat.completions.create(
-                    model=oa_model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
-                    max_tokens=2000,
-                    temperature=0.2,
-                )
-                generated_code = (oa_resp.choices[0].message.content or '').strip()
-            else:
-                # Anthropic 경로
-                an_model = os.getenv('ANTHROPIC_MODEL', 'claude-3-5-sonnet-latest')
-                try:
-                    client = anthropic.Anthropic()
-                    response = client.messages.create(
-                        model=an_model,
-                        max_tokens=2000,
-                        messages=[
-                            {"role": "user", "content": prompt}
-                        ],
-                        system=system_prompt
-                    )
-                    generated_code = response.content[0].text if response.content else ''
-                except Exception as ae:
-                    err_text = str(ae)
-                    # 모델 미존재/미할당 오류 시 OpenAI로 폴백 (OPENAI_API_KEY가 존재할 때)
-                    if os.getenv('OPENAI_API_KEY') and ('not_found' in err_text or '404' in err_text or 'model' in err_text):
-                        job.progress_log.append({'percent_complete': 50, 'log_message': 'Anthropic 모델 미가용: OpenAI로 폴백 중...'})
-                        job.save()
-                        try:
-                            from openai import OpenAI
-                            oa_model = os.getenv('OPENAI_CODEGEN_MODEL', 'gpt-4o-mini')
-                            oa_client = OpenAI()
-                            oa_resp = oa_client.chat.completions.create(
-                                model=oa_model,
-                                messages=[
-                                    {"role": "system", "content": system_prompt},
-                                    {"role": "user", "content": prompt},
-                                ],
-                                max_tokens=2000,
-                                temperature=0.2,
-                            )
-                            generated_code = (oa_resp.choices[0].message.content or '').strip()
-                        except Exception as oe:
-                            raise oe
-                    else:
-                        raise ae
-
-            # 진행 상황 업데이트
-            job.progress_log.append({'percent_complete': 75, 'log_message': '코드 생성 완료, 최종 처리 중...'})
-            job.save()
-
-            # 최종 상태 업데이트
-            job.progress_log.append({'percent_complete': 100, 'log_message': '✓ 코드 생성 완료!'})
-            job.status = 'completed'
-            job.summary = generated_code
-            job.completed_at = timezone.now()
-            job.save()
-
-        except Exception as e:
-            error_msg = str(e)
-            job.status = 'failed'
-            job.error_message = error_msg
-            job.progress_log = [
-                {'percent_complete': 0, 'log_message': f'⚠ 오류 발생: {error_msg}'}
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return Response({'error': 'since must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 같은 형식(전체/같은 since)으로 마지막 조회한 이후 바뀐 것이 없으면 본문 없이 304로 응답합니다.
+        etag = job_etag(job, since)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        if since is None:
+            data = JobSerializer(job).data
+        else:
+            # 증분 조회: since 이후의 이벤트와 작은 필드만 반환하고, 결과(summary)는 완료된 뒤에만 포함합니다.
+            data = JobDeltaSerializer(job).data
+            data['incremental'] = True
+            data['since'] = since
+            data['events'] = [
+                {'seq': event.seq, 'kind': event.kind, **event_entry(event)}
+                for event in job.events.filter(seq__gt=since).order_by('seq')
             ]
-            job.save()
+            if since <= 0:
+                data['payload'] = job.payload
+            if job.status in ('completed', 'success', 'failed'):
+                data['summary'] = job.summary
+        return Response(data, headers={'ETag': etag})
 
 
 class ProjectListView(APIView):
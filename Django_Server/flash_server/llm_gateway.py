@@ -0,0 +1,498 @@
+"""
+Django 쪽 모든 모델 호출(code_generation, 퀘스트/히어로 메시지, 퀴즈 생성)이 거치는 LLM 게이트웨이.
+
+- 제공자(anthropic/openai/langchain)별 클라이언트를 프로세스당 하나씩 만들어 HTTP 연결을 재사용합니다.
+- 제공자별 토큰 버킷 속도 제한(분당 요청 수)과 동시 요청 수 제한을 둡니다. (프로세스 단위)
+- 요청마다 타임아웃을 걸고, 일시적 오류(429/5xx/연결 오류)는 지수 백오프로 재시도합니다.
+- fallbacks를 주면 실패 시 다음 제공자로 넘어가고, LLM_HEDGE_SECONDS가 지나도 응답이 없으면 다음 제공자에도
+  동시에 요청해(hedged request) 먼저 성공한 응답을 사용합니다.
+- on_chunk를 주면 응답을 스트리밍으로 받아 조각마다 호출합니다. 첫 조각 이후에는 재시도/fallback하지 않습니다.
+- 제공자/모델별 호출 수, 오류, 재시도, 지연 시간(p50/p95), 첫 조각까지 걸린 시간(TTFT), 토큰 사용량을 기록합니다 (stats()).
+- LLM_MOCK=true이면 모든 호출을 mock 제공자로 보내 네트워크 없이 실행합니다.
+"""
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv('LLM_RETRY_BACKOFF_SECONDS', '1'))
+# 제공자별 분당 요청 수 (예: "anthropic=50,openai=500"), 버킷 크기, 토큰을 기다리는 최대 시간(초)
+LLM_RATE_LIMITS = os.getenv('LLM_RATE_LIMITS', '')
+LLM_RATE_BURST = int(os.getenv('LLM_RATE_BURST', '5'))
+LLM_RATE_WAIT_SECONDS = float(os.getenv('LLM_RATE_WAIT_SECONDS', '30'))
+# 제공자별 동시 요청 수 (예: "anthropic=4,openai=8,langchain=2", 지정하지 않은 제공자는 제한 없음)
+LLM_PROVIDER_CONCURRENCY = os.getenv('LLM_PROVIDER_CONCURRENCY', '')
+# 이 시간(초) 안에 응답이 없으면 fallback 제공자에도 요청합니다. 0이면 실패했을 때만 fallback합니다.
+LLM_HEDGE_SECONDS = float(os.getenv('LLM_HEDGE_SECONDS', '0'))
+LLM_MOCK = os.getenv('LLM_MOCK', 'False').lower() == 'true'
+LLM_MOCK_LATENCY = float(os.getenv('LLM_MOCK_LATENCY', '0'))
+
+DEFAULT_MODELS = {
+    'anthropic': os.getenv('ANTHROPIC_MODEL', 'claude-3-5-sonnet-latest'),
+    'openai': os.getenv('OPENAI_MODEL', 'gpt-4o-mini'),
+    'langchain': 'langchain',
+    'mock': 'mock',
+}
+# 재시도할 HTTP 상태 코드 (529: Anthropic overloaded)
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+TRANSIENT_ERROR_NAMES = {'APIConnectionError', 'APITimeoutError', 'ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout'}
+
+
+class LLMGatewayError(RuntimeError):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _parse_provider_map(value):
+    result = {}
+    for item in value.split(','):
+        name, _, number = item.partition('=')
+        try:
+            result[name.strip().lower()] = float(number)
+        except ValueError:
+            continue
+    return result
+
+
+class TokenBucket:
+    """분당 rate_per_minute개씩 채워지고 최대 burst개까지 쌓이는 토큰 버킷."""
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """토큰 하나를 가져옵니다. timeout 안에 얻지 못하면 False를 반환합니다."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) / self.rate
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+
+
+class _Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def _entry(self, provider, model):
+        key = (provider, model)
+        if key not in self.entries:
+            self.entries[key] = {
+                'calls': 0, 'errors': 0, 'retries': 0, 'fallbacks': 0,
+                'input_tokens': 0, 'output_tokens': 0, 'latency_total': 0.0,
+                'latencies': deque(maxlen=500),
+                'ttfts': deque(maxlen=500),
+            }
+        return self.entries[key]
+
+    def record(self, provider, model, latency, ok, input_tokens=0, output_tokens=0, ttft=None):
+        with self.lock:
+            entry = self._entry(provider, model)
+            entry['calls'] += 1
+            entry['latency_total'] += latency
+            entry['latencies'].append(latency)
+            if ttft is not None:
+                entry['ttfts'].append(ttft)
+            if ok:
+                entry['input_tokens'] += input_tokens
+                entry['output_tokens'] += output_tokens
+            else:
+                entry['errors'] += 1
+
+    def count(self, provider, model, field):
+        with self.lock:
+            self._entry(provider, model)[field] += 1
+
+    def snapshot(self):
+        with self.lock:
+            result = []
+            for (provider, model), entry in sorted(self.entries.items()):
+                latencies = sorted(entry['latencies'])
+                ttfts = sorted(entry['ttfts'])
+
+                def percentile(values, p):
+                    return round(values[min(int(len(values) * p), len(values) - 1)], 3) if values else None
+
+                result.append({
+                    'provider': provider,
+                    'model': model,
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'retries': entry['retries'],
+                    'fallbacks': entry['fallbacks'],
+                    'input_tokens': entry['input_tokens'],
+                    'output_tokens': entry['output_tokens'],
+                    'avg_latency_seconds': round(entry['latency_total'] / entry['calls'], 3) if entry['calls'] else None,
+                    'p50_latency_seconds': percentile(latencies, 0.5),
+                    'p95_latency_seconds': percentile(latencies, 0.95),
+                    'p50_ttft_seconds': percentile(ttfts, 0.5),
+                    'p95_ttft_seconds': percentile(ttfts, 0.95),
+                })
+            return result
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_metrics = _Metrics()
+_lock = threading.Lock()
+_clients = {}
+_buckets = {}
+_slots = {}
+_hedge_executor = None
+_mock_handler = None
+
+
+def _client(provider):
+    """제공자별 SDK 클라이언트를 한 번만 만들어 재사용합니다. (SDK 내부 httpx 연결 풀 유지)"""
+    with _lock:
+        client = _clients.get(provider)
+        if client is None:
+            if provider == 'anthropic':
+                import anthropic
+                client = anthropic.Anthropic(timeout=LLM_TIMEOUT_SECONDS, max_retries=0)
+            elif provider == 'openai':
+                from openai import OpenAI
+                client = OpenAI(timeout=LLM_TIMEOUT_SECONDS, max_retries=0)
+            else:
+                client = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                client.mount('http://', adapter)
+                client.mount('https://', adapter)
+            _clients[provider] = client
+        return client
+
+
+def _bucket(provider):
+    with _lock:
+        if provider not in _buckets:
+            rate = _parse_provider_map(LLM_RATE_LIMITS).get(provider)
+            _buckets[provider] = TokenBucket(rate, LLM_RATE_BURST) if rate and rate > 0 else None
+        return _buckets[provider]
+
+
+@contextmanager
+def _slot(provider):
+    with _lock:
+        if provider not in _slots:
+            limit = _parse_provider_map(LLM_PROVIDER_CONCURRENCY).get(provider)
+            _slots[provider] = threading.BoundedSemaphore(max(int(limit), 1)) if limit else None
+        slot = _slots[provider]
+    if slot is None:
+        yield
+        return
+    with slot:
+        yield
+
+
+def _call_anthropic(model, request):
+    kwargs = {
+        'model': model,
+        'max_tokens': request['max_tokens'] or 1024,
+        'messages': [{'role': 'user', 'content': request['prompt']}],
+        'timeout': request['timeout'],
+    }
+    if request['system']:
+        kwargs['system'] = request['system']
+    if request['temperature'] is not None:
+        kwargs['temperature'] = request['temperature']
+    if request['on_chunk']:
+        with _client('anthropic').messages.stream(**kwargs) as stream:
+            for text in stream.text_stream:
+                request['on_chunk'](text)
+            response = stream.get_final_message()
+    else:
+        response = _client('anthropic').messages.create(**kwargs)
+    text = ''.join(getattr(block, 'text', '') for block in response.content or [])
+    usage = getattr(response, 'usage', None)
+    return text, getattr(usage, 'input_tokens', 0) or 0, getattr(usage, 'output_tokens', 0) or 0
+
+
+def _call_openai(model, request):
+    messages = [{'role': 'system', 'content': request['system']}] if request['system'] else []
+    messages.append({'role': 'user', 'content': request['prompt']})
+    kwargs = {'model': model, 'messages': messages, 'timeout': request['timeout']}
+    if request['max_tokens']:
+        kwargs['max_tokens'] = request['max_tokens']
+    if request['temperature'] is not None:
+        kwargs['temperature'] = request['temperature']
+    if request['json_mode']:
+        kwargs['response_format'] = {'type': 'json_object'}
+    if request['on_chunk']:
+        parts, usage = [], None
+        for chunk in _client('openai').chat.completions.create(stream=True, stream_options={'include_usage': True}, **kwargs):
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                request['on_chunk'](parts[-1])
+            usage = chunk.usage or usage
+        return ''.join(parts), getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0
+    response = _client('openai').chat.completions.create(**kwargs)
+    usage = getattr(response, 'usage', None)
+    return (
+        response.choices[0].message.content or '',
+        getattr(usage, 'prompt_tokens', 0) or 0,
+        getattr(usage, 'completion_tokens', 0) or 0,
+    )
+
+
+def _call_langchain(model, request):
+    """LangChain 서버(/generate 등)에 prompt와 extra_body를 보냅니다. 시스템 프롬프트는 서버가 관리합니다."""
+    base_url = os.getenv('LANGCHAIN_BASE_URL', '').rstrip('/')
+    if not base_url:
+        raise LLMGatewayError('LANGCHAIN_BASE_URL 가 설정되지 않았습니다.')
+    url = f"{base_url}{os.getenv('LANGCHAIN_ROUTE', '/generate')}"
+    headers = {'Content-Type': 'application/json'}
+    api_key = os.getenv('LANGCHAIN_API_KEY')
+    if api_key:
+        headers['Authorization'] = f"Bearer {api_key}"
+    body = {'prompt': request['prompt'], **(request['extra_body'] or {})}
+    r = _client('langchain').post(url, json=body, headers=headers, timeout=request['timeout'])
+    if r.status_code >= 400:
+        raise LLMGatewayError(f"LangChain error {r.status_code}: {r.text}", status_code=r.status_code)
+    # 응답 형태: {"rewritten": str, "code": str}
+    data = r.json() if r.headers.get('Content-Type', '').startswith('application/json') else {}
+    text = data.get('code') or (data.get('result') or {}).get('code') or data.get('content') or r.text
+    if not text:
+        raise LLMGatewayError('LangChain 응답에 code가 없습니다.')
+    # LangChain 서버는 스트리밍을 지원하지 않으므로 전체 응답을 한 조각으로 보냅니다.
+    if request['on_chunk']:
+        request['on_chunk'](text)
+    return text, 0, 0
+
+
+def _call_mock(model, request):
+    if LLM_MOCK_LATENCY > 0:
+        time.sleep(LLM_MOCK_LATENCY)
+    if _mock_handler is not None:
+        text = _mock_handler(dict(request, model=model))
+    elif request['json_mode']:
+        text = '{}'
+    else:
+        first_line = (request['prompt'] or '').strip().splitlines()[0:1]
+        text = f"# mock response ({model})\n# {first_line[0] if first_line else ''}\n"
+    if request['on_chunk']:
+        for start in range(0, len(text), 40):
+            request['on_chunk'](text[start:start + 40])
+    return text, len(request['prompt'] or '') // 4, len(text) // 4
+
+
+_PROVIDERS = {
+    'anthropic': _call_anthropic,
+    'openai': _call_openai,
+    'langchain': _call_langchain,
+    'mock': _call_mock,
+}
+
+
+def provider_available(provider):
+    """provider를 호출할 수 있는 설정(API 키 등)이 있는지 반환합니다. mock 모드에서는 항상 True입니다."""
+    if LLM_MOCK or provider == 'mock':
+        return True
+    if provider == 'anthropic':
+        return bool(os.getenv('ANTHROPIC_API_KEY'))
+    if provider == 'openai':
+        return bool(os.getenv('OPENAI_API_KEY'))
+    if provider == 'langchain':
+        return bool(os.getenv('LANGCHAIN_BASE_URL'))
+    return False
+
+
+def set_mock_handler(handler):
+    """mock 제공자의 응답 함수(handler(request) -> str)를 바꾸고 이전 함수를 반환합니다. (테스트용)"""
+    global _mock_handler
+    previous, _mock_handler = _mock_handler, handler
+    return previous
+
+
+def _is_transient(error):
+    status_code = getattr(error, 'status_code', None)
+    if status_code in TRANSIENT_STATUS_CODES:
+        return True
+    return type(error).__name__ in TRANSIENT_ERROR_NAMES
+
+
+def _call_provider(provider, model, request):
+    """
+    속도 제한/동시 요청 제한 안에서 provider를 호출하고, 일시적 오류는 백오프 후 재시도합니다.
+    스트리밍 중 이미 조각을 보낸 뒤의 오류는 재시도하지 않습니다 (request['stream_state']['emitted']).
+    """
+    call = _PROVIDERS.get(provider)
+    if call is None:
+        raise LLMGatewayError(f'Unknown LLM provider: {provider}')
+    stream_state = request['stream_state']
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        bucket = _bucket(provider)
+        if bucket is not None and not bucket.acquire(LLM_RATE_WAIT_SECONDS):
+            raise LLMGatewayError(f'{provider} 요청 속도 제한 초과 ({LLM_RATE_WAIT_SECONDS:.0f}초 대기)', status_code=429)
+        error = None
+        ttft = []
+        with _slot(provider):
+            started = time.perf_counter()
+            attempt_request = request
+            if request['on_chunk']:
+                def on_chunk(text, user_callback=request['on_chunk']):
+                    if not text:
+                        return
+                    if not ttft:
+                        ttft.append(time.perf_counter() - started)
+                        stream_state['emitted'] = True
+                    user_callback(text)
+                attempt_request = dict(request, on_chunk=on_chunk)
+            try:
+                text, input_tokens, output_tokens = call(model, attempt_request)
+            except Exception as e:
+                error = e
+            latency = time.perf_counter() - started
+        first_chunk = round(ttft[0], 3) if ttft else None
+        if error is None:
+            _metrics.record(provider, model, latency, True, input_tokens, output_tokens, first_chunk)
+            logger.info(f'LLM 호출: {provider}/{model} {latency:.2f}s (TTFT {first_chunk}), 토큰 {input_tokens}/{output_tokens}')
+            return {
+                'text': text,
+                'provider': provider,
+                'model': model,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'latency': round(latency, 3),
+                'ttft': first_chunk,
+            }
+        _metrics.record(provider, model, latency, False, ttft=first_chunk)
+        if attempt >= LLM_MAX_RETRIES or stream_state['emitted'] or not _is_transient(error):
+            raise error
+        delay = LLM_RETRY_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random() / 2)
+        _metrics.count(provider, model, 'retries')
+        logger.warning(f'LLM 호출 재시도 ({attempt + 1}/{LLM_MAX_RETRIES}): {provider}/{model} {delay:.1f}초 후 - {error}')
+        time.sleep(delay)
+
+
+def _executor():
+    global _hedge_executor
+    with _lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='llm-hedge')
+        return _hedge_executor
+
+
+def complete(prompt, system=None, *, provider='openai', model=None, max_tokens=None, temperature=None,
+             json_mode=False, timeout=None, fallbacks=(), hedge_after=None, extra_body=None, on_chunk=None):
+    """
+    모델에 프롬프트를 보내고 {'text', 'provider', 'model', 'input_tokens', 'output_tokens', 'latency', 'ttft', 'fallback'}를
+    반환합니다. fallbacks는 제공자 이름 또는 (제공자, 모델) 목록이며, 설정되지 않은 제공자는 건너뜁니다.
+    on_chunk(text)를 주면 스트리밍으로 받은 조각마다 호출합니다. (이 경우 hedged 요청은 하지 않습니다.)
+    모든 후보가 실패하면 첫 번째 후보의 예외를 다시 발생시킵니다.
+    """
+    request = {
+        'prompt': prompt,
+        'system': system,
+        'max_tokens': max_tokens,
+        'temperature': temperature,
+        'json_mode': json_mode,
+        'timeout': timeout or LLM_TIMEOUT_SECONDS,
+        'extra_body': extra_body,
+        'on_chunk': on_chunk,
+        'stream_state': {'emitted': False},
+    }
+    if LLM_MOCK:
+        candidates = [('mock', 'mock')]
+    else:
+        candidates = [(provider, model or DEFAULT_MODELS.get(provider))]
+        for fallback in fallbacks:
+            name, fallback_model = (fallback, None) if isinstance(fallback, str) else fallback
+            if name != provider and provider_available(name):
+                candidates.append((name, fallback_model or DEFAULT_MODELS.get(name)))
+    hedge_after = LLM_HEDGE_SECONDS if hedge_after is None else hedge_after
+    if on_chunk:
+        # 두 제공자의 조각이 섞이지 않도록 스트리밍은 순차 fallback만 합니다.
+        hedge_after = 0
+
+    if len(candidates) == 1 or hedge_after <= 0:
+        errors = []
+        for index, (name, candidate_model) in enumerate(candidates):
+            if index:
+                _metrics.count(name, candidate_model, 'fallbacks')
+                logger.warning(f'LLM fallback: {candidates[index - 1][0]} 실패 → {name} ({errors[-1]})')
+            try:
+                return dict(_call_provider(name, candidate_model, request), fallback=bool(index))
+            except Exception as e:
+                if request['stream_state']['emitted']:
+                    raise
+                errors.append(e)
+        raise errors[0]
+
+    # hedged: 앞 후보가 hedge_after 안에 끝나지 않거나 실패하면 다음 후보를 함께 실행하고, 먼저 성공한 응답을 씁니다.
+    futures = []
+    for index, (name, candidate_model) in enumerate(candidates):
+        if index:
+            _metrics.count(name, candidate_model, 'fallbacks')
+            logger.warning(f'LLM hedge/fallback: {name}/{candidate_model} 요청 시작')
+        futures.append((index, _executor().submit(_call_provider, name, candidate_model, request)))
+        deadline = None if index == len(candidates) - 1 else time.monotonic() + hedge_after
+        while True:
+            for future_index, future in futures:
+                if future.done() and future.exception() is None:
+                    return dict(future.result(), fallback=bool(future_index))
+            running = [future for _, future in futures if not future.done()]
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not running or (remaining is not None and remaining <= 0):
+                break
+            wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+    raise futures[0][1].exception()
+
+
+def extract_json(text):
+    """응답 텍스트에서 JSON 값을 꺼냅니다. 코드 블록(```json)이나 앞뒤 설명 문장이 있어도 처리합니다."""
+    text = (text or '').strip()
+    fenced = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r'[\[{]', text):
+        try:
+            return decoder.raw_decode(text[match.start():])[0]
+        except json.JSONDecodeError:
+            continue
+    raise LLMGatewayError(f'응답에서 JSON을 찾을 수 없습니다: {text[:200]}')
+
+
+def complete_json(prompt, system=None, **kwargs):
+    """complete()를 호출하고 응답 텍스트를 JSON으로 파싱해 반환합니다."""
+    return extract_json(complete(prompt, system, **kwargs)['text'])
+
+
+def stats():
+    """이 프로세스에서 기록한 제공자/모델별 호출 지표를 반환합니다."""
+    return _metrics.snapshot()
+
+
+def reset_stats():
+    _metrics.reset()
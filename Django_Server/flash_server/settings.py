@@ -145,3 +145,16 @@ REST_FRAMEWORK = {
     )
 }
 
+
+# LLM 설정 (게이미피케이션 퀘스트/히어로 메시지 생성; 모델 호출은 flash_server.llm_gateway를 거칩니다)
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+USE_AI_QUEST_GENERATION = os.getenv('USE_AI_QUEST_GENERATION', 'True').lower() == 'true'
+
+# code_generation 컨텍스트 검색이 서버 디스크에서 직접 읽을 수 있는 프로젝트 루트 (쉼표 구분).
+# 비어 있으면 디스크를 읽지 않고 저장된 file_tree 경로만 사용합니다.
+CODEGEN_CONTEXT_ROOTS = [
+    os.path.realpath(path.strip())
+    for path in os.getenv('CODEGEN_CONTEXT_ROOTS', '').split(',')
+    if path.strip()
+]
@@ -2,9 +2,9 @@
 AI 퀘스트 생성기
 """
 import random
-import json
 from datetime import date
 from django.conf import settings
+from flash_server import llm_gateway
 from .models import DailyQuest, UserProfile, UserEvent
 
 
@@ -19,14 +19,10 @@ def generate_ai_quests_with_llm(user):
         생성된 퀘스트 리스트 (dict)
     """
     try:
-        from openai import OpenAI
-
         # API 키가 없으면 템플릿 사용
-        if not settings.OPENAI_API_KEY:
+        if not llm_gateway.provider_available('openai'):
             return None
 
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
         # 사용자 프로필 정보 가져오기
         profile = UserProfile.objects.filter(user=user).first()
 
@@ -68,28 +64,16 @@ def generate_ai_quests_with_llm(user):
   • 보통 퀘스트: 20-35 XP, 2-4 포인트
   • 어려운 퀘스트: 35-50 XP, 4-5 포인트"""
 
-        # OpenAI API 호출
-        response = client.chat.completions.create(
+        # OpenAI API 호출 (응답에서 JSON 추출)
+        quests_data = llm_gateway.complete_json(
+            prompt,
+            "당신은 게임 퀘스트 생성 전문가입니다. 항상 JSON 형식으로만 응답합니다.",
+            provider='openai',
             model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "당신은 게임 퀘스트 생성 전문가입니다. 항상 JSON 형식으로만 응답합니다."},
-                {"role": "user", "content": prompt}
-            ],
             temperature=0.8,
-            max_tokens=500
+            max_tokens=500,
         )
 
-        # 응답 파싱
-        content = response.choices[0].message.content.strip()
-
-        # JSON 추출 (코드 블록 제거)
-        if '```json' in content:
-            content = content.split('```json')[1].split('```')[0].strip()
-        elif '```' in content:
-            content = content.split('```')[1].split('```')[0].strip()
-
-        quests_data = json.loads(content)
-
         return quests_data
 
     except Exception as e:
@@ -108,17 +92,13 @@ def generate_hero_message(user):
         dict: {"title": "메인 메시지", "subtitle": "보조 메시지"}
     """
     try:
-        from openai import OpenAI
-
         # API 키가 없으면 기본 메시지 사용
-        if not settings.OPENAI_API_KEY:
+        if not llm_gateway.provider_available('openai'):
             print("⚠️ OPENAI_API_KEY가 설정되지 않음")
             return None
 
         print(f"✅ OpenAI API 키 확인됨")
 
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
         # 사용자 프로필 정보 가져오기
         profile = UserProfile.objects.filter(user=user).first()
         print(f"📊 프로필 정보: {profile}")
@@ -152,28 +132,16 @@ def generate_hero_message(user):
 
 **중요:** 매번 다르고 창의적인 메시지를 만들어주세요. 긍정적이고 친근한 톤으로 작성해주세요!"""
 
-        # OpenAI API 호출
-        response = client.chat.completions.create(
+        # OpenAI API 호출 (응답에서 JSON 추출)
+        message_data = llm_gateway.complete_json(
+            prompt,
+            "당신은 학습자를 격려하는 전문가입니다. 항상 JSON 형식으로만 응답합니다.",
+            provider='openai',
             model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "당신은 학습자를 격려하는 전문가입니다. 항상 JSON 형식으로만 응답합니다."},
-                {"role": "user", "content": prompt}
-            ],
             temperature=0.9,
-            max_tokens=200
+            max_tokens=200,
         )
 
-        # 응답 파싱
-        content = response.choices[0].message.content.strip()
-
-        # JSON 추출 (코드 블록 제거)
-        if '```json' in content:
-            content = content.split('```json')[1].split('```')[0].strip()
-        elif '```' in content:
-            content = content.split('```')[1].split('```')[0].strip()
-
-        message_data = json.loads(content)
-
         return message_data
 
     except Exception as e:
@@ -277,7 +245,7 @@ def generate_daily_quests(user, target_date=None):
     quest_data_list = None
 
     # AI로 퀘스트 생성 시도
-    if settings.USE_AI_QUEST_GENERATION and settings.OPENAI_API_KEY:
+    if settings.USE_AI_QUEST_GENERATION and llm_gateway.provider_available('openai'):
         quest_data_list = generate_ai_quests_with_llm(user)
 
     # AI 생성 실패시 템플릿 사용
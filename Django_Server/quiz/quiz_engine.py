@@ -1,14 +1,10 @@
-import os
-import json
-from openai import OpenAI
+from flash_server import llm_gateway
 from .models import Question, Topic, Difficulty
 
 class QuizEngine:
     def __init__(self):
-        api_key = os.environ.get('OPENAI_API_KEY')
-        if not api_key:
+        if not llm_gateway.provider_available('openai'):
             raise ValueError("OPENAI_API_KEY environment variable not set.")
-        self.client = OpenAI(api_key=api_key)
 
     def generate_quiz_question(self, difficulty_name="beginner", topic_name=None):
         """Generates a quiz question using AI and saves it to the database."""
@@ -52,17 +48,14 @@ class QuizEngine:
         }}"""
 
         try:
-            response = self.client.chat.completions.create(
+            quiz_data = llm_gateway.complete_json(
+                f"Please create a '{topic.name}' problem with {difficulty_name} difficulty.",
+                system_prompt,
+                provider='openai',
                 model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Please create a '{topic.name}' problem with {difficulty_name} difficulty."}
-                ],
-                response_format={"type": "json_object"}
+                json_mode=True,
             )
 
-            quiz_data = json.loads(response.choices[0].message.content)
-
             # Create and save the Question object
             question = Question.objects.create(
                 topic=topic,
@@ -2,7 +2,10 @@ import os
 import re
 import uuid
 import time
+import shutil
+import threading
 import logging
+import functools
 from logging.handlers import RotatingFileHandler
 import json
 from datetime import datetime
@@ -20,6 +23,14 @@ from langgraph.prebuilt import ToolExecutor
 
 from git_analyzer import GitAnalyzer
 from git_commit_module import GitCommitModule
+from issue_scanner import IssueScanner
+from commit_ingest import CommitHistoryIngestor
+from code_search import CodeSearchIndex
+from symbol_index import SymbolIndex
+from worktree_pool import get_worktree_pool
+from repo_watcher import start_repo_watcher, get_repo_watcher
+from tool_sandbox import ToolSandbox, SANDBOXED_TOOLS
+from job_checkpoints import JobCheckpointStore
 
 # 로거 설정 (파일 + 콘솔)
 LOG_DIR = "/app/log"
@@ -54,11 +65,43 @@ load_dotenv()
 API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000/api/v1")
 LOCAL_LLM_URL = os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8001/v1")
 REPO_PATH = os.getenv("REPO_PATH", "./test_repo")
+# 인증이 필요한 /git/<project_id>/... 엔드포인트 업로드에 사용하는 JWT 액세스 토큰
+API_TOKEN = os.getenv("API_TOKEN")
+# 분석 프롬프트에 넣을 도구 결과의 최대 길이 (큰 Diff가 컨텍스트를 넘지 않도록)
+ANALYSIS_MAX_BYTES = int(os.getenv("ANALYSIS_MAX_BYTES", "20000"))
+# 인덱스를 변경하는 도구를 메인 체크아웃 대신 임대한 worktree에서 실행하고 작업 브랜치에 커밋합니다.
+# 커밋이 체크아웃된 브랜치가 아닌 작업 브랜치로 가므로 명시적으로 켠 경우에만 사용합니다 (기본값: REPO_PATH에서 실행)
+WORKTREE_ISOLATION = os.getenv("WORKTREE_ISOLATION", "false").lower() == "true"
+MUTATING_TOOLS = {"create_commit", "create_commits_bulk"}
+# REPO_PATH 변경을 감시해 파일 트리/LOC를 미리 갱신합니다. 프로젝트 ID를 지정하면 변경분을 서버에도 업로드합니다.
+REPO_WATCHER_ENABLED = os.getenv("REPO_WATCHER", "false").lower() == "true"
+REPO_WATCH_PROJECT_ID = os.getenv("REPO_WATCH_PROJECT_ID")
+# 분석 도구를 메모리/CPU 제한이 걸린 작업자 프로세스 풀에서 실행합니다 (false면 에이전트 프로세스에서 실행)
+TOOL_SANDBOX_ENABLED = os.getenv("TOOL_SANDBOX", "true").lower() != "false"
+# LangGraph 상태를 노드마다 로컬 SQLite에 저장해 재시작 후 진행 중이던 Job을 이어서 실행합니다
+JOB_CHECKPOINTS_ENABLED = os.getenv("JOB_CHECKPOINTS", "true").lower() != "false"
+JOB_CHECKPOINT_DB = os.getenv("JOB_CHECKPOINT_DB", os.path.join(LOG_DIR, "job_checkpoints.sqlite"))
+
+
+def open_checkpoint_store():
+    if not JOB_CHECKPOINTS_ENABLED:
+        return None
+    try:
+        return JobCheckpointStore(JOB_CHECKPOINT_DB)
+    except Exception as e:
+        logger.warning(f"Job 체크포인트 저장소를 열지 못해 체크포인트 없이 실행합니다: {e}")
+        return None
+
+
+checkpoint_store = open_checkpoint_store()
 
 AGENT_VERSION = os.getenv("AGENT_VERSION", "v1.0.0")
-AGENT_ID = os.getenv("AGENT_ID", f"agent-py-{uuid.uuid4()}")
+# 재시작 후에도 자신의 Job을 이어서 보고할 수 있도록, AGENT_ID가 없으면 체크포인트 저장소에 저장된 ID를 사용합니다.
+AGENT_ID = os.getenv("AGENT_ID") or (checkpoint_store.agent_id() if checkpoint_store else f"agent-py-{uuid.uuid4()}")
 
 job_metrics = defaultdict(dict)
+_tool_sandbox = None
+_tool_sandbox_lock = threading.Lock()
 
 
 class AgentState(TypedDict):
@@ -87,30 +130,154 @@ def ensure_jsonable(value):
     return str(value)
 
 
+def api_headers() -> dict:
+    return {"Authorization": f"Bearer {API_TOKEN}"} if API_TOKEN else {}
+
+
+def job_project_id(job_payload: dict):
+    project = job_payload.get('project')
+    if isinstance(project, dict):
+        return project.get('id')
+    return None
+
+
+def mutating_tool_paths(tool_args: dict) -> list:
+    """변경 도구 인수에서 커밋 대상 경로를 모읍니다."""
+    paths = list(tool_args.get('files_to_add') or [])
+    for spec in tool_args.get('commits') or []:
+        paths += list(spec.get('files') or []) + list(spec.get('deleted') or [])
+        for old_path, new_path in spec.get('renamed') or []:
+            paths += [old_path, new_path]
+    return paths
+
+
+def sync_paths_to_worktree(repo_path: str, worktree_path: str, paths: list):
+    """메인 체크아웃의 파일 내용을 worktree에 복사하고, 메인에 없는 경로는 worktree에서도 삭제합니다."""
+    for path in paths:
+        source = os.path.join(repo_path, path)
+        target = os.path.join(worktree_path, path)
+        if os.path.lexists(source):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.lexists(target):
+                os.remove(target)
+            shutil.copy2(source, target, follow_symlinks=False)
+        elif os.path.lexists(target):
+            os.remove(target)
+
+
+def run_mutating_tool(job_id, job_payload: dict, tool_name: str, tool_args: dict, repo_path: str):
+    """
+    인덱스를 변경하는 도구를 임대한 worktree에서 실행하고, 만들어진 커밋을 작업 브랜치에 반영합니다.
+    작업 브랜치는 payload의 'branch'(기본값: flash/job-<job_id>)이며, 메인 체크아웃의 인덱스는 건드리지 않습니다.
+    """
+    tool_args = dict(tool_args)
+    branch = tool_args.pop('branch', None) or job_payload.get('branch') or f"flash/job-{job_id}"
+    main_commit_module = GitCommitModule(repo_path=repo_path)
+    main_repo = main_commit_module.repo
+    if not main_repo.head.is_detached and main_repo.head.ref.name == branch:
+        # 메인 체크아웃에 체크아웃된 브랜치는 워킹 트리와 어긋나지 않도록 기존처럼 메인에서 커밋합니다.
+        logger.info(f"브랜치 '{branch}'가 메인 체크아웃에 있어 REPO_PATH에서 직접 실행합니다.")
+        return getattr(main_commit_module, tool_name)(**tool_args)
+
+    ref = f"refs/heads/{branch}"
+    old_sha = main_repo.git.rev_parse("--verify", "-q", ref, with_exceptions=False) or None
+    base_sha = old_sha or main_repo.head.commit.hexsha
+    with get_worktree_pool(repo_path).lease(base_sha) as worktree_path:
+        logger.info(f"worktree에서 '{tool_name}' 실행: {worktree_path} (브랜치 {branch})")
+        sync_paths_to_worktree(repo_path, worktree_path, mutating_tool_paths(tool_args))
+        worktree_module = GitCommitModule(repo_path=worktree_path)
+        result = getattr(worktree_module, tool_name)(**tool_args)
+        new_sha = worktree_module.repo.head.commit.hexsha
+        if isinstance(result, dict) and result.get('success') and new_sha != base_sha:
+            # 그 사이 브랜치가 움직였으면 실패하도록 이전 값을 함께 지정합니다(compare-and-swap).
+            main_repo.git.update_ref("-m", f"flash: job {job_id}", ref, new_sha, old_sha or "0" * len(new_sha))
+            result = dict(result, branch=branch)
+    return result
+
+
+def get_tool_sandbox() -> ToolSandbox:
+    global _tool_sandbox
+    with _tool_sandbox_lock:
+        if _tool_sandbox is None:
+            _tool_sandbox = ToolSandbox(api_base_url=API_BASE_URL, headers=api_headers())
+        return _tool_sandbox
+
+
+def sandboxed(func, tool_name: str, repo_path: str):
+    """TOOL_SANDBOX가 켜져 있으면 분석 도구를 작업자 프로세스에서 실행하도록 감쌉니다. (시그니처는 그대로 유지)"""
+    if not TOOL_SANDBOX_ENABLED or tool_name not in SANDBOXED_TOOLS:
+        return func
+
+    @functools.wraps(func)
+    def run_in_sandbox(**kwargs):
+        # watcher가 유지하는 최신 상태는 에이전트 프로세스에만 있으므로 바로 응답합니다.
+        watcher = get_repo_watcher(repo_path)
+        if watcher is not None and watcher.ready and tool_name in ("scan_file_tree", "calculate_loc_per_language"):
+            return func(**kwargs)
+        return get_tool_sandbox().run(repo_path, tool_name, kwargs)
+
+    return run_in_sandbox
+
+
 def create_structured_tools(git_analyzer, git_commit_module):
     """
     인스턴스 메서드를 StructuredTool로 변환합니다.
     """
+    issue_scanner = IssueScanner(git_analyzer, api_base_url=API_BASE_URL, headers=api_headers())
+    commit_ingestor = CommitHistoryIngestor(git_analyzer.repo_path, api_base_url=API_BASE_URL, headers=api_headers())
+    code_search = CodeSearchIndex(git_analyzer)
+    repo_path = git_analyzer.repo_path
+    symbol_index = SymbolIndex(git_analyzer)
     tools = [
         StructuredTool.from_function(
-            func=git_analyzer.scan_file_tree,
+            func=sandboxed(git_analyzer.scan_file_tree, "scan_file_tree", repo_path),
             name="scan_file_tree",
             description="로컬 저장소의 파일/디렉터리 트리를 JSON-호환 dict로 반환합니다."
         ),
         StructuredTool.from_function(
-            func=git_analyzer.calculate_loc_per_language,
+            func=sandboxed(git_analyzer.calculate_loc_per_language, "calculate_loc_per_language", repo_path),
             name="calculate_loc_per_language",
             description="저장소 내 각 프로그래밍 언어별 코드 라인 수(LOC)를 계산합니다."
         ),
+        StructuredTool.from_function(
+            func=sandboxed(git_analyzer.analyze_hotspots, "analyze_hotspots", repo_path),
+            name="analyze_hotspots",
+            description="파일별 변경 이력(churn)과 현재 코드 규모를 결합해 변경이 잦고 큰 핫스팟 파일 순위를 반환합니다."
+        ),
         StructuredTool.from_function(
             func=git_commit_module.create_commit,
             name="create_commit",
             description="지정된 파일들을 스테이징하고 새 커밋을 생성합니다."
         ),
         StructuredTool.from_function(
-            func=git_commit_module.get_diff,
+            func=git_commit_module.create_commits_bulk,
+            name="create_commits_bulk",
+            description="여러 커밋을 임시 인덱스와 plumbing 명령으로 한 번에 작성하고 브랜치를 원자적으로 갱신합니다. 대량 파일 변경에 적합합니다."
+        ),
+        StructuredTool.from_function(
+            func=sandboxed(git_commit_module.get_diff, "get_diff", repo_path),
             name="get_diff",
-            description="특정 커밋 또는 HEAD의 변경 사항(diff)을 반환합니다."
+            description="특정 커밋, HEAD 또는 'base..head' 범위의 변경 사항(diff)을 반환합니다. stat_only, paths, max_bytes, cursor/page_size로 필요한 부분만 가져올 수 있습니다."
+        ),
+        StructuredTool.from_function(
+            func=sandboxed(issue_scanner.scan_issues, "scan_issues", repo_path),
+            name="scan_issues",
+            description="저장소 파일의 정적 이슈(구문 오류, 긴 함수, TODO/FIXME, 대용량 파일)를 검사하고, project_id가 있으면 서버에 업로드합니다."
+        ),
+        StructuredTool.from_function(
+            func=commit_ingestor.ingest_commit_history,
+            name="ingest_commit_history",
+            description="git 커밋 이력을 서버에 저장된 마지막 커밋 이후부터 스트리밍으로 읽어 배치 업로드합니다."
+        ),
+        StructuredTool.from_function(
+            func=sandboxed(code_search.search_code, "search_code", repo_path),
+            name="search_code",
+            description="저장소 코드를 식별자 단위 BM25로 검색해 관련도 높은 파일의 스니펫을 max_bytes 안에서 반환합니다. 파일 전체 대신 필요한 부분만 볼 때 사용합니다."
+        ),
+        StructuredTool.from_function(
+            func=sandboxed(symbol_index.lookup_symbol, "lookup_symbol", repo_path),
+            name="lookup_symbol",
+            description="함수/클래스/메서드가 정의된 위치(symbol)와 특정 모듈을 import하는 파일(module)을 조회합니다."
         ),
     ]
     return tools
@@ -499,7 +666,7 @@ def analyze_tool_results(state: AgentState, llm):
 
         # 도구별 분석 프롬프트 선택
         if tool_name in analysis_prompts:
-            analysis_prompt = analysis_prompts[tool_name].format(result=tool_message.content)
+            analysis_prompt = analysis_prompts[tool_name].format(result=tool_message.content[:ANALYSIS_MAX_BYTES])
             logger.info(f"도구 결과 분석 중: {tool_name}")
 
             # LLM으로 분석
@@ -641,6 +808,183 @@ workflow.add_edge("action", "agent")
 app = workflow.compile()
 
 
+def should_analyze(state: AgentState):
+    """도구 실행 후 분석이 필요한지 판단"""
+    # 분석 대상 도구 목록
+    analysis_tools = ['calculate_loc_per_language', 'get_diff']
+
+    # 마지막 메시지가 ToolMessage인지 확인
+    if not state['messages']:
+        return "end"
+
+    last_msg = state['messages'][-1]
+    if not isinstance(last_msg, ToolMessage):
+        return "end"
+
+    # AIMessage에서 tool_name 찾기
+    tool_name = None
+    for i in range(len(state['messages']) - 2, -1, -1):
+        msg = state['messages'][i]
+        if hasattr(msg, 'tool_calls') and msg.tool_calls:
+            # 마지막 ToolMessage와 일치하는 tool_call 찾기
+            for tool_call in msg.tool_calls:
+                if tool_call.get('id') == last_msg.tool_call_id:
+                    tool_name = tool_call.get('name')
+                    logger.debug(f"분석 결정: 도구명={tool_name}, 분석대상={tool_name in analysis_tools}")
+                    return "analyze" if tool_name in analysis_tools else "end"
+
+    logger.debug("도구명을 찾을 수 없어 분석 스킵")
+    return "end"
+
+
+def build_job_app(job_tool_executor):
+    """Job용 그래프(agent -> action -> analyze)를 만듭니다. 체크포인트 저장소가 있으면 노드마다 상태를 저장합니다."""
+    job_workflow = StateGraph(AgentState)
+    job_workflow.add_node("agent", call_model)
+    job_workflow.add_node("action", lambda state: call_tool_with_executor(state, job_tool_executor))
+    job_workflow.add_node("analyze", lambda state: analyze_tool_results(state, llm_with_tools))
+    job_workflow.set_entry_point("agent")
+    job_workflow.add_conditional_edges(
+        "agent",
+        should_continue,
+        {
+            "continue": "action",
+            "end": END,
+        },
+    )
+    job_workflow.add_conditional_edges(
+        "action",
+        should_analyze,
+        {
+            "analyze": "analyze",
+            "end": END,
+        }
+    )
+    job_workflow.add_edge("analyze", END)
+    return job_workflow.compile(checkpointer=checkpoint_store.saver if checkpoint_store else None)
+
+
+def run_llm_job(job_id, job_type: str, job_payload: dict, job_tool_executor, resume: bool = False):
+    """
+    LLM 기반 Job을 그래프로 실행하고 결과를 보고합니다.
+    resume=True이면 마지막 체크포인트부터 이어서 실행해, 이미 끝난 LLM 호출/도구 실행을 반복하지 않습니다.
+    """
+    job_app = build_job_app(job_tool_executor)
+    config = JobCheckpointStore.config(job_id) if checkpoint_store else None
+
+    inputs = None
+    snapshot = job_app.get_state(config) if resume and config else None
+    if snapshot is None or snapshot.created_at is None:
+        # 새 Job이거나, 첫 노드가 끝나기 전에 중단되어 체크포인트가 없는 경우
+        job_description = build_job_prompt(job_payload, job_type)
+        inputs = {
+            'messages': [HumanMessage(content=job_description)],
+            'job_id': str(job_id),
+            'job_description': job_description,
+            'job_payload': job_payload,
+        }
+
+    if checkpoint_store:
+        checkpoint_store.begin(job_id, AGENT_ID, job_type, job_payload)
+
+    send_heartbeat('assigned', current_job_id=job_id)
+    job_metrics[job_id] = {"tool_calls": 0, "started_at": time.time()}
+    if inputs is not None and not resume:
+        report_job_status(job_id, 'start')
+        logger.info(f"🔄 Job {job_id} 수락 - Agent 처리 시작")
+        report_job_progress(job_id, log_message="Job accepted by agent.", percent_complete=0)
+    elif inputs is not None:
+        logger.info(f"🔁 Job {job_id} 체크포인트 없음 - 처음부터 다시 실행")
+        report_job_progress(job_id, log_message="Agent restarted before the first checkpoint; restarting job.")
+    else:
+        metadata = snapshot.metadata or {}
+        last_nodes = ', '.join((metadata.get('writes') or {}).keys()) or 'start'
+        pending = ', '.join(snapshot.next) or 'finish'
+        logger.info(f"🔁 Job {job_id} 체크포인트에서 재개: step {metadata.get('step')}, 마지막 노드 {last_nodes}, 다음 {pending}")
+        report_job_progress(
+            job_id,
+            log_message=f"Resuming from checkpoint after '{last_nodes}' (step {metadata.get('step')}), next: {pending}",
+        )
+
+    try:
+        send_heartbeat('processing', current_job_id=job_id)
+        logger.info(f"⚙️ Job {job_id} 실행 중...")
+        if inputs is None and not snapshot.next:
+            # 그래프는 끝났지만 완료 보고 전에 중단된 경우
+            final_state = snapshot.values
+        else:
+            final_state = job_app.invoke(inputs, config)
+        final_message = final_state['messages'][-1].content
+        logger.debug(f"Job {job_id} 최종 상태: {final_state}")
+
+
+        logger.info(f"✅ Job {job_id} 실행 완료")
+        logger.info(f"📝 결과 길이: {len(final_message)} 글자")
+
+        report_job_progress(job_id, log_message="Job execution finished.", percent_complete=100)
+        result_url = None
+        metadata = job_payload.get('metadata')
+        if isinstance(metadata, dict):
+            result_url = metadata.get('result_url')
+        report_job_status(job_id, 'complete', summary=final_message, result_url=result_url)
+        if checkpoint_store:
+            checkpoint_store.finish(job_id)
+        logger.info("=" * 80)
+        logger.info(f"🎉 Job {job_id} 정상 완료")
+        logger.info("=" * 80)
+
+    except Exception as job_error:
+        logger.exception(f"❌ Job {job_id} 실패: {job_error}")
+        # 실패 상태를 API 서버에 보고
+        report_job_progress(job_id, log_message=f"Job failed: {job_error}")
+        report_job_status(
+            job_id,
+            'complete',
+            summary=f"An unexpected error occurred: {job_error}",
+            error_message=str(job_error),
+            job_status='failed',
+        )
+        if checkpoint_store:
+            checkpoint_store.finish(job_id)
+        logger.info("=" * 80)
+        logger.error(f"❌ Job {job_id} 오류 완료")
+        logger.info("=" * 80)
+
+    finally:
+        metrics = job_metrics.pop(job_id, {})
+        started_at = metrics.get('started_at') or time.time()
+        metrics['duration_ms'] = int((time.time() - started_at) * 1000)
+        metrics['tool_calls'] = metrics.get('tool_calls', 0)
+        logger.info(f"📊 Job {job_id} 메트릭 - 소요시간: {metrics['duration_ms']}ms, Tool 호출: {metrics['tool_calls']}회")
+        report_telemetry(job_id, metrics)
+        send_heartbeat('idle')
+
+
+def resume_in_flight_jobs():
+    """재시작 전에 이 에이전트가 실행하던 Job을 체크포인트에서 이어서 실행합니다."""
+    if not checkpoint_store:
+        return
+    for job in checkpoint_store.in_flight(AGENT_ID):
+        job_id, job_type, job_payload = job['job_id'], job['job_type'], job['payload']
+        logger.info(f"🔁 중단된 Job 발견: {job_id}, 타입: {job_type}")
+        try:
+            if job_type == 'direct_tool_call' or (job_type == 'repository_analysis' and job_payload.get('tool_name')):
+                # 직접 도구 호출은 체크포인트가 없고 커밋처럼 반복하면 안 되는 도구가 있어 실패로 보고합니다.
+                message = "Agent restarted while the tool was running; please retry the job."
+                report_job_status(job_id, 'complete', summary=message, error_message=message, job_status='failed')
+                checkpoint_store.finish(job_id)
+                continue
+            project_local_path = os.path.normpath(REPO_PATH)
+            job_tools = create_structured_tools(
+                GitAnalyzer(repo_path=project_local_path),
+                GitCommitModule(repo_path=project_local_path),
+            )
+            run_llm_job(job_id, job_type, job_payload, ToolExecutor(job_tools), resume=True)
+        except Exception as exc:
+            logger.error(f"중단된 Job {job_id} 재개 실패: {exc}", exc_info=True)
+            checkpoint_store.finish(job_id)
+
+
 def run_agent():
     logger.info("=" * 80)
     logger.info(f"🚀 Starting agent {AGENT_ID} (version {AGENT_VERSION})...")
@@ -650,6 +994,19 @@ def run_agent():
     logger.info(f"Repository: {REPO_PATH}")
     logger.info("=" * 80)
 
+    if REPO_WATCHER_ENABLED:
+        try:
+            start_repo_watcher(
+                git_analyzer,
+                project_id=int(REPO_WATCH_PROJECT_ID) if REPO_WATCH_PROJECT_ID else None,
+                api_base_url=API_BASE_URL,
+                headers=api_headers(),
+            )
+        except Exception as e:
+            logger.warning(f"저장소 감시를 시작하지 못했습니다: {e}", exc_info=True)
+
+    resume_in_flight_jobs()
+
     while True:
         try:
             send_heartbeat('idle')
@@ -721,6 +1078,8 @@ def run_agent():
                 logger.info(f"🚀 직접 도구 호출 Job 처리 시작: {job_id}")
                 send_heartbeat('processing', current_job_id=job_id)
                 report_job_status(job_id, 'start')
+                if checkpoint_store:
+                    checkpoint_store.begin(job_id, AGENT_ID, job_type, job_payload)
 
                 try:
                     tool_name = job_payload.get("tool_name")
@@ -740,7 +1099,15 @@ def run_agent():
                     if not tool_to_run:
                         raise ValueError(f"'{tool_name}'에 해당하는 도구를 찾을 수 없습니다.")
 
-                    result = tool_to_run.invoke(tool_args)
+                    # project_id를 받는 도구에는 Job의 프로젝트 ID를 기본값으로 전달
+                    project_id = job_project_id(job_payload)
+                    if 'project_id' in tool_to_run.args and 'project_id' not in tool_args and project_id is not None:
+                        tool_args = dict(tool_args, project_id=project_id)
+
+                    if WORKTREE_ISOLATION and tool_name in MUTATING_TOOLS:
+                        result = run_mutating_tool(job_id, job_payload, tool_name, tool_args, project_local_path)
+                    else:
+                        result = tool_to_run.invoke(tool_args)
 
                     # 실행 결과를 tool_invocations에 업데이트
                     report_tool_callback(job_id, tool_name, tool_args, tool_output=ensure_jsonable(result))
@@ -777,7 +1144,18 @@ def run_agent():
                         }
 
                         if tool_name in analysis_prompts:
-                            analysis_prompt = analysis_prompts[tool_name].format(result=str(result))
+                            analysis_input = result.get('diff', '') if isinstance(result, dict) and tool_name == 'get_diff' else str(result)
+                            if tool_name == 'get_diff' and len(analysis_input) > ANALYSIS_MAX_BYTES:
+                                # 큰 Diff는 파일별 통계와 앞부분만 분석 프롬프트에 포함합니다.
+                                # 도구 실행과 같이 샌드박스 작업자에서 다시 조회해 메모리/CPU 제한을 받도록 합니다.
+                                diff_args = {k: v for k, v in tool_args.items() if k in ('commit_hash', 'base', 'paths')}
+                                get_diff = sandboxed(job_git_commit_module.get_diff, "get_diff", project_local_path)
+                                analysis_input = (
+                                    str(get_diff(stat_only=True, **diff_args))
+                                    + "\n\n"
+                                    + str(get_diff(max_bytes=ANALYSIS_MAX_BYTES, **diff_args))
+                                )
+                            analysis_prompt = analysis_prompts[tool_name].format(result=analysis_input)
 
                             try:
                                 analysis_response = llm_for_analysis.invoke([
@@ -795,130 +1173,23 @@ def run_agent():
 
                     report_job_progress(job_id, log_message="Tool execution and analysis finished.", percent_complete=100)
                     report_job_status(job_id, 'complete', summary=final_summary, job_status='success')
+                    if checkpoint_store:
+                        checkpoint_store.finish(job_id)
                     
                     logger.info(f"🎉 직접 도구 호출 Job {job_id} 정상 완료")
 
                 except Exception as e:
                     logger.exception(f"❌ 직접 도구 호출 Job {job_id} 실패: {e}")
                     report_job_status(job_id, 'complete', summary=str(e), error_message=str(e), job_status='failed')
+                    if checkpoint_store:
+                        checkpoint_store.finish(job_id)
                 
                 finally:
                     send_heartbeat('idle')
                     continue # LLM 호출 로직을 건너뛰고 다음 루프로 이동
 
             # --- 기존 LLM 기반 작업 처리 ---
-            job_description = build_job_prompt(job_payload, job_type)
-            
-            # 이 job을 위한 새로운 app 생성
-            job_workflow = StateGraph(AgentState)
-            job_workflow.add_node("agent", call_model)
-            job_workflow.add_node("action", lambda state: call_tool_with_executor(state, job_tool_executor))
-            job_workflow.add_node("analyze", lambda state: analyze_tool_results(state, llm_with_tools))
-            job_workflow.set_entry_point("agent")
-            job_workflow.add_conditional_edges(
-                "agent",
-                should_continue,
-                {
-                    "continue": "action",
-                    "end": END,
-                },
-            )
-            def should_analyze(state: AgentState):
-                """도구 실행 후 분석이 필요한지 판단"""
-                # 분석 대상 도구 목록
-                analysis_tools = ['calculate_loc_per_language', 'get_diff']
-
-                # 마지막 메시지가 ToolMessage인지 확인
-                if not state['messages']:
-                    return "end"
-
-                last_msg = state['messages'][-1]
-                if not isinstance(last_msg, ToolMessage):
-                    return "end"
-
-                # AIMessage에서 tool_name 찾기
-                tool_name = None
-                for i in range(len(state['messages']) - 2, -1, -1):
-                    msg = state['messages'][i]
-                    if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                        # 마지막 ToolMessage와 일치하는 tool_call 찾기
-                        for tool_call in msg.tool_calls:
-                            if tool_call.get('id') == last_msg.tool_call_id:
-                                tool_name = tool_call.get('name')
-                                logger.debug(f"분석 결정: 도구명={tool_name}, 분석대상={tool_name in analysis_tools}")
-                                return "analyze" if tool_name in analysis_tools else "end"
-
-                logger.debug("도구명을 찾을 수 없어 분석 스킵")
-                return "end"
-
-            job_workflow.add_conditional_edges(
-                "action",
-                should_analyze,
-                {
-                    "analyze": "analyze",
-                    "end": END,
-                }
-            )
-            job_workflow.add_edge("analyze", END)
-            job_app = job_workflow.compile()
-
-            send_heartbeat('assigned', current_job_id=job_id)
-            report_job_status(job_id, 'start')
-            job_metrics[job_id] = {"tool_calls": 0, "started_at": time.time()}
-            logger.info(f"🔄 Job {job_id} 수락 - Agent 처리 시작")
-            report_job_progress(job_id, log_message="Job accepted by agent.", percent_complete=0)
-
-            inputs = {
-                'messages': [HumanMessage(content=job_description)],
-                'job_id': str(job_id),
-                'job_description': job_description,
-                'job_payload': job_payload,
-            }
-
-            try:
-                send_heartbeat('processing', current_job_id=job_id)
-                logger.info(f"⚙️ Job {job_id} 실행 중...")
-                final_state = job_app.invoke(inputs)
-                final_message = final_state['messages'][-1].content
-                logger.debug(f"Job {job_id} 최종 상태: {final_state}")
-
-
-                logger.info(f"✅ Job {job_id} 실행 완료")
-                logger.info(f"📝 결과 길이: {len(final_message)} 글자")
-
-                report_job_progress(job_id, log_message="Job execution finished.", percent_complete=100)
-                result_url = None
-                metadata = job_payload.get('metadata')
-                if isinstance(metadata, dict):
-                    result_url = metadata.get('result_url')
-                report_job_status(job_id, 'complete', summary=final_message, result_url=result_url)
-                logger.info("=" * 80)
-                logger.info(f"🎉 Job {job_id} 정상 완료")
-                logger.info("=" * 80)
-
-            except Exception as job_error:
-                logger.exception(f"❌ Job {job_id} 실패: {job_error}")
-                # 실패 상태를 API 서버에 보고
-                report_job_progress(job_id, log_message=f"Job failed: {job_error}")
-                report_job_status(
-                    job_id,
-                    'complete',
-                    summary=f"An unexpected error occurred: {job_error}",
-                    error_message=str(job_error),
-                    job_status='failed',
-                )
-                logger.info("=" * 80)
-                logger.error(f"❌ Job {job_id} 오류 완료")
-                logger.info("=" * 80)
-
-            finally:
-                metrics = job_metrics.pop(job_id, {})
-                started_at = metrics.get('started_at') or time.time()
-                metrics['duration_ms'] = int((time.time() - started_at) * 1000)
-                metrics['tool_calls'] = metrics.get('tool_calls', 0)
-                logger.info(f"📊 Job {job_id} 메트릭 - 소요시간: {metrics['duration_ms']}ms, Tool 호출: {metrics['tool_calls']}회")
-                report_telemetry(job_id, metrics)
-                send_heartbeat('idle')
+            run_llm_job(job_id, job_type, job_payload, job_tool_executor)
 
         except requests.RequestException as exc:
             logger.error(f"Could not connect to API server: {exc}. Retrying in 30 seconds...")
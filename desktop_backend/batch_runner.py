@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+# 인자 없이 실행할 수 있는 기본 분석 도구
+DEFAULT_BATCH_TOOLS = ["scan_file_tree", "calculate_loc_per_language", "analyze_hotspots", "scan_issues"]
+# 작업자 프로세스 하나가 처리할 저장소 수 (저장소별 캐시가 쌓이지 않도록 주기적으로 새 프로세스로 교체)
+BATCH_TASKS_PER_CHILD = int(os.getenv("BATCH_TASKS_PER_CHILD", "16"))
+
+
+def run_repo(repo_path: str, tool_names: list, tool_args: dict) -> dict:
+    """
+    저장소 하나에 대해 도구들을 순서대로 실행하고, 도구별 결과와 소요 시간을 담은 레코드를 반환합니다.
+    (프로세스 풀에서 실행되므로 모듈 최상위 함수로 둡니다.)
+    """
+    from tool_sandbox import build_analysis_tools
+    from git_object_reader import close_object_readers
+
+    started = time.perf_counter()
+    record = {"repo": repo_path, "ok": True, "tools": {}}
+    try:
+        tools = build_analysis_tools(repo_path)
+        for name in tool_names:
+            tool_started = time.perf_counter()
+            try:
+                result = tools[name](**tool_args.get(name, {}))
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            if isinstance(result, dict) and "error" in result:
+                record["ok"] = False
+            record["tools"][name] = {
+                "elapsed": round(time.perf_counter() - tool_started, 3),
+                "result": result,
+            }
+    except Exception as e:
+        record["ok"] = False
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        # 다음 저장소로 넘어가기 전에 이 저장소의 cat-file 프로세스를 정리합니다.
+        close_object_readers()
+    record["elapsed"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(repo_paths: list, tool_names: list, tool_args: dict = None, workers: int = None, output=None) -> dict:
+    """
+    여러 저장소를 프로세스 풀에서 분석하고, 끝나는 순서대로 저장소별 결과를 NDJSON 한 줄씩 output에 씁니다.
+    전체 요약(저장소 수, 실패 수, 소요 시간, 처리량)을 반환합니다.
+    """
+    tool_args = tool_args or {}
+    output = output or sys.stdout
+    workers = max(1, min(workers or os.cpu_count() or 1, len(repo_paths) or 1))
+    started = time.perf_counter()
+    failed = 0
+
+    def write(record):
+        output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        output.flush()
+
+    # 에이전트와 같은 이유(스레드를 쓰는 cat-file 리더)로 fork 대신 forkserver를 사용합니다.
+    context = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             max_tasks_per_child=BATCH_TASKS_PER_CHILD) as executor:
+        futures = {
+            executor.submit(run_repo, repo_path, tool_names, tool_args): repo_path
+            for repo_path in repo_paths
+        }
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                # 작업자 프로세스가 비정상 종료한 경우
+                record = {"repo": futures[future], "ok": False, "error": f"{type(e).__name__}: {e}"}
+            if not record["ok"]:
+                failed += 1
+                logger.warning(f"배치 분석 실패: {record['repo']}")
+            write(record)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "repos": len(repo_paths),
+        "failed": failed,
+        "workers": workers,
+        "elapsed": round(elapsed, 3),
+        "repos_per_second": round(len(repo_paths) / elapsed, 3) if elapsed > 0 else None,
+    }
+    logger.info(f"배치 분석 완료: {summary}")
+    return summary
+
+
+def _read_repo_list(path: str) -> list:
+    handle = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        return [line.strip() for line in handle if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def main(argv: list = None) -> int:
+    """`python main.py batch ...` 진입점. 실패한 저장소가 있으면 1을 반환합니다."""
+    from tool_sandbox import SANDBOXED_TOOLS
+
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="여러 저장소에 분석 도구를 실행하고 결과를 NDJSON으로 출력합니다 (Django/LLM 불필요).",
+    )
+    parser.add_argument("repos", nargs="*", help="분석할 저장소 경로")
+    parser.add_argument("--repos-file", help="저장소 경로 목록 파일 (한 줄에 하나, '-'이면 표준 입력)")
+    parser.add_argument("--tools", default=",".join(DEFAULT_BATCH_TOOLS),
+                        help=f"쉼표로 구분한 도구 이름 (사용 가능: {', '.join(sorted(SANDBOXED_TOOLS))})")
+    parser.add_argument("--tool-args", default="{}",
+                        help='도구별 인자 JSON, 예: \'{"search_code": {"query": "login"}}\'')
+    parser.add_argument("--workers", type=int, default=None, help="작업자 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--output", "-o", default="-", help="결과 NDJSON 파일 (기본: 표준 출력)")
+    args = parser.parse_args(argv)
+
+    repo_paths = list(args.repos)
+    if args.repos_file:
+        repo_paths.extend(_read_repo_list(args.repos_file))
+    if not repo_paths:
+        parser.error("분석할 저장소가 없습니다.")
+
+    tool_names = [name.strip() for name in args.tools.split(",") if name.strip()]
+    unknown = [name for name in tool_names if name not in SANDBOXED_TOOLS]
+    if unknown:
+        parser.error(f"알 수 없는 도구: {', '.join(unknown)}")
+    try:
+        tool_args = json.loads(args.tool_args)
+    except json.JSONDecodeError as e:
+        parser.error(f"--tool-args JSON 파싱 실패: {e}")
+    if not isinstance(tool_args, dict):
+        parser.error("--tool-args는 {도구 이름: 인자 객체} 형태여야 합니다.")
+
+    if args.output == "-":
+        summary = run_batch(repo_paths, tool_names, tool_args, args.workers)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            summary = run_batch(repo_paths, tool_names, tool_args, args.workers, output)
+    return 1 if summary["failed"] else 0
@@ -0,0 +1,72 @@
+"""
+blob SHA 단위로 파일 분석 결과를 캐시하는 도구(issue_scanner, code_search, symbol_index)의 공용 부분.
+
+- run_batched: 새로 분석할 항목이 적으면 현재 프로세스에서, 많으면 프로세스 풀에서 청크 단위로 처리합니다.
+- load_json / save_json: .git/flash 아래의 캐시 파일을 읽고 씁니다. 임시 파일 이름을 mkstemp로 만들기 때문에
+  샌드박스 작업자나 배치 실행처럼 여러 프로세스가 같은 캐시를 동시에 저장해도 서로의 임시 파일을 덮어쓰지 않습니다.
+- get_loaded_index: 캐시 파일 경로별 메모리 색인을 프로세스 안에서 공유합니다.
+"""
+import os
+import json
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# 이 개수 이하의 항목은 프로세스 풀을 띄우지 않고 현재 프로세스에서 처리합니다.
+POOL_THRESHOLD = 32
+
+
+def run_batched(func, items: list, max_workers: int = None, *args) -> list:
+    """
+    func(batch, *args)를 items의 청크마다 실행하고 결과 목록을 이어 붙여 반환합니다.
+    func는 프로세스 풀에서 실행될 수 있으므로 모듈 최상위 함수여야 합니다.
+    """
+    if len(items) <= POOL_THRESHOLD:
+        return func(items, *args)
+    workers = max_workers or os.cpu_count() or 1
+    chunk_size = max(1, len(items) // (workers * 4))
+    batches = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch_result in executor.map(func, batches, *[[arg] * len(batches) for arg in args]):
+            results.extend(batch_result)
+    return results
+
+
+def load_json(path: str) -> dict:
+    """캐시 파일을 읽습니다. 없거나 손상되었으면 빈 dict를 반환합니다."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_json(path: str, data: dict):
+    """같은 디렉터리의 고유한 임시 파일에 쓴 뒤 원자적으로 교체합니다."""
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{name}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+_loaded_indexes = {}
+_loaded_indexes_lock = threading.Lock()
+
+
+def get_loaded_index(path: str, factory):
+    """path의 캐시로 factory(dict)가 만든 메모리 색인을 반환합니다. 처음 요청할 때만 파일을 읽습니다."""
+    with _loaded_indexes_lock:
+        index = _loaded_indexes.get(path)
+        if index is None:
+            index = factory(load_json(path))
+            _loaded_indexes[path] = index
+        return index
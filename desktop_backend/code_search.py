@@ -0,0 +1,214 @@
+import os
+import re
+import math
+import logging
+import threading
+
+from blob_cache import get_loaded_index, run_batched, save_json
+
+logger = logging.getLogger(__name__)
+
+# 토큰화 규칙이나 색인 형식이 바뀌면 버전을 올려 기존 색인을 무효화합니다.
+INDEX_VERSION = "1"
+MAX_FILE_BYTES = 1024 * 1024
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+SUBWORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+SNIPPET_CONTEXT_LINES = 3
+
+
+def tokenize(text: str) -> list:
+    """
+    식별자 단위로 토큰화합니다. 식별자 전체와 함께 snake_case/camelCase를 나눈 부분 단어도 토큰으로 만듭니다.
+    예: "getUserName" -> ["getusername", "get", "user", "name"]
+    """
+    tokens = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        lowered = identifier.lower()
+        if len(lowered) > 1:
+            tokens.append(lowered)
+        parts = [part.lower() for chunk in identifier.split("_") for part in SUBWORD_PATTERN.findall(chunk)]
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if len(part) > 1 and not part.isdigit())
+    return tokens
+
+
+def index_file(full_path: str):
+    """
+    파일 하나의 (문서 길이, {토큰: 빈도})를 반환합니다. 바이너리이거나 너무 큰 파일은 None을 반환합니다.
+    (프로세스 풀에서 실행되므로 모듈 최상위 함수로 둡니다.)
+    """
+    try:
+        if os.path.getsize(full_path) > MAX_FILE_BYTES:
+            return None
+        with open(full_path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    if b"\0" in raw[:8192]:
+        return None
+    tokens = tokenize(raw.decode("utf-8", errors="replace"))
+    frequencies = {}
+    for token in tokens:
+        frequencies[token] = frequencies.get(token, 0) + 1
+    return [len(tokens), frequencies]
+
+
+def _index_batch(batch: list) -> list:
+    return [(sha, index_file(full_path)) for sha, full_path in batch]
+
+
+class _LoadedIndex:
+    """디스크 색인과 메모리 역색인을 함께 보관합니다. 프로세스 안에서 저장소별로 공유됩니다."""
+
+    def __init__(self, docs: dict):
+        self.docs = docs  # blob SHA -> [문서 길이, {토큰: 빈도}] (색인 불가 파일은 None)
+        self.postings = {}  # 토큰 -> {blob SHA: 빈도}
+        for sha, doc in docs.items():
+            self._add_postings(sha, doc)
+        self.lock = threading.Lock()
+
+    def _add_postings(self, sha: str, doc):
+        if doc is None:
+            return
+        for token, count in doc[1].items():
+            self.postings.setdefault(token, {})[sha] = count
+
+    def add(self, sha: str, doc):
+        self.docs[sha] = doc
+        self._add_postings(sha, doc)
+
+    def remove(self, sha: str):
+        doc = self.docs.pop(sha, None)
+        if doc is None:
+            return
+        for token in doc[1]:
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(sha, None)
+                if not postings:
+                    del self.postings[token]
+
+
+class CodeSearchIndex:
+    """
+    저장소 소스에 대한 BM25 역색인 기반 코드 검색 도구.
+    - 색인은 blob SHA 단위로 .git/flash/search에 저장되어 변경된 파일만 다시 색인합니다.
+    - 검색 결과는 상위 파일의 관련 줄 주변 스니펫을 바이트 예산 안에서 반환합니다.
+    """
+
+    def __init__(self, git_analyzer, max_workers: int = None):
+        self.git_analyzer = git_analyzer
+        self.repo_path = git_analyzer.repo_path
+        self.max_workers = max_workers
+        self.index_path = os.path.join(git_analyzer.get_cache_dir("search"), f"v{INDEX_VERSION}.json")
+
+    def _load(self) -> _LoadedIndex:
+        return get_loaded_index(self.index_path, _LoadedIndex)
+
+    def update(self) -> tuple:
+        """
+        추적 중인 파일의 blob SHA와 색인을 비교해 새 blob만 색인하고 사라진 blob을 제거합니다.
+        {경로: blob SHA}, 색인 객체, 새로 색인한 파일 수를 반환합니다.
+        """
+        blob_shas = self.git_analyzer.get_blob_shas()
+        index = self._load()
+        with index.lock:
+            pending = {}
+            for path, sha in blob_shas.items():
+                if sha not in index.docs and sha not in pending:
+                    pending[sha] = os.path.join(self.repo_path, path)
+
+            results = run_batched(_index_batch, list(pending.items()), self.max_workers)
+            for sha, doc in results:
+                index.add(sha, doc)
+            live = set(blob_shas.values())
+            stale = [sha for sha in index.docs if sha not in live]
+            for sha in stale:
+                index.remove(sha)
+            if results or stale:
+                save_json(self.index_path, index.docs)
+        logger.info(f"코드 검색 색인 갱신: 전체 {len(blob_shas)}개, 새로 색인 {len(results)}개, 제거 {len(stale)}개")
+        return blob_shas, index, len(results)
+
+    def _snippet(self, path: str, terms: set, budget: int):
+        """질의 토큰이 가장 많이 나오는 줄 주변을 잘라 (시작 줄 번호, 스니펫)으로 반환합니다."""
+        try:
+            with open(os.path.join(self.repo_path, path), "r", encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None, ""
+        best_line, best_hits = 0, 0
+        for line_no, line in enumerate(lines):
+            hits = sum(1 for token in tokenize(line) if token in terms)
+            if hits > best_hits:
+                best_line, best_hits = line_no, hits
+        start = max(0, best_line - SNIPPET_CONTEXT_LINES)
+        end = min(len(lines), best_line + SNIPPET_CONTEXT_LINES + 1)
+        snippet = "\n".join(f"{start + i + 1}: {line}" for i, line in enumerate(lines[start:end]))
+        encoded = snippet.encode("utf-8")
+        if len(encoded) > budget:
+            snippet = encoded[:budget].decode("utf-8", errors="ignore")
+        return best_line + 1, snippet
+
+    def search(self, query: str, top_k: int = 10, max_bytes: int = 4000) -> dict:
+        """식별자 단위 BM25로 저장소 코드를 검색해 상위 파일과 관련 스니펫을 반환합니다."""
+        blob_shas, index, newly_indexed = self.update()
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return {"query": query, "results": [], "indexed_files": len(blob_shas)}
+
+        paths_by_sha = {}
+        for path, sha in sorted(blob_shas.items()):
+            paths_by_sha.setdefault(sha, []).append(path)
+
+        with index.lock:
+            doc_count = sum(1 for doc in index.docs.values() if doc is not None) or 1
+            avg_length = sum(doc[0] for doc in index.docs.values() if doc is not None) / doc_count or 1
+            scores = {}
+            for term in terms:
+                postings = index.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for sha, tf in postings.items():
+                    length = index.docs[sha][0]
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[sha] = scores.get(sha, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+        results = []
+        remaining = max_bytes
+        term_set = set(terms)
+        for sha, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            if len(results) >= top_k or remaining <= 0:
+                break
+            paths = paths_by_sha.get(sha)
+            if not paths:
+                continue
+            line, snippet = self._snippet(paths[0], term_set, remaining)
+            remaining -= len(snippet.encode("utf-8"))
+            results.append({
+                "path": paths[0],
+                "other_paths": paths[1:],
+                "score": round(score, 4),
+                "line": line,
+                "snippet": snippet,
+            })
+        return {
+            "query": query,
+            "results": results,
+            "indexed_files": len(blob_shas),
+            "newly_indexed": newly_indexed,
+        }
+
+    def search_code(self, query: str, top_k: int = 10, max_bytes: int = 4000) -> dict:
+        """저장소 코드를 식별자 단위 BM25로 검색해 관련도 높은 파일의 스니펫을 max_bytes 안에서 반환합니다."""
+        try:
+            return self.search(query, top_k=top_k, max_bytes=max_bytes)
+        except Exception as e:
+            logger.error(f"코드 검색 중 에러 발생: {e}", exc_info=True)
+            return {"error": str(e)}
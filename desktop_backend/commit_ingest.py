@@ -0,0 +1,128 @@
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from git_object_reader import get_object_reader
+
+logger = logging.getLogger(__name__)
+
+# git log 레코드 구분자(RS)와 필드 구분자(NUL)
+RECORD_SEP = b"\x1e"
+FIELD_SEP = b"\x00"
+LOG_FORMAT = "--format=%x1e%H%x00%ae%x00%cI%x00%B"
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_git_log(repo_path: str, rev_range: str):
+    """
+    git log 출력을 파이프로 읽으면서 커밋 dict를 하나씩 생성합니다.
+    전체 이력을 메모리에 올리지 않으며, 오래된 커밋부터 순서대로 반환합니다.
+    """
+    cmd = ["git", "log", "--reverse", LOG_FORMAT, rev_range]
+    proc = subprocess.Popen(cmd, cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    buffer = b""
+    try:
+        while True:
+            chunk = proc.stdout.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+            records = buffer.split(RECORD_SEP)
+            # 마지막 조각은 아직 끝나지 않은 레코드일 수 있으므로 남겨둡니다.
+            buffer = records.pop()
+            for record in records:
+                if record:
+                    yield _parse_record(record)
+        if buffer:
+            yield _parse_record(buffer)
+        stderr = proc.stderr.read().decode("utf-8", errors="replace")
+        if proc.wait() != 0:
+            raise RuntimeError(f"git log failed: {stderr.strip()}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def _parse_record(record: bytes) -> dict:
+    commit_hash, author_email, timestamp, message = record.split(FIELD_SEP, 3)
+    return {
+        "commit_hash": commit_hash.decode("ascii").strip(),
+        "author_email": author_email.decode("utf-8", errors="replace"),
+        "timestamp": timestamp.decode("ascii"),
+        "message": message.decode("utf-8", errors="replace").strip(),
+    }
+
+
+class CommitHistoryIngestor:
+    """
+    git log 이력을 스트리밍으로 읽어 ProjectCommitsView의 bulk 엔드포인트로 업로드하는 도구.
+    서버에 저장된 마지막 커밋 이후부터 이어서 수집합니다.
+    """
+
+    def __init__(self, repo_path: str, api_base_url: str, headers: dict = None):
+        self.repo_path = repo_path
+        self.api_base_url = api_base_url
+        self.headers = headers or {}
+
+    def _last_stored_commit(self, session: requests.Session, project_id: int):
+        response = session.get(f"{self.api_base_url}/git/{project_id}/commits", params={"limit": 1}, timeout=30)
+        response.raise_for_status()
+        commits = response.json()
+        return commits[0]["commit_hash"] if commits else None
+
+    def _is_local_commit(self, commit_hash: str) -> bool:
+        return get_object_reader(self.repo_path).object_info(f"{commit_hash}^{{commit}}") is not None
+
+    def ingest_commit_history(self, project_id: int, batch_size: int = 1000) -> dict:
+        """git 커밋 이력을 서버에 저장된 마지막 커밋 이후부터 스트리밍으로 읽어 배치 업로드합니다."""
+        logger.info(f"커밋 이력 수집 시작: {self.repo_path} (project_id={project_id})")
+        endpoint = f"{self.api_base_url}/git/{project_id}/commits/bulk"
+        ingested = 0
+        batches = 0
+        try:
+            with requests.Session() as session, ThreadPoolExecutor(max_workers=1) as uploader:
+                session.headers.update(self.headers)
+
+                last_hash = self._last_stored_commit(session, project_id)
+                if last_hash and self._is_local_commit(last_hash):
+                    rev_range = f"{last_hash}..HEAD"
+                else:
+                    if last_hash:
+                        logger.warning(f"서버의 마지막 커밋 {last_hash}을 로컬에서 찾을 수 없어 전체 이력을 수집합니다.")
+                    rev_range = "HEAD"
+                logger.debug(f"수집 범위: {rev_range}")
+
+                def post_batch(batch):
+                    session.post(endpoint, json={"commits": batch}, timeout=120).raise_for_status()
+                    return len(batch)
+
+                # git을 읽는 동안 직전 배치를 업로드하도록 업로드는 최대 1건만 진행 중으로 유지합니다.
+                in_flight = None
+                batch = []
+                for commit in iter_git_log(self.repo_path, rev_range):
+                    batch.append(commit)
+                    if len(batch) >= batch_size:
+                        if in_flight is not None:
+                            ingested += in_flight.result()
+                        in_flight = uploader.submit(post_batch, batch)
+                        batches += 1
+                        batch = []
+                if in_flight is not None:
+                    ingested += in_flight.result()
+                if batch:
+                    ingested += post_batch(batch)
+                    batches += 1
+
+            logger.info(f"커밋 이력 수집 완료: {ingested}개 커밋, {batches}개 배치")
+            return {"ingested": ingested, "batches": batches, "resumed_from": last_hash if rev_range != "HEAD" else None}
+        except requests.RequestException as e:
+            logger.error(f"커밋 업로드 실패: {e}", exc_info=True)
+            return {"error": f"Commit upload failed: {e}", "ingested": ingested}
+        except Exception as e:
+            logger.error(f"커밋 이력 수집 중 에러 발생: {e}", exc_info=True)
+            return {"error": str(e), "ingested": ingested}
@@ -1,9 +1,15 @@
 
 import os
+import json
+import subprocess
 from git import Repo, GitCommandError
 from langchain.tools import tool
 import logging
 
+from blob_cache import load_json, save_json
+from git_object_reader import get_object_reader
+from repo_watcher import get_repo_watcher
+
 # agent.py 또는 main.py에서 설정한 로거를 가져옵니다.
 logger = logging.getLogger(__name__)
 
@@ -15,6 +21,27 @@ class GitAnalyzer:
     - 언어별 코드 라인 수(LOC) 계산
     """
 
+    IGNORE_DIRS = {'.git', '__pycache__', '.mypy_cache', '.pytest_cache', '.venv', 'node_modules'}
+    IGNORE_FILES = {'.DS_Store', 'Thumbs.db'}
+
+    # 언어별 확장자 매핑
+    LANGUAGE_MAP = {
+        '.py': 'Python',
+        '.js': 'JavaScript',
+        '.ts': 'TypeScript',
+        '.java': 'Java',
+        '.c': 'C',
+        '.h': 'C',
+        '.cpp': 'C++',
+        '.hpp': 'C++',
+        '.cs': 'C#',
+        '.go': 'Go',
+        '.rs': 'Rust',
+        '.md': 'Markdown',
+        '.html': 'HTML',
+        '.css': 'CSS',
+    }
+
     def __init__(self, repo_path: str):
         logger.debug(f"GitAnalyzer 초기화 시도: {repo_path}")
         if not os.path.isdir(repo_path):
@@ -24,16 +51,105 @@ class GitAnalyzer:
         try:
             self.repo = Repo(repo_path)
             self.repo_path = repo_path
+            # 커밋 시점 트리의 목록/blob 크기 조회는 저장소별로 공유되는 cat-file 프로세스를 사용합니다.
+            # (워킹 트리 스캔은 디스크를 직접 읽습니다.)
+            self.objects = get_object_reader(repo_path)
             logger.info(f"GitAnalyzer가 성공적으로 초기화되었습니다: {repo_path}")
         except Exception as e:
             logger.error(f"저장소 초기화 실패: {repo_path} - {e}", exc_info=True)
             raise
 
-    def scan_file_tree(self) -> dict:
-        """로컬 저장소의 파일/디렉터리 트리를 JSON-호환 dict로 반환합니다."""
-        logger.info(f"파일 트리 스캔 시작: {self.repo_path}")
-        ignore_dirs = {'.git', '__pycache__', '.mypy_cache', '.pytest_cache', '.venv', 'node_modules'}
-        ignore_files = {'.DS_Store', 'Thumbs.db'}
+    def get_cache_dir(self, name: str) -> str:
+        """저장소별 분석 캐시 디렉터리(.git/flash/<name>)를 생성하고 경로를 반환합니다."""
+        cache_dir = os.path.join(self.repo.git_dir, "flash", name)
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+
+    @staticmethod
+    def count_loc(full_path: str) -> int:
+        """파일의 비어 있지 않은 줄 수를 반환합니다."""
+        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return sum(1 for line in f if line.strip())
+
+    @classmethod
+    def sort_tree(cls, node: dict):
+        """디렉터리를 먼저, 같은 종류는 이름순으로 트리의 자식들을 정렬합니다."""
+        children = node.get("children", [])
+        children.sort(key=lambda child: (child.get("type") != "directory", child.get("name", "").lower()))
+        for child in children:
+            if child.get("type") == "directory":
+                cls.sort_tree(child)
+
+    def get_blob_shas(self) -> dict:
+        """
+        추적 중인 파일별 blob SHA를 반환합니다.
+        인덱스의 SHA를 기본으로 사용하고, 워킹 트리에서 수정된 파일은 hash-object로 다시 계산합니다.
+        인덱스 항목과 수정된 파일 목록을 `ls-files -t` 한 번으로 함께 읽으므로, 수정된 파일이 없으면 git을 한 번만 실행합니다.
+        """
+        blob_shas = {}
+        modified = []
+        for entry in self.repo.git.ls_files("-s", "-c", "-m", "-t", "-z").split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            tag, mode, sha, _stage = meta.split(" ")
+            # 서브모듈(160000)과 심볼릭 링크(120000)는 파일 내용 분석 대상이 아닙니다.
+            if mode in ("160000", "120000"):
+                continue
+            if tag == "C":
+                modified.append(path)
+            else:
+                blob_shas[path] = sha
+
+        existing = [path for path in modified if os.path.isfile(os.path.join(self.repo_path, path))]
+        for path in modified:
+            if path not in existing:
+                blob_shas.pop(path, None)
+        if existing:
+            result = subprocess.run(
+                ["git", "hash-object", "--stdin-paths"],
+                input="\n".join(existing),
+                cwd=self.repo_path,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            for path, sha in zip(existing, result.stdout.split()):
+                blob_shas[path] = sha
+        logger.debug(f"{len(blob_shas)}개 파일의 blob SHA 계산 완료 (수정됨: {len(existing)}개)")
+        return blob_shas
+
+    def _scan_revision_tree(self, rev: str) -> dict:
+        """커밋(또는 트리)의 파일 트리를 워킹 트리 대신 Git 객체 DB에서 읽어 구성합니다."""
+        root_name = os.path.basename(os.path.abspath(self.repo_path).rstrip(os.sep)) or "repository"
+        tree = {"name": root_name, "path": ".", "type": "directory", "children": []}
+        blob_nodes = []
+        pending = [(f"{rev}^{{tree}}", tree)]
+        while pending:
+            tree_ish, node = pending.pop()
+            for mode, entry_type, sha, name in self.objects.list_tree(tree_ish):
+                rel_path = name if node["path"] == "." else f"{node['path']}/{name}"
+                if entry_type == "tree":
+                    if name in self.IGNORE_DIRS:
+                        continue
+                    child = {"name": name, "path": rel_path, "type": "directory", "children": []}
+                    node["children"].append(child)
+                    pending.append((sha, child))
+                elif entry_type == "blob" and name not in self.IGNORE_FILES:
+                    child = {"name": name, "path": rel_path, "type": "file", "size": None}
+                    node["children"].append(child)
+                    blob_nodes.append((sha, child))
+
+        sizes = self.objects.object_sizes(list({sha for sha, _ in blob_nodes}))
+        for sha, child in blob_nodes:
+            child["size"] = sizes.get(sha)
+        return tree
+
+    def scan_file_tree(self, rev: str = None) -> dict:
+        """로컬 저장소의 파일/디렉터리 트리를 JSON-호환 dict로 반환합니다. rev를 지정하면 해당 커밋 시점의 트리를 반환합니다."""
+        logger.info(f"파일 트리 스캔 시작: {self.repo_path} (rev={rev})")
+        ignore_dirs = self.IGNORE_DIRS
+        ignore_files = self.IGNORE_FILES
 
         def is_git_private(path_fragment: str) -> bool:
             if not path_fragment:
@@ -42,6 +158,17 @@ class GitAnalyzer:
             return normalized == '.git' or normalized.startswith('.git/')
 
         try:
+            if rev:
+                tree = self._scan_revision_tree(rev)
+                self.sort_tree(tree)
+                logger.info("파일 트리 스캔 성공.")
+                return tree
+
+            watcher = get_repo_watcher(self.repo_path)
+            if watcher is not None and watcher.ready:
+                logger.info("파일 트리를 watcher의 최신 상태에서 반환합니다.")
+                return watcher.file_tree()
+
             repo_root = os.path.abspath(self.repo_path)
             root_name = os.path.basename(repo_root.rstrip(os.sep)) or "repository"
             tree = {
@@ -111,14 +238,7 @@ class GitAnalyzer:
                         "size": size,
                     })
 
-            def sort_children(node: dict):
-                children = node.get("children", [])
-                children.sort(key=lambda child: (child.get("type") != "directory", child.get("name", "").lower()))
-                for child in children:
-                    if child.get("type") == "directory":
-                        sort_children(child)
-
-            sort_children(tree)
+            self.sort_tree(tree)
             logger.info("파일 트리 스캔 성공.")
             return tree
         except Exception as e:
@@ -130,23 +250,11 @@ class GitAnalyzer:
         logger.info(f"언어별 LOC 계산 시작: {self.repo_path}")
         language_stats = {}
 
-        # 언어별 확장자 매핑
-        language_map = {
-            '.py': 'Python',
-            '.js': 'JavaScript',
-            '.ts': 'TypeScript',
-            '.java': 'Java',
-            '.c': 'C',
-            '.h': 'C',
-            '.cpp': 'C++',
-            '.hpp': 'C++',
-            '.cs': 'C#',
-            '.go': 'Go',
-            '.rs': 'Rust',
-            '.md': 'Markdown',
-            '.html': 'HTML',
-            '.css': 'CSS',
-        }
+        watcher = get_repo_watcher(self.repo_path)
+        if watcher is not None and watcher.ready:
+            language_stats = watcher.language_stats()
+            logger.info(f"LOC를 watcher의 최신 상태에서 반환합니다: {language_stats}")
+            return language_stats
 
         try:
             tracked_files = self.repo.git.ls_files().split('\n')
@@ -155,15 +263,12 @@ class GitAnalyzer:
                 if not file_path:
                     continue
                 _, extension = os.path.splitext(file_path)
-                language = language_map.get(extension)
+                language = self.LANGUAGE_MAP.get(extension)
 
                 if language:
                     full_path = os.path.join(self.repo_path, file_path)
                     try:
-                        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            lines = f.readlines()
-                            line_count = len([line for line in lines if line.strip() != ''])
-
+                        line_count = self.count_loc(full_path)
                         language_stats[language] = language_stats.get(language, 0) + line_count
                     except FileNotFoundError:
                         logger.warning(f"LOC 계산 중 파일을 찾을 수 없음: {full_path}")
@@ -180,6 +285,119 @@ class GitAnalyzer:
             logger.error(f"LOC 계산 중 에러 발생: {e}", exc_info=True)
             return {"error": str(e)}
 
+    @staticmethod
+    def _iter_nul_records(stream, block_size: int = 64 * 1024):
+        """NUL로 구분된 git 출력(-z)을 블록 단위로 읽어 레코드를 하나씩 생성합니다."""
+        pending = b""
+        for block in iter(lambda: stream.read(block_size), b""):
+            records = (pending + block).split(b"\0")
+            pending = records.pop()
+            for record in records:
+                yield record.decode("utf-8", errors="replace")
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+
+    def _aggregate_numstat(self, rev_range: str, files: dict) -> int:
+        """
+        git log --numstat 출력을 스트리밍으로 읽어 파일별 churn 집계에 누적하고, 처리한 커밋 수를 반환합니다.
+        -z로 경로를 따옴표/이스케이프 없이 받으므로 한글 등 비 ASCII 파일 이름도 실제 경로로 집계됩니다.
+        """
+        cmd = ["git", "-c", "core.quotepath=off", "log", "--numstat", "--no-renames", "-z", "--format=%x1e%H%x1f%ae", rev_range]
+        proc = subprocess.Popen(cmd, cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        commit_count = 0
+        author = None
+        try:
+            for record in self._iter_nul_records(proc.stdout):
+                # 커밋 머리말과 첫 numstat 레코드 사이에는 줄바꿈이 들어갑니다.
+                record = record.lstrip("\n")
+                if record.startswith("\x1e"):
+                    _sha, author = record[1:].split("\x1f", 1)
+                    commit_count += 1
+                    continue
+                if not record:
+                    continue
+                added, deleted, path = record.split("\t", 2)
+                stats = files.setdefault(path, {"added": 0, "deleted": 0, "commits": 0, "authors": []})
+                # 바이너리 파일은 줄 수가 "-"로 표시되므로 커밋 횟수만 집계합니다.
+                if added != "-":
+                    stats["added"] += int(added)
+                    stats["deleted"] += int(deleted)
+                stats["commits"] += 1
+                if author not in stats["authors"]:
+                    stats["authors"].append(author)
+            stderr = proc.stderr.read().decode("utf-8", errors="replace")
+            if proc.wait() != 0:
+                raise GitCommandError(cmd, proc.returncode, stderr)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+        return commit_count
+
+    def analyze_hotspots(self, top_n: int = 20) -> dict:
+        """파일별 변경 이력(churn)과 현재 코드 규모를 결합해 변경이 잦고 큰 핫스팟 파일 순위를 반환합니다."""
+        logger.info(f"핫스팟 분석 시작: {self.repo_path}")
+        try:
+            if not self.repo.head.is_valid():
+                return {"hotspots": [], "commits_processed": 0}
+
+            state_path = os.path.join(self.get_cache_dir("churn"), "state.json")
+            state = load_json(state_path) or {"last_commit": None, "files": {}}
+            head_sha = self.repo.head.commit.hexsha
+            last_commit = state.get("last_commit")
+
+            # 이전 집계 이후의 커밋만 누적하고, 이력이 재작성되었으면 처음부터 다시 집계합니다.
+            if last_commit and last_commit != head_sha and self.repo.is_ancestor(last_commit, head_sha):
+                rev_range = f"{last_commit}..{head_sha}"
+            elif last_commit == head_sha:
+                rev_range = None
+            else:
+                state = {"last_commit": None, "files": {}}
+                rev_range = head_sha
+
+            commits_processed = 0
+            if rev_range:
+                logger.debug(f"churn 집계 범위: {rev_range}")
+                commits_processed = self._aggregate_numstat(rev_range, state["files"])
+                state["last_commit"] = head_sha
+                save_json(state_path, state)
+
+            hotspots = []
+            for path, stats in state["files"].items():
+                full_path = os.path.join(self.repo_path, path)
+                if not os.path.isfile(full_path):
+                    continue
+                try:
+                    loc = self.count_loc(full_path)
+                except OSError as e:
+                    logger.warning(f"핫스팟 분석 중 파일을 읽을 수 없음: {full_path} - {e}")
+                    continue
+                hotspots.append({
+                    "path": path,
+                    "commits": stats["commits"],
+                    "added": stats["added"],
+                    "deleted": stats["deleted"],
+                    "authors": len(stats["authors"]),
+                    "loc": loc,
+                    # 변경 빈도 × 현재 규모: 자주 바뀌면서 큰 파일일수록 점수가 높습니다.
+                    "score": stats["commits"] * loc,
+                })
+
+            hotspots.sort(key=lambda item: (item["score"], item["commits"]), reverse=True)
+            logger.info(f"핫스팟 분석 완료: 새로 처리한 커밋 {commits_processed}개, 파일 {len(hotspots)}개")
+            return {
+                "hotspots": hotspots[:top_n],
+                "commits_processed": commits_processed,
+                "files_tracked": len(hotspots),
+            }
+        except GitCommandError as e:
+            logger.error(f"Git log 명령어 실행 실패: {e}", exc_info=True)
+            return {"error": f"Git command failed: {e}"}
+        except Exception as e:
+            logger.error(f"핫스팟 분석 중 에러 발생: {e}", exc_info=True)
+            return {"error": str(e)}
 
 if __name__ == '__main__':
     # 테스트용: 로깅을 명시적으로 설정
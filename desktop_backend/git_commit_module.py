@@ -1,12 +1,39 @@
 
 import os
+import re
+import json
+import hashlib
+import subprocess
+import threading
+from contextlib import contextmanager
 from git import Repo, GitCommandError
 from langchain.tools import tool
 import logging
 
+from git_object_reader import get_object_reader
+
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+DEFAULT_DIFF_PAGE_SIZE = 20
+# 경로에 " b/"가 포함될 수 있으므로 a/와 b/가 같은 경우를 먼저 찾고, 이름 변경은 일반 패턴으로 처리합니다.
+DIFF_HEADER_PATTERNS = (
+    re.compile(r"^diff --git a/(.*) b/(\1)$"),
+    re.compile(r"^diff --git a/(.*?) b/(.*)$"),
+)
+BINARY_DIFF_PATTERN = re.compile(rb"^(Binary files .* differ|GIT binary patch)$", re.MULTILINE)
+
+# Diff 결과 캐시 (.git/flash/diff) 설정
+DIFF_CACHE_ENABLED = os.getenv("DIFF_CACHE_ENABLED", "true").lower() != "false"
+DIFF_CACHE_MAX_BYTES = int(os.getenv("DIFF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DIFF_CACHE_ENTRY_MAX_BYTES = int(os.getenv("DIFF_CACHE_ENTRY_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+def read_only_git_env() -> dict:
+    # 조회용 git 명령이 인덱스 stat 갱신을 위해 index.lock을 잡지 않도록 합니다.
+    return dict(os.environ, GIT_OPTIONAL_LOCKS="0")
+
+
 class GitCommitModule:
     """
     Git 커밋, 브랜치, Diff 생성 등 저장소 변경을 위한 도구 모음.
@@ -20,6 +47,7 @@ class GitCommitModule:
         try:
             self.repo = Repo(repo_path)
             self.repo_path = repo_path
+            self.objects = get_object_reader(repo_path)
         except Exception as e:
             logging.error(f"저장소 초기화 실패: {repo_path} - {e}")
             raise
@@ -62,33 +90,371 @@ class GitCommitModule:
             logging.error(f"커밋 생성 중 에러 발생: {e}")
             return {"success": False, "error": str(e)}
 
-    def get_diff(self, commit_hash: str = "HEAD") -> str:
+    def _run_git(self, args: list, input_bytes: bytes = None, env: dict = None) -> str:
+        cmd = ["git"] + args
+        result = subprocess.run(cmd, cwd=self.repo_path, input=input_bytes, capture_output=True, env=env)
+        if result.returncode != 0:
+            raise GitCommandError(cmd, result.returncode, result.stderr.decode("utf-8", errors="replace"))
+        return result.stdout.decode("utf-8", errors="replace").strip()
+
+    def create_commits_bulk(self, commits: list[dict], branch: str = None) -> dict:
+        """
+        여러 커밋을 plumbing 명령(update-index --stdin, write-tree, commit-tree)으로 작성하고 브랜치를 원자적으로 갱신합니다.
+        커밋마다 인덱스 전체를 다시 쓰지 않고 임시 인덱스에 경로를 한 번에 반영하므로 대량 변경에 적합합니다.
+        :param commits: [{"message": str, "files": [...], "deleted": [...], "renamed": [[이전 경로, 새 경로], ...]}] (저장소 루트 기준)
+        :param branch: 갱신할 브랜치 이름 (기본값: 현재 브랜치)
+        :return: 성공 시 생성된 커밋 해시 목록, 실패 시 에러 메시지
+        """
+        logging.info(f"Attempting to create {len(commits)} commits in bulk in {self.repo_path} (branch={branch})")
+        if not commits:
+            return {"success": False, "error": "No commits requested."}
+
+        if branch:
+            ref = f"refs/heads/{branch}"
+        elif self.repo.head.is_detached:
+            ref = "HEAD"
+        else:
+            ref = self.repo.head.ref.path
+        checked_out = ref == "HEAD" or (not self.repo.head.is_detached and self.repo.head.ref.path == ref)
+
+        index_path = os.path.join(self.repo.git_dir, f"flash-bulk-index.{os.getpid()}.{threading.get_ident()}")
+        env = dict(os.environ, GIT_INDEX_FILE=index_path)
+        try:
+            # 브랜치/트리 해석은 공유 cat-file 프로세스로 처리합니다.
+            old_info = self.objects.object_info(f"{ref}^{{commit}}")
+            old_sha = old_info[0] if old_info else None
+            # 아직 없는 브랜치는 현재 HEAD에서 시작합니다.
+            parent = old_sha or (self.repo.head.commit.hexsha if self.repo.head.is_valid() else None)
+            if parent:
+                self._run_git(["read-tree", parent], env=env)
+            else:
+                self._run_git(["read-tree", "--empty"], env=env)
+            parent_tree = self.objects.object_info(f"{parent}^{{tree}}")[0] if parent else None
+            created, skipped, touched = [], [], []
+            for position, spec in enumerate(commits):
+                paths = list(spec.get("files") or []) + list(spec.get("deleted") or [])
+                for old_path, new_path in spec.get("renamed") or []:
+                    paths += [old_path, new_path]
+                if not paths:
+                    skipped.append(position)
+                    continue
+                # 워킹 트리에 있는 경로는 추가/갱신하고, 없는 경로는 인덱스에서 제거합니다.
+                self._run_git(
+                    ["update-index", "--add", "--remove", "-z", "--stdin"],
+                    input_bytes="\0".join(paths).encode("utf-8") + b"\0",
+                    env=env,
+                )
+                tree = self._run_git(["write-tree"], env=env)
+                if tree == parent_tree:
+                    logging.warning(f"No changes for bulk commit #{position}, skipping.")
+                    skipped.append(position)
+                    continue
+                commit_args = ["commit-tree", tree, "-F", "-"]
+                if parent:
+                    commit_args += ["-p", parent]
+                parent = self._run_git(commit_args, input_bytes=(spec.get("message") or "").encode("utf-8"))
+                parent_tree = tree
+                created.append(parent)
+                touched += paths
+
+            if not created:
+                return {"success": False, "error": "No changes to commit.", "skipped": skipped}
+
+            # 모든 커밋을 만든 뒤 브랜치를 한 번만 갱신합니다. 그 사이 브랜치가 움직였으면 실패합니다(compare-and-swap).
+            self._run_git(["update-ref", "-m", "flash: bulk commit", ref, parent, old_sha or "0" * len(parent)])
+
+            if checked_out:
+                # 현재 브랜치라면 기본 인덱스의 해당 경로만 새 HEAD에 맞춥니다.
+                self._run_git(
+                    ["reset", "-q", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                    input_bytes="\0".join(touched).encode("utf-8") + b"\0",
+                )
+            logging.info(f"Bulk commits created successfully: {len(created)} commits, head {parent}")
+            return {"success": True, "commit_hashes": created, "head": parent, "skipped": skipped}
+        except GitCommandError as e:
+            logging.error(f"Git 명령어 실행 실패: {e}")
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            logging.error(f"대량 커밋 생성 중 에러 발생: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            if os.path.exists(index_path):
+                os.remove(index_path)
+
+    @staticmethod
+    def _split_diff_sections(lines):
+        """
+        Diff 출력 줄들을 파일 단위 섹션 (경로, bytes)으로 묶어 생성합니다.
+        첫 'diff --git' 이전의 머리말(커밋 정보, --stat 출력 등)은 경로 None으로 생성됩니다.
+        """
+        path, section = None, []
+        for line in lines:
+            if line.startswith(b"diff --git "):
+                if section:
+                    yield path, b"".join(section)
+                header = line.decode("utf-8", errors="replace").rstrip("\n")
+                match = next(filter(None, (pattern.match(header) for pattern in DIFF_HEADER_PATTERNS)), None)
+                path = match.group(2) if match else header[11:]
+                section = []
+            section.append(line)
+        if section:
+            yield path, b"".join(section)
+
+    @contextmanager
+    def _git_output(self, args: list):
+        """
+        git 명령을 실행하고 출력 파이프를 가진 프로세스를 넘깁니다.
+        블록이 정상적으로 끝나면 종료 코드를 확인하고, 소비자가 중간에 멈추면 git 프로세스를 종료합니다.
+        """
+        cmd = ["git", "-c", "core.quotepath=off"] + args
+        proc = subprocess.Popen(cmd, cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=read_only_git_env())
+        try:
+            yield proc
+            stderr = proc.stderr.read().decode("utf-8", errors="replace")
+            if proc.wait() != 0:
+                raise GitCommandError(cmd, proc.returncode, stderr)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+
+    def _iter_diff_sections(self, args: list):
+        """git 출력을 파이프로 조금씩 읽으면서 파일 단위 섹션을 생성합니다."""
+        with self._git_output(args) as proc:
+            yield from self._split_diff_sections(proc.stdout)
+
+    def _diff_cache_dir(self) -> str:
+        cache_dir = os.path.join(self.repo.git_dir, "flash", "diff")
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+
+    def _worktree_fingerprint(self, head_sha: str) -> str:
+        """
+        HEAD, 인덱스 체크섬, 변경된 워킹 트리 파일의 내용 해시로 'HEAD 대비 워킹 트리' Diff의 캐시 지문을 만듭니다.
+        mtime/크기가 같은 수정도 구분하도록 변경된 파일은 내용을 해시합니다. (변경된 파일만 읽으므로 Diff 생성보다 가볍습니다.)
+        """
+        parts = [head_sha]
+        try:
+            # 인덱스 파일은 마지막에 내용 전체의 체크섬을 기록하므로 끝부분만 읽어도 스테이징 상태를 구분할 수 있습니다.
+            with open(os.path.join(self.repo.git_dir, "index"), "rb") as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(f.tell() - 32, 0))
+                parts.append(f"index:{f.read().hex()}")
+        except FileNotFoundError:
+            parts.append("index:none")
+        for path in sorted(self.repo.git.diff("--name-only", "-z", "HEAD", env=read_only_git_env()).split("\0")):
+            if not path:
+                continue
+            digest = hashlib.sha256()
+            try:
+                with open(os.path.join(self.repo_path, path), "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(block)
+                parts.append(f"{path}:{digest.hexdigest()}")
+            except FileNotFoundError:
+                parts.append(f"{path}:deleted")
+            except IsADirectoryError:
+                parts.append(f"{path}:directory")
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _evict_diff_cache(self, cache_dir: str):
+        """캐시 디렉터리 크기가 제한을 넘으면 오래 사용하지 않은 항목부터 삭제합니다."""
+        entries = []
+        for name in os.listdir(cache_dir):
+            if not name.endswith(".diff"):
+                continue
+            try:
+                entry_stat = os.stat(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((entry_stat.st_mtime, entry_stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= DIFF_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(os.path.join(cache_dir, name))
+                total -= size
+            except OSError:
+                continue
+
+    def _iter_cached_diff_sections(self, args: list, fingerprint: str = None):
+        """
+        결과가 변하지 않는 Diff(커밋 간 Diff, 같은 지문의 워킹 트리 Diff)를 디스크 캐시에서 읽습니다.
+        캐시에 없으면 git 출력을 파이프로 읽어 바로 섹션을 생성하면서 같은 내용을 임시 파일에 기록하고,
+        출력을 끝까지 읽었을 때만 캐시로 저장합니다. (max_bytes/페이지 크기로 중간에 멈추면 git을 종료하고 저장하지 않습니다.)
+        """
+        cache_key = hashlib.sha256(json.dumps({"args": args, "worktree": fingerprint}).encode("utf-8")).hexdigest()
+        cache_dir = self._diff_cache_dir()
+        cache_path = os.path.join(cache_dir, f"{cache_key}.diff")
+        if os.path.exists(cache_path):
+            logging.info(f"Diff cache hit: {cache_key[:12]}")
+            os.utime(cache_path)
+            with open(cache_path, "rb") as f:
+                yield from self._split_diff_sections(f)
+            return
+
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        out = open(tmp_path, "wb")
+        written = 0
+
+        def tee(stream):
+            nonlocal out, written
+            for line in stream:
+                if out is not None:
+                    written += len(line)
+                    if written > DIFF_CACHE_ENTRY_MAX_BYTES:
+                        # 너무 큰 결과는 캐시하지 않고 이번 요청에만 사용합니다.
+                        out.close()
+                        out = None
+                        os.remove(tmp_path)
+                    else:
+                        out.write(line)
+                yield line
+
+        try:
+            with self._git_output(args) as proc:
+                yield from self._split_diff_sections(tee(proc.stdout))
+            if out is not None:
+                out.close()
+                out = None
+                os.replace(tmp_path, cache_path)
+                self._evict_diff_cache(cache_dir)
+        finally:
+            if out is not None:
+                out.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _resolve_commit(self, rev: str) -> str:
+        # 커밋 해석은 공유 cat-file 프로세스로 처리합니다.
+        commit_info = self.objects.object_info(f"{rev}^{{commit}}")
+        if commit_info is None:
+            raise ValueError(f"unknown commit '{rev}'")
+        return commit_info[0]
+
+    def _commit_arg(self, rev: str) -> str:
+        """
+        Diff 명령에 넘길 커밋을 반환합니다.
+        캐시를 쓸 때는 브랜치가 움직여도 키가 바뀌도록 SHA로 해석하고(적중하면 git을 실행하지 않음),
+        캐시를 쓰지 않으면 git이 직접 해석하도록 그대로 넘겨 조회를 한 번 줄입니다.
+        """
+        return self._resolve_commit(rev) if DIFF_CACHE_ENABLED else rev
+
+    def get_diff(self, commit_hash: str = "HEAD", stat_only: bool = False, paths: list[str] = None,
+                 max_bytes: int = None, cursor: int = None, page_size: int = None, base: str = None):
         """
         특정 커밋 또는 HEAD의 변경 사항(diff)을 반환합니다.
-        :param commit_hash: Diff를 생성할 커밋 해시 (기본값: "HEAD")
-        :return: Diff 내용 문자열
+        :param commit_hash: Diff를 생성할 커밋 해시 (기본값: "HEAD"), "base..head" 또는 "base...head" 범위도 지원
+        :param base: 지정하면 base와 commit_hash 사이의 범위 Diff를 반환 (이름 변경/복사 감지 포함)
+        :param stat_only: True이면 파일별 변경 통계(--stat)만 반환
+        :param paths: 지정한 경로의 변경 사항만 포함
+        :param max_bytes: 반환할 Diff의 최대 바이트 수 (초과분은 잘림)
+        :param cursor: 파일 단위 페이지네이션 시작 위치 (이전 응답의 next_cursor)
+        :param page_size: 한 번에 반환할 파일 수 (cursor 또는 page_size를 지정하면 dict 반환)
+        :return: Diff 내용 문자열, 페이지네이션 시 {"diff", "files", "skipped_binary", "next_cursor", "truncated"}
         """
-        logging.info(f"Getting diff for commit: {commit_hash}")
+        logging.info(f"Getting diff for commit: {commit_hash} (base={base}, stat_only={stat_only}, paths={paths}, cursor={cursor})")
+        paged = cursor is not None or page_size is not None
         try:
-            # HEAD의 경우, 마지막 커밋과 워킹 디렉토리의 변경사항을 보여줍니다.
-            # 특정 커밋의 경우, 해당 커밋과 그 부모 커밋 간의 변경사항을 보여줍니다.
-            if commit_hash.upper() == "HEAD":
+            merge_base = False
+            if base is None and ".." in commit_hash:
+                merge_base = "..." in commit_hash
+                base, commit_hash = commit_hash.split("..." if merge_base else "..", 1)
+                commit_hash = commit_hash or "HEAD"
+
+            fingerprint = None
+            if base is not None:
+                # 범위 Diff: 두 커밋 사이의 변경사항 (이름 변경/복사 감지)
+                head_sha = self._commit_arg(commit_hash)
+                base_sha = self._commit_arg(base)
+                if merge_base:
+                    base_sha = self.repo.git.merge_base(base_sha, head_sha)
+                args = ["diff", "-M", "-C", base_sha, head_sha]
+            elif commit_hash.upper() == "HEAD":
+                # HEAD의 경우, 마지막 커밋과 워킹 디렉토리의 변경사항을 보여줍니다.
                 # 저장소에 커밋이 있는지 확인
                 if not self.repo.head.is_valid():
                     logging.info("No commits in repository yet")
                     return "아직 저장소에 커밋이 없습니다. 파일을 수정하고 커밋을 생성해주세요."
 
                 # 마지막 커밋 이후의 변경사항 (스테이징된 것 포함)
-                diff_content = self.repo.git.diff("HEAD")
+                args = ["diff", "HEAD"]
+                fingerprint = self._worktree_fingerprint(self.repo.head.commit.hexsha)
             else:
-                commit = self.repo.commit(commit_hash)
-                # 해당 커밋의 변경 내용
-                diff_content = self.repo.git.show(commit.hexsha)
+                # 특정 커밋의 경우, 해당 커밋과 그 부모 커밋 간의 변경사항을 보여줍니다.
+                args = ["show", self._commit_arg(commit_hash)]
 
+            if stat_only:
+                args.append("--stat")
+            if paths:
+                args += ["--"] + list(paths)
+
+            start = int(cursor or 0)
+            page_size = page_size or DEFAULT_DIFF_PAGE_SIZE
+            chunks, files, skipped_binary = [], [], []
+            total_bytes = 0
+            truncated = False
+            next_cursor = None
+            index = 0
+            # 커밋 간 Diff는 변하지 않고, 워킹 트리 Diff는 지문이 같으면 결과가 같으므로 캐시를 사용합니다.
+            sections = self._iter_cached_diff_sections(args, fingerprint) if DIFF_CACHE_ENABLED else self._iter_diff_sections(args)
+            for path, section in sections:
+                if path is not None:
+                    if index < start:
+                        index += 1
+                        continue
+                    if paged and len(files) >= page_size:
+                        next_cursor = index
+                        break
+                    index += 1
+                    if BINARY_DIFF_PATTERN.search(section):
+                        skipped_binary.append(path)
+                        continue
+                elif paged and start > 0:
+                    # 머리말은 첫 페이지에만 포함합니다.
+                    continue
+
+                if max_bytes is not None and total_bytes + len(section) > max_bytes:
+                    if paged and files:
+                        # 이미 담은 파일이 있으면 현재 파일부터 다음 페이지로 넘깁니다.
+                        next_cursor = index - 1
+                        break
+                    chunks.append(section[:max(max_bytes - total_bytes, 0)])
+                    truncated = True
+                    if path is not None:
+                        files.append(path)
+                        if paged:
+                            next_cursor = index
+                    break
+                chunks.append(section)
+                total_bytes += len(section)
+                if path is not None:
+                    files.append(path)
+
+            diff_content = b"".join(chunks).decode("utf-8", errors="replace").rstrip("\n")
+
+            if paged:
+                return {
+                    "diff": diff_content,
+                    "files": files,
+                    "skipped_binary": skipped_binary,
+                    "next_cursor": next_cursor,
+                    "truncated": truncated,
+                }
+
+            if truncated:
+                diff_content += f"\n... (diff truncated at {max_bytes} bytes)"
+            if skipped_binary:
+                diff_content += "\n(binary files skipped: " + ", ".join(skipped_binary) + ")"
             if not diff_content:
                 return "No differences found."
 
             return diff_content
+        except ValueError as e:
+            return f"Error getting diff: {e}"
         except GitCommandError as e:
             logging.error(f"Git diff 명령어 실행 실패: {e}")
             return f"Error getting diff: {e}"
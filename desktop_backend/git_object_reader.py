@@ -0,0 +1,170 @@
+import os
+import atexit
+import logging
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+# batch-check 요청을 한 번에 몇 개씩 파이프라이닝할지 (파이프 버퍼가 가득 차 교착되지 않도록 제한)
+CHECK_CHUNK_SIZE = 256
+
+
+class GitObjectReaderError(RuntimeError):
+    pass
+
+
+class _CatFileProcess:
+    """장기 실행되는 `git cat-file --batch*` 프로세스 하나를 감싸고, 실패 시 재시작합니다."""
+
+    def __init__(self, repo_path: str, mode: str):
+        self.repo_path = repo_path
+        self.mode = mode
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        self.proc = subprocess.Popen(
+            ["git", "cat-file", self.mode],
+            cwd=self.repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        logger.debug(f"git cat-file {self.mode} 프로세스 시작 (pid={self.proc.pid}): {self.repo_path}")
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+        finally:
+            self.proc.stdout.close()
+            self.proc = None
+
+    def _read_header(self, rev: str):
+        header = self.proc.stdout.readline()
+        if not header:
+            raise GitObjectReaderError(f"git cat-file {self.mode} 프로세스가 종료되었습니다.")
+        parts = header.decode("utf-8", errors="replace").rstrip("\n").split(" ")
+        if parts[-1] in ("missing", "ambiguous"):
+            return None
+        sha, obj_type, size = parts
+        return sha, obj_type, int(size)
+
+    def _exchange(self, revs: list) -> list:
+        self.proc.stdin.write("".join(f"{rev}\n" for rev in revs).encode("utf-8"))
+        self.proc.stdin.flush()
+        results = []
+        for rev in revs:
+            info = self._read_header(rev)
+            if info is not None and self.mode == "--batch":
+                content = self.proc.stdout.read(info[2])
+                self.proc.stdout.read(1)  # 내용 뒤의 개행
+                info = info + (content,)
+            results.append(info)
+        return results
+
+    def request(self, revs: list) -> list:
+        """여러 객체 이름을 한 번에 보내고 응답 목록을 반환합니다. 프로세스 오류 시 한 번 재시작 후 재시도합니다."""
+        with self.lock:
+            for attempt in range(2):
+                if self.proc is None or self.proc.poll() is not None:
+                    self._start()
+                try:
+                    return self._exchange(revs)
+                except (OSError, ValueError, GitObjectReaderError) as e:
+                    logger.warning(f"git cat-file {self.mode} 통신 실패 (시도 {attempt + 1}): {e}")
+                    self.close()
+            raise GitObjectReaderError(f"git cat-file {self.mode} 요청에 실패했습니다: {self.repo_path}")
+
+
+class GitObjectReader:
+    """
+    저장소마다 하나씩 유지되는 `git cat-file --batch`/`--batch-check` 기반 객체 리더.
+    객체 읽기, 트리 목록, blob 크기 조회, 커밋/브랜치 해석을 프로세스 생성 없이 처리합니다.
+    - GitAnalyzer.scan_file_tree(rev=...): 커밋 시점의 트리 목록과 blob 크기
+    - GitCommitModule: create_commits_bulk의 브랜치/트리 해석, get_diff 캐시 키용 커밋 해석
+    - CommitHistoryIngestor, WorktreePool: 커밋 존재 확인과 해석
+    워킹 트리 스캔과 수정된 파일의 blob SHA(hash-object)는 객체 DB에 없는 내용이므로 이 리더를 쓰지 않습니다.
+    """
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self._batch = _CatFileProcess(repo_path, "--batch")
+        self._check = _CatFileProcess(repo_path, "--batch-check")
+
+    def close(self):
+        self._batch.close()
+        self._check.close()
+
+    def object_info(self, rev: str):
+        """(sha, type, size)를 반환하며, 객체가 없으면 None을 반환합니다."""
+        return self._check.request([rev])[0]
+
+    def read_object(self, rev: str):
+        """(sha, type, size, content)를 반환하며, 객체가 없으면 None을 반환합니다."""
+        return self._batch.request([rev])[0]
+
+    def object_sizes(self, revs: list) -> dict:
+        """여러 객체의 크기를 파이프라이닝으로 조회해 {rev: size}로 반환합니다. 없는 객체는 제외됩니다."""
+        sizes = {}
+        for start in range(0, len(revs), CHECK_CHUNK_SIZE):
+            chunk = revs[start:start + CHECK_CHUNK_SIZE]
+            for rev, info in zip(chunk, self._check.request(chunk)):
+                if info is not None:
+                    sizes[rev] = info[2]
+        return sizes
+
+    def list_tree(self, tree_ish: str) -> list:
+        """트리 객체의 직계 항목을 [(mode, type, sha, name), ...]로 반환합니다."""
+        obj = self.read_object(f"{tree_ish}^{{tree}}")
+        if obj is None:
+            raise GitObjectReaderError(f"트리 객체를 찾을 수 없습니다: {tree_ish}")
+        sha, _obj_type, _size, content = obj
+        raw_sha_len = len(sha) // 2  # SHA-1(20바이트)과 SHA-256(32바이트) 저장소 모두 지원
+        entries = []
+        pos = 0
+        while pos < len(content):
+            space = content.index(b" ", pos)
+            nul = content.index(b"\0", space)
+            mode = content[pos:space].decode("ascii")
+            name = content[space + 1:nul].decode("utf-8", errors="surrogateescape")
+            entry_sha = content[nul + 1:nul + 1 + raw_sha_len].hex()
+            pos = nul + 1 + raw_sha_len
+            if mode == "40000":
+                entry_type = "tree"
+            elif mode == "160000":
+                entry_type = "commit"
+            else:
+                entry_type = "blob"
+            entries.append((mode, entry_type, entry_sha, name))
+        return entries
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_object_reader(repo_path: str) -> GitObjectReader:
+    """저장소 경로별로 공유되는 GitObjectReader를 반환합니다."""
+    key = os.path.realpath(repo_path)
+    with _readers_lock:
+        reader = _readers.get(key)
+        if reader is None:
+            reader = GitObjectReader(key)
+            _readers[key] = reader
+        return reader
+
+
+@atexit.register
+def close_object_readers():
+    """모든 cat-file 프로세스를 종료합니다."""
+    with _readers_lock:
+        for reader in _readers.values():
+            reader.close()
+        _readers.clear()
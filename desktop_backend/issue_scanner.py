@@ -0,0 +1,186 @@
+import os
+import re
+import ast
+import logging
+
+import requests
+
+from blob_cache import load_json, run_batched, save_json
+
+logger = logging.getLogger(__name__)
+
+# 검사 규칙이나 결과 형식이 바뀌면 버전을 올려 기존 캐시를 무효화합니다.
+SCANNER_VERSION = "1"
+ANALYZER_NAME = "flash-scanner"
+
+DEFAULT_OPTIONS = {
+    "max_function_lines": 80,
+    "max_file_bytes": 1024 * 1024,
+}
+
+TODO_PATTERN = re.compile(r"\b(TODO|FIXME|XXX|HACK)\b[:\s]?(.*)")
+
+
+def _finding(line, rule_id, severity, message):
+    return {"line": line, "rule_id": rule_id, "severity": severity, "message": message}
+
+
+def scan_file(full_path: str, options: dict) -> list:
+    """
+    단일 파일에 내장 검사 규칙을 적용합니다. (프로세스 풀에서 실행되므로 모듈 최상위 함수로 둡니다.)
+    반환되는 항목에는 파일 경로가 없으며, 같은 blob을 공유하는 경로들이 결과를 재사용합니다.
+    """
+    try:
+        size = os.path.getsize(full_path)
+    except OSError:
+        return []
+
+    if size > options["max_file_bytes"]:
+        return [_finding(1, "oversize-file", "warning",
+                         f"파일 크기가 {size} bytes로 제한({options['max_file_bytes']} bytes)을 초과합니다.")]
+
+    with open(full_path, "rb") as f:
+        raw = f.read()
+    # NUL 바이트가 있으면 바이너리 파일로 보고 검사하지 않습니다.
+    if b"\0" in raw[:8192]:
+        return []
+    text = raw.decode("utf-8", errors="replace")
+
+    findings = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        match = TODO_PATTERN.search(line)
+        if match:
+            note = match.group(2).strip() or match.group(1)
+            findings.append(_finding(line_no, f"todo-{match.group(1).lower()}", "info", note[:500]))
+
+    if full_path.endswith(".py"):
+        try:
+            tree = ast.parse(text, filename=full_path)
+        except SyntaxError as e:
+            findings.append(_finding(e.lineno or 1, "syntax-error", "error", f"SyntaxError: {e.msg}"))
+        else:
+            for node in ast.walk(tree):
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    length = (node.end_lineno or node.lineno) - node.lineno + 1
+                    if length > options["max_function_lines"]:
+                        findings.append(_finding(
+                            node.lineno, "long-function", "warning",
+                            f"함수 '{node.name}'의 길이가 {length}줄로 제한({options['max_function_lines']}줄)을 초과합니다.",
+                        ))
+    return findings
+
+
+def _scan_batch(batch: list, options: dict) -> list:
+    return [(sha, scan_file(full_path, options)) for sha, full_path in batch]
+
+
+class IssueScanner:
+    """
+    저장소 파일에 내장 정적 검사(구문 오류, 긴 함수, TODO/FIXME, 대용량 파일)를 실행하는 도구.
+    - 검사 결과는 blob SHA 단위로 캐시되어 변경되지 않은 파일은 다시 검사하지 않습니다.
+    - 결과는 ProjectIssuesView(/git/<id>/issues)로 배치 업로드합니다.
+    """
+
+    def __init__(self, git_analyzer, api_base_url: str = None, headers: dict = None,
+                 max_workers: int = None, options: dict = None):
+        self.git_analyzer = git_analyzer
+        self.repo_path = git_analyzer.repo_path
+        self.api_base_url = api_base_url
+        self.headers = headers or {}
+        self.max_workers = max_workers
+        self.options = dict(DEFAULT_OPTIONS, **(options or {}))
+        self.cache_path = os.path.join(git_analyzer.get_cache_dir("issues"), f"v{SCANNER_VERSION}.json")
+
+    def _cache_key(self, sha: str) -> str:
+        # 검사 임계값이 바뀌면 결과도 달라지므로 키에 포함합니다.
+        return f"{sha}:{self.options['max_function_lines']}:{self.options['max_file_bytes']}"
+
+    def scan(self, paths: list = None) -> dict:
+        """
+        추적 중인 파일(또는 지정한 경로)을 검사하고 {경로: [이슈, ...]}와 캐시 통계를 반환합니다.
+        """
+        blob_shas = self.git_analyzer.get_blob_shas()
+        if paths:
+            wanted = set(paths)
+            blob_shas = {path: sha for path, sha in blob_shas.items() if path in wanted}
+
+        cache = load_json(self.cache_path)
+        pending = {}
+        for path, sha in blob_shas.items():
+            key = self._cache_key(sha)
+            if key not in cache and key not in pending:
+                pending[key] = os.path.join(self.repo_path, path)
+
+        logger.info(f"이슈 검사 시작: 전체 {len(blob_shas)}개, 검사 대상 {len(pending)}개 (캐시 적중 {len(blob_shas) - len(pending)}개)")
+        results = run_batched(_scan_batch, list(pending.items()), self.max_workers, self.options)
+
+        for key, findings in results:
+            cache[key] = findings
+        if results:
+            live_keys = {self._cache_key(sha) for sha in blob_shas.values()}
+            if not paths:
+                # 전체 검사 시에는 더 이상 존재하지 않는 blob의 결과를 정리합니다.
+                cache = {key: value for key, value in cache.items() if key in live_keys}
+            save_json(self.cache_path, cache)
+
+        issues_by_file = {}
+        for path, sha in sorted(blob_shas.items()):
+            findings = cache.get(self._cache_key(sha)) or []
+            if findings:
+                issues_by_file[path] = findings
+        return {
+            "files_scanned": len(pending),
+            "cache_hits": len(blob_shas) - len(pending),
+            "issues_by_file": issues_by_file,
+        }
+
+    def upload_issues(self, project_id: int, issues: list, batch_size: int = 500) -> int:
+        """이슈 목록을 배치 단위로 /git/<project_id>/issues에 업로드하고 업로드한 개수를 반환합니다."""
+        endpoint = f"{self.api_base_url}/git/{project_id}/issues"
+        uploaded = 0
+        with requests.Session() as session:
+            session.headers.update(self.headers)
+            for start in range(0, max(len(issues), 1), batch_size):
+                batch = issues[start:start + batch_size]
+                payload = {
+                    "analyzer": ANALYZER_NAME,
+                    "issues": batch,
+                    # 첫 배치에서 이전 검사 결과를 교체하고, 이후 배치는 이어서 추가합니다.
+                    "replace": start == 0,
+                }
+                session.post(endpoint, json=payload, timeout=30).raise_for_status()
+                uploaded += len(batch)
+        logger.info(f"이슈 {uploaded}건 업로드 완료 (project_id={project_id})")
+        return uploaded
+
+    def scan_issues(self, project_id: int = None, paths: list[str] = None, max_results: int = 200) -> dict:
+        """저장소 파일의 정적 이슈(구문 오류, 긴 함수, TODO/FIXME, 대용량 파일)를 검사하고, project_id가 있으면 서버에 업로드합니다."""
+        try:
+            result = self.scan(paths=paths)
+            issues = [
+                dict(finding, file=path)
+                for path, findings in result["issues_by_file"].items()
+                for finding in findings
+            ]
+            by_rule = {}
+            for issue in issues:
+                by_rule[issue["rule_id"]] = by_rule.get(issue["rule_id"], 0) + 1
+
+            uploaded = None
+            if project_id is not None and self.api_base_url:
+                uploaded = self.upload_issues(project_id, issues)
+
+            return {
+                "files_scanned": result["files_scanned"],
+                "cache_hits": result["cache_hits"],
+                "issue_count": len(issues),
+                "by_rule": by_rule,
+                "issues": issues[:max_results],
+                "uploaded": uploaded,
+            }
+        except requests.RequestException as e:
+            logger.error(f"이슈 업로드 실패: {e}", exc_info=True)
+            return {"error": f"Issue upload failed: {e}"}
+        except Exception as e:
+            logger.error(f"이슈 검사 중 에러 발생: {e}", exc_info=True)
+            return {"error": str(e)}
@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+
+class JobCheckpointStore:
+    """
+    Job별 LangGraph 체크포인트와 진행 중 Job 목록을 로컬 SQLite 파일 하나에 보관합니다.
+    - 체크포인트는 SqliteSaver가 thread_id(=Job ID) 단위로 노드 실행마다 저장합니다.
+    - agent_jobs 테이블에는 아직 완료 보고하지 않은 Job을 기록해, 재시작 시 이어서 실행할 대상을 찾습니다.
+    - 에이전트 ID도 함께 저장해 재시작 후에도 같은 ID로 서버에 보고합니다.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.saver = SqliteSaver(self.conn)
+        self.saver.setup()
+        # 같은 연결을 쓰므로 체크포인트 저장과 같은 잠금을 사용합니다.
+        self.lock = self.saver.lock
+        with self.lock, self.conn:
+            self.conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS agent_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS agent_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    agent_id TEXT NOT NULL,
+                    job_type TEXT,
+                    payload TEXT,
+                    started_at REAL NOT NULL
+                );
+                """
+            )
+
+    @staticmethod
+    def config(job_id) -> dict:
+        return {"configurable": {"thread_id": str(job_id)}}
+
+    def agent_id(self, prefix: str = "agent-py") -> str:
+        """저장된 에이전트 ID를 반환하고, 없으면 새로 만들어 저장합니다."""
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT value FROM agent_meta WHERE key = 'agent_id'").fetchone()
+            if row:
+                return row[0]
+            value = f"{prefix}-{uuid.uuid4()}"
+            self.conn.execute("INSERT INTO agent_meta (key, value) VALUES ('agent_id', ?)", (value,))
+            return value
+
+    def begin(self, job_id, agent_id: str, job_type: str, payload: dict):
+        """Job 실행 시작을 기록합니다. 이미 기록된 Job(재개)이면 그대로 둡니다."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO agent_jobs (job_id, agent_id, job_type, payload, started_at) VALUES (?, ?, ?, ?, ?)",
+                (str(job_id), agent_id, job_type, json.dumps(payload or {}, ensure_ascii=False, default=str), time.time()),
+            )
+
+    def finish(self, job_id):
+        """완료 보고한 Job의 기록과 체크포인트를 삭제합니다."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM agent_jobs WHERE job_id = ?", (str(job_id),))
+            self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (str(job_id),))
+
+    def in_flight(self, agent_id: str) -> list:
+        """이 에이전트가 시작했지만 완료 보고하지 못한 Job 목록을 시작 순서대로 반환합니다."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT job_id, job_type, payload FROM agent_jobs WHERE agent_id = ? ORDER BY started_at",
+                (agent_id,),
+            ).fetchall()
+        jobs = []
+        for job_id, job_type, payload in rows:
+            try:
+                payload = json.loads(payload) if payload else {}
+            except json.JSONDecodeError:
+                payload = {}
+            jobs.append({"job_id": job_id, "job_type": job_type or "", "payload": payload})
+        return jobs
@@ -1,36 +1,45 @@
 
 import os
+import sys
 import logging
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 
-# 로그 디렉터리 생성
 LOG_DIR = "/app/log"
-os.makedirs(LOG_DIR, exist_ok=True)
-
-# 로깅 설정 (파일 + 콘솔)
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
-
-# 포맷터 정의
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-# 콘솔 핸들러
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
-
-# 파일 핸들러 (회전식)
-log_file = os.path.join(LOG_DIR, "agent.log")
-file_handler = RotatingFileHandler(
-    log_file,
-    maxBytes=10 * 1024 * 1024,  # 10MB
-    backupCount=10  # 최대 10개 파일 보관
-)
-file_handler.setLevel(logging.DEBUG)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+
+
+def setup_logging():
+    """
+    루트 로거에 콘솔/회전식 파일 핸들러를 설정합니다.
+    도구 샌드박스 작업자(forkserver)가 이 모듈을 다시 임포트해도 로그 파일을 열거나 회전하지 않도록 main()에서만 호출합니다.
+    """
+    # 로그 디렉터리 생성
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    # 로깅 설정 (파일 + 콘솔)
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+
+    # 포맷터 정의
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    # 콘솔 핸들러
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.DEBUG)
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+
+    # 파일 핸들러 (회전식)
+    log_file = os.path.join(LOG_DIR, "agent.log")
+    file_handler = RotatingFileHandler(
+        log_file,
+        maxBytes=10 * 1024 * 1024,  # 10MB
+        backupCount=10  # 최대 10개 파일 보관
+    )
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
 
 main_logger = logging.getLogger(__name__)
 
@@ -38,10 +47,17 @@ def main():
     """
     Desktop Backend 에이전트의 메인 실행 함수.
     환경 변수를 로드하고 에이전트 루프를 시작합니다.
+    `main.py batch ...`로 실행하면 API 서버/LLM 없이 여러 저장소를 일괄 분석합니다.
     """
+    setup_logging()
+
     # .env 파일에서 환경 변수 로드
     load_dotenv()
 
+    if sys.argv[1:2] == ["batch"]:
+        from batch_runner import main as batch_main
+        return batch_main(sys.argv[2:])
+
     main_logger.info("Initializing Desktop Backend Agent...")
 
     # --- 환경 변수 유효성 검사 ---
@@ -69,4 +85,4 @@ def main():
         main_logger.critical(f"에이전트 실행 중 치명적인 오류 발생: {e}", exc_info=True)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
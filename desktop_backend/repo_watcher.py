@@ -0,0 +1,489 @@
+import os
+import stat
+import time
+import errno
+import atexit
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import posixpath
+import threading
+import subprocess
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 변경 이벤트가 멈춘 뒤 반영까지 기다리는 시간(초)과, 이벤트가 계속 들어와도 반영을 미루지 않는 최대 시간(초)
+WATCH_DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "1.0"))
+WATCH_MAX_DELAY_SECONDS = float(os.getenv("WATCH_MAX_DELAY_SECONDS", "10"))
+# inotify를 쓸 수 없을 때의 폴링 간격(초)
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", "5"))
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+GIT_DIR_MASK = IN_MOVED_TO | IN_CLOSE_WRITE | IN_DELETE | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """libc inotify를 ctypes로 감싼 최소 구현 (Linux 전용)."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read_events(self) -> list:
+        """대기 중인 이벤트를 모두 읽어 [(wd, mask, name), ...]로 반환합니다."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            pos = 0
+            while pos < len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, pos)
+                pos += EVENT_HEADER.size
+                name = data[pos:pos + length].rstrip(b"\0")
+                pos += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class RepoWatcher:
+    """
+    저장소 워킹 트리의 변경을 inotify(불가능하면 폴링)로 추적해 파일 트리와 언어별 LOC를 항상 최신으로 유지합니다.
+    - 변경 이벤트는 debounce로 묶어 반영하므로 체크아웃이나 빌드처럼 많은 파일이 한꺼번에 바뀌어도 한 번에 처리합니다.
+    - 변경된 파일만 다시 읽어 LOC를 갱신하고, project_id가 있으면 바뀐 항목만 ProjectScanView에 업로드합니다.
+    """
+
+    def __init__(self, git_analyzer, project_id: int = None, api_base_url: str = None, headers: dict = None,
+                 debounce: float = None, poll_interval: float = None, use_inotify: bool = True):
+        self.analyzer = git_analyzer
+        self.repo_root = os.path.abspath(git_analyzer.repo_path)
+        self.git_dir = git_analyzer.repo.git_dir
+        self.project_id = project_id
+        self.api_base_url = api_base_url
+        self.headers = headers or {}
+        self.debounce = WATCH_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.poll_interval = WATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.use_inotify = use_inotify
+
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+        self._watches = {}  # wd -> 디렉터리 상대 경로 (git 디렉터리는 None)
+        self._files = {}  # 상대 경로 -> 크기
+        self._dirs = set()
+        self._tracked = set()
+        self._loc = {}  # 추적 중인 파일의 상대 경로 -> (언어, LOC)
+        self._poll_state = {}
+        self._index_mtime = None
+        self._pending = set()
+        self._refresh_tracked = False
+        self._full_rescan = False
+        self._first_event = None
+        self._last_event = None
+        self._tree_changed = False
+        self._loc_changed = False
+        self.ready = False
+
+    # ------------------------------------------------------------------
+    # 공개 API
+    # ------------------------------------------------------------------
+    def start(self):
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify를 사용할 수 없어 폴링으로 감시합니다: {e}")
+        with self._lock:
+            self._rebuild()
+        self._thread = threading.Thread(target=self._run, name=f"repo-watcher:{self.repo_root}", daemon=True)
+        self._thread.start()
+        logger.info(f"저장소 감시 시작 ({'inotify' if self._inotify else 'polling'}): {self.repo_root}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self.ready = False
+
+    def file_tree(self) -> dict:
+        """scan_file_tree()와 같은 형식의 파일 트리를 반환합니다."""
+        with self._lock:
+            self._sync()
+            root_name = os.path.basename(self.repo_root.rstrip(os.sep)) or "repository"
+            tree = {"name": root_name, "path": ".", "type": "directory", "children": []}
+            nodes = {".": tree}
+            # 상위 디렉터리가 항상 먼저 오도록 경로 길이 순으로 만듭니다.
+            for rel_dir in sorted(self._dirs, key=lambda d: d.count("/")):
+                parent = nodes.get(posixpath.dirname(rel_dir) or ".")
+                if parent is None:
+                    continue
+                node = {"name": posixpath.basename(rel_dir), "path": rel_dir, "type": "directory", "children": []}
+                parent["children"].append(node)
+                nodes[rel_dir] = node
+            for rel_file, size in self._files.items():
+                parent = nodes.get(posixpath.dirname(rel_file) or ".")
+                if parent is not None:
+                    parent["children"].append({"name": posixpath.basename(rel_file), "path": rel_file, "type": "file", "size": size})
+        self.analyzer.sort_tree(tree)
+        return tree
+
+    def language_stats(self) -> dict:
+        """calculate_loc_per_language()와 같은 형식의 언어별 LOC를 반환합니다."""
+        with self._lock:
+            self._sync()
+            stats = {}
+            for language, loc in self._loc.values():
+                stats[language] = stats.get(language, 0) + loc
+            return stats
+
+    # ------------------------------------------------------------------
+    # 상태 구성
+    # ------------------------------------------------------------------
+    def _is_ignored(self, rel_path: str) -> bool:
+        parts = rel_path.split("/")
+        return any(part in self.analyzer.IGNORE_DIRS for part in parts) or parts[-1] in self.analyzer.IGNORE_FILES
+
+    def _add_watch(self, rel_dir: str):
+        if self._inotify is None:
+            return
+        full_path = self.repo_root if rel_dir == "." else os.path.join(self.repo_root, rel_dir)
+        try:
+            self._watches[self._inotify.add_watch(full_path, WATCH_MASK)] = rel_dir
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                # fs.inotify.max_user_watches 한도에 도달하면 폴링으로 전환합니다.
+                logger.warning("inotify watch 한도에 도달해 폴링으로 전환합니다. (fs.inotify.max_user_watches)")
+                self._inotify.close()
+                self._inotify = None
+                self._watches.clear()
+            elif e.errno != errno.ENOENT:
+                logger.warning(f"디렉터리 감시 등록 실패: {full_path} - {e}")
+
+    def _walk(self, rel_top: str):
+        """rel_top 이하를 순회하며 (상대 디렉터리, 하위 디렉터리 목록, 파일 목록)을 생성합니다. 무시 대상은 제외됩니다."""
+        top = self.repo_root if rel_top == "." else os.path.join(self.repo_root, rel_top)
+        for current_dir, dirs, files in os.walk(top):
+            rel_dir = os.path.relpath(current_dir, self.repo_root).replace("\\", "/")
+            dirs[:] = [d for d in dirs if d not in self.analyzer.IGNORE_DIRS]
+            yield rel_dir, dirs, [f for f in files if f not in self.analyzer.IGNORE_FILES]
+
+    def _add_subtree(self, rel_top: str):
+        for rel_dir, dirs, files in self._walk(rel_top):
+            if rel_dir != ".":
+                self._dirs.add(rel_dir)
+            self._add_watch(rel_dir)
+            for name in files:
+                self._update_file(name if rel_dir == "." else f"{rel_dir}/{name}")
+
+    def _remove_path(self, rel_path: str):
+        if self._files.pop(rel_path, None) is not None:
+            self._tree_changed = True
+        if self._loc.pop(rel_path, None) is not None:
+            self._loc_changed = True
+        if rel_path in self._dirs:
+            prefix = f"{rel_path}/"
+            self._dirs = {d for d in self._dirs if d != rel_path and not d.startswith(prefix)}
+            for path in [p for p in self._files if p.startswith(prefix)]:
+                del self._files[path]
+            for path in [p for p in self._loc if p.startswith(prefix)]:
+                del self._loc[path]
+                self._loc_changed = True
+            self._tree_changed = True
+
+    def _update_loc(self, rel_path: str):
+        language = self.analyzer.LANGUAGE_MAP.get(os.path.splitext(rel_path)[1])
+        if language is None or rel_path not in self._tracked:
+            return
+        try:
+            entry = (language, self.analyzer.count_loc(os.path.join(self.repo_root, rel_path)))
+        except OSError:
+            entry = None
+        if entry is None:
+            if self._loc.pop(rel_path, None) is not None:
+                self._loc_changed = True
+        elif self._loc.get(rel_path) != entry:
+            self._loc[rel_path] = entry
+            self._loc_changed = True
+
+    def _update_file(self, rel_path: str):
+        try:
+            size = os.path.getsize(os.path.join(self.repo_root, rel_path))
+        except OSError:
+            self._remove_path(rel_path)
+            return
+        if self._files.get(rel_path) != size:
+            self._files[rel_path] = size
+            self._tree_changed = True
+        self._update_loc(rel_path)
+
+    def _refresh_path(self, rel_path: str):
+        if self._is_ignored(rel_path):
+            return
+        try:
+            mode = os.lstat(os.path.join(self.repo_root, rel_path)).st_mode
+        except OSError:
+            self._remove_path(rel_path)
+            return
+        if stat.S_ISDIR(mode):
+            if rel_path not in self._dirs:
+                self._tree_changed = True
+                self._add_subtree(rel_path)
+        else:
+            self._update_file(rel_path)
+
+    def _load_tracked(self):
+        result = subprocess.run(
+            ["git", "ls-files", "-z"],
+            cwd=self.repo_root,
+            capture_output=True,
+            env=dict(os.environ, GIT_OPTIONAL_LOCKS="0"),
+        )
+        if result.returncode != 0:
+            logger.warning(f"추적 파일 목록 갱신 실패: {result.stderr.decode('utf-8', errors='replace').strip()}")
+            return
+        tracked = {path for path in result.stdout.decode("utf-8", errors="surrogateescape").split("\0") if path}
+        added = tracked - self._tracked
+        removed = self._tracked - tracked
+        self._tracked = tracked
+        for path in removed:
+            if self._loc.pop(path, None) is not None:
+                self._loc_changed = True
+        for path in added:
+            self._update_loc(path)
+
+    def _rebuild(self):
+        """전체 상태를 처음부터 다시 구성합니다 (시작 시, inotify 큐 overflow 시)."""
+        started = time.time()
+        if self._inotify is not None:
+            # 이미 등록된 디렉터리를 다시 등록하면 커널은 같은 wd를 돌려주므로 매핑만 새로 만듭니다.
+            self._watches.clear()
+            try:
+                self._watches[self._inotify.add_watch(self.git_dir, GIT_DIR_MASK)] = None
+            except OSError as e:
+                logger.warning(f"git 디렉터리 감시 등록 실패: {e}")
+        self._files.clear()
+        self._dirs.clear()
+        self._loc.clear()
+        self._tracked = set()
+        self._load_tracked()
+        self._add_subtree(".")
+        self._index_mtime = self._get_index_mtime()
+        if self._inotify is None:
+            self._poll_state = self._snapshot()
+        self._tree_changed = self._loc_changed = True
+        self.ready = True
+        logger.info(f"저장소 상태 구성 완료: 파일 {len(self._files)}개, {time.time() - started:.2f}초")
+
+    # ------------------------------------------------------------------
+    # 변경 감지
+    # ------------------------------------------------------------------
+    def _get_index_mtime(self):
+        try:
+            return os.stat(os.path.join(self.git_dir, "index")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _snapshot(self) -> dict:
+        state = {}
+        for rel_dir, dirs, files in self._walk("."):
+            for name in dirs:
+                state[name if rel_dir == "." else f"{rel_dir}/{name}"] = None
+            for name in files:
+                rel_path = name if rel_dir == "." else f"{rel_dir}/{name}"
+                try:
+                    file_stat = os.stat(os.path.join(self.repo_root, rel_path))
+                except OSError:
+                    continue
+                state[rel_path] = (file_stat.st_mtime_ns, file_stat.st_size)
+        return state
+
+    def _mark(self, paths=(), refresh_tracked: bool = False, full_rescan: bool = False):
+        if not paths and not refresh_tracked and not full_rescan:
+            return
+        now = time.monotonic()
+        self._pending.update(paths)
+        self._refresh_tracked = self._refresh_tracked or refresh_tracked
+        self._full_rescan = self._full_rescan or full_rescan
+        self._first_event = self._first_event or now
+        self._last_event = now
+
+    def _collect_inotify(self):
+        paths = set()
+        refresh_tracked = full_rescan = False
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                full_rescan = True
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if wd not in self._watches:
+                continue
+            rel_dir = self._watches[wd]
+            if rel_dir is None:
+                # git이 인덱스를 index.lock에서 index로 교체하면 추적 파일 목록이 바뀌었을 수 있습니다.
+                if name == "index":
+                    refresh_tracked = True
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if rel_dir != ".":
+                    paths.add(rel_dir)
+                continue
+            if name:
+                paths.add(name if rel_dir == "." else f"{rel_dir}/{name}")
+        self._mark(paths, refresh_tracked, full_rescan)
+
+    def _collect_poll(self):
+        snapshot = self._snapshot()
+        changed = {path for path, value in snapshot.items() if self._poll_state.get(path, 0) != value}
+        changed.update(path for path in self._poll_state if path not in snapshot)
+        self._poll_state = snapshot
+        index_mtime = self._get_index_mtime()
+        refresh_tracked = index_mtime != self._index_mtime
+        self._index_mtime = index_mtime
+        self._mark(changed, refresh_tracked)
+
+    def _apply(self):
+        """모아 둔 변경을 상태에 반영합니다."""
+        if self._full_rescan:
+            logger.warning("inotify 이벤트 큐가 넘쳐 저장소 상태를 다시 구성합니다.")
+            self._full_rescan = False
+            self._refresh_tracked = False
+            self._pending.clear()
+            self._rebuild()
+        else:
+            pending, self._pending = self._pending, set()
+            if self._refresh_tracked:
+                self._refresh_tracked = False
+                self._load_tracked()
+            # 상위 경로부터 처리해 새 디렉터리가 한 번만 순회되도록 합니다.
+            for rel_path in sorted(pending, key=lambda p: p.count("/")):
+                self._refresh_path(rel_path)
+            logger.debug(f"저장소 변경 {len(pending)}건 반영: {self.repo_root}")
+        self._first_event = self._last_event = None
+
+    def _sync(self):
+        """조회 직전에 아직 반영되지 않은 변경을 debounce 없이 반영합니다."""
+        if self._inotify is not None:
+            self._collect_inotify()
+        if self._first_event is not None:
+            self._apply()
+
+    def _push_delta(self):
+        if not self.project_id or not self.api_base_url or not (self._tree_changed or self._loc_changed):
+            return
+        payload = {"partial": True}
+        if self._tree_changed:
+            payload["file_tree"] = self.file_tree()
+        if self._loc_changed:
+            payload["language_stats"] = self.language_stats()
+            payload["total_loc"] = sum(payload["language_stats"].values())
+        self._tree_changed = self._loc_changed = False
+        try:
+            requests.post(
+                f"{self.api_base_url}/git/{self.project_id}/scan", json=payload, headers=self.headers, timeout=30,
+            ).raise_for_status()
+            logger.debug(f"스캔 변경분 업로드 완료: {sorted(payload)}")
+        except requests.RequestException as e:
+            logger.warning(f"스캔 변경분 업로드 실패: {e}")
+
+    def _run(self):
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.is_set():
+            try:
+                if self._inotify is not None:
+                    wait = self.debounce if self._first_event is not None else 1.0
+                    readable, _, _ = select.select([self._inotify.fd], [], [], wait)
+                    if readable:
+                        with self._lock:
+                            if self._inotify is not None:
+                                self._collect_inotify()
+                elif time.monotonic() >= next_poll:
+                    with self._lock:
+                        self._collect_poll()
+                    next_poll = time.monotonic() + self.poll_interval
+                else:
+                    self._stop.wait(min(self.debounce, max(0.0, next_poll - time.monotonic())))
+
+                with self._lock:
+                    if self._first_event is None:
+                        continue
+                    now = time.monotonic()
+                    if now - self._last_event >= self.debounce or now - self._first_event >= WATCH_MAX_DELAY_SECONDS:
+                        self._apply()
+                        self._push_delta()
+            except (OSError, ValueError) as e:
+                logger.error(f"저장소 감시 중 오류: {e}", exc_info=True)
+                self._stop.wait(self.poll_interval)
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def start_repo_watcher(git_analyzer, **kwargs) -> RepoWatcher:
+    """저장소 감시를 시작하고 등록합니다. 이미 감시 중이면 기존 watcher를 반환합니다."""
+    key = os.path.realpath(git_analyzer.repo_path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = RepoWatcher(git_analyzer, **kwargs)
+            watcher.start()
+            _watchers[key] = watcher
+        return watcher
+
+
+def get_repo_watcher(repo_path: str):
+    """저장소를 감시 중인 RepoWatcher를 반환하며, 없으면 None을 반환합니다."""
+    return _watchers.get(os.path.realpath(repo_path))
+
+
+@atexit.register
+def stop_repo_watchers():
+    with _watchers_lock:
+        for watcher in _watchers.values():
+            watcher.stop()
+        _watchers.clear()
@@ -0,0 +1,314 @@
+import os
+import re
+import ast
+import logging
+import posixpath
+import threading
+
+from blob_cache import get_loaded_index, run_batched, save_json
+
+logger = logging.getLogger(__name__)
+
+# 추출 규칙이나 색인 형식이 바뀌면 버전을 올려 기존 색인을 무효화합니다.
+INDEX_VERSION = "1"
+MAX_FILE_BYTES = 1024 * 1024
+
+LANGUAGE_BY_EXTENSION = {
+    '.py': 'python',
+    '.js': 'javascript', '.jsx': 'javascript', '.mjs': 'javascript',
+    '.ts': 'javascript', '.tsx': 'javascript',
+    '.go': 'go',
+    '.java': 'java',
+    '.cs': 'csharp',
+    '.rs': 'rust',
+    '.c': 'c', '.h': 'c', '.cpp': 'c', '.hpp': 'c',
+}
+
+# 언어별 정의/import 정규식 (이름은 첫 번째 그룹, 종류는 패턴에 지정)
+REGEX_RULES = {
+    'javascript': {
+        'defs': [
+            (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"), 'function'),
+            (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)"), 'class'),
+            (re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"), 'function'),
+            (re.compile(r"^\s*(?:export\s+)?(?:interface|type)\s+([A-Za-z_$][\w$]*)"), 'type'),
+        ],
+        'imports': [
+            re.compile(r"^\s*import\s+(?:[^'\"]*?\s+from\s+)?['\"]([^'\"]+)['\"]"),
+            re.compile(r"^\s*export\s+[^'\"]*?\s+from\s+['\"]([^'\"]+)['\"]"),
+            re.compile(r"require\(\s*['\"]([^'\"]+)['\"]\s*\)"),
+        ],
+    },
+    'go': {
+        'defs': [
+            (re.compile(r"^func\s+\([^)]*\)\s*([A-Za-z_]\w*)"), 'method'),
+            (re.compile(r"^func\s+([A-Za-z_]\w*)"), 'function'),
+            (re.compile(r"^type\s+([A-Za-z_]\w*)\s+(?:struct|interface)"), 'class'),
+        ],
+        'imports': [
+            re.compile(r"^\s*import\s+(?:[A-Za-z_.]\w*\s+)?\"([^\"]+)\""),
+            re.compile(r"^\s+(?:[A-Za-z_.]\w*\s+)?\"([^\"]+)\"\s*$"),
+        ],
+    },
+    'java': {
+        'defs': [
+            (re.compile(r"^\s*(?:(?:public|protected|private|static|final|abstract|sealed)\s+)*(?:class|interface|enum|record)\s+([A-Za-z_]\w*)"), 'class'),
+            (re.compile(r"^\s+(?:(?:public|protected|private|static|final|abstract|synchronized)\s+)+[\w<>\[\],\s]+?\s+([a-z_]\w*)\s*\("), 'method'),
+        ],
+        'imports': [re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+)(?:\.\*)?\s*;")],
+    },
+    'csharp': {
+        'defs': [
+            (re.compile(r"^\s*(?:(?:public|internal|protected|private|static|sealed|abstract|partial)\s+)*(?:class|interface|struct|enum|record)\s+([A-Za-z_]\w*)"), 'class'),
+            (re.compile(r"^\s+(?:(?:public|internal|protected|private|static|virtual|override|async|abstract)\s+)+[\w<>\[\],\s]+?\s+([A-Z_]\w*)\s*\("), 'method'),
+        ],
+        'imports': [re.compile(r"^\s*using\s+(?:static\s+)?([\w.]+)\s*;")],
+    },
+    'rust': {
+        'defs': [
+            (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+([A-Za-z_]\w*)"), 'function'),
+            (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|type)\s+([A-Za-z_]\w*)"), 'class'),
+        ],
+        'imports': [re.compile(r"^\s*(?:pub\s+)?use\s+([\w:]+)")],
+    },
+    'c': {
+        'defs': [
+            (re.compile(r"^\s*(?:typedef\s+)?(?:struct|class|enum|union)\s+([A-Za-z_]\w*)\s*[{:]"), 'class'),
+            (re.compile(r"^[A-Za-z_][\w\s\*&:<>,]*?[\s\*&]([A-Za-z_]\w*)\s*\([^;]*$"), 'function'),
+        ],
+        'imports': [re.compile(r"^\s*#\s*include\s*[<\"]([^>\"]+)[>\"]")],
+    },
+}
+
+
+def _extract_python(text: str) -> dict:
+    tree = ast.parse(text)
+    defs, imports = [], []
+
+    def visit(node, prefix, in_class):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                defs.append([f"{prefix}{child.name}", "method" if in_class else "function", child.lineno])
+                visit(child, f"{prefix}{child.name}.", False)
+            elif isinstance(child, ast.ClassDef):
+                defs.append([f"{prefix}{child.name}", "class", child.lineno])
+                visit(child, f"{prefix}{child.name}.", True)
+            elif isinstance(child, ast.Import):
+                imports.extend(alias.name for alias in child.names)
+            elif isinstance(child, ast.ImportFrom):
+                # 상대 import는 점을 유지해 두고 조회 시 파일 경로로 해석합니다.
+                module = "." * child.level + (child.module or "")
+                imports.append(module)
+                imports.extend(f"{module.rstrip('.')}.{alias.name}" if child.module else f"{module}{alias.name}"
+                               for alias in child.names if alias.name != "*")
+            else:
+                visit(child, prefix, in_class)
+
+    visit(tree, "", False)
+    return {"defs": defs, "imports": imports}
+
+
+def _extract_regex(text: str, language: str) -> dict:
+    rules = REGEX_RULES[language]
+    defs, imports = [], []
+    in_go_import_block = False
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        for pattern, kind in rules['defs']:
+            match = pattern.match(line)
+            if match:
+                defs.append([match.group(1), kind, line_no])
+                break
+        if language == 'go':
+            # go의 import ( ... ) 블록 안의 줄만 두 번째 패턴을 적용합니다.
+            stripped = line.strip()
+            if stripped.startswith("import ("):
+                in_go_import_block = True
+                continue
+            if in_go_import_block and stripped == ")":
+                in_go_import_block = False
+                continue
+            match = rules['imports'][1].match(line) if in_go_import_block else rules['imports'][0].match(line)
+            if match:
+                imports.append(match.group(1))
+            continue
+        for pattern in rules['imports']:
+            imports.extend(match.group(1) for match in pattern.finditer(line))
+    return {"defs": defs, "imports": imports}
+
+
+def extract_symbols(full_path: str, language: str):
+    """
+    파일 하나의 정의 목록과 import 목록을 추출합니다. 읽을 수 없거나 파싱할 수 없는 파일은 None을 반환합니다.
+    (프로세스 풀에서 실행되므로 모듈 최상위 함수로 둡니다.)
+    """
+    try:
+        if os.path.getsize(full_path) > MAX_FILE_BYTES:
+            return None
+        with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except OSError:
+        return None
+    try:
+        if language == 'python':
+            return _extract_python(text)
+        return _extract_regex(text, language)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+
+def _extract_batch(batch: list) -> list:
+    return [(key, extract_symbols(full_path, language)) for key, full_path, language in batch]
+
+
+def resolve_python_import(module: str, path: str) -> str:
+    """상대 import('.x', '..y.z')를 파일 경로 기준 절대 모듈 이름으로 바꿉니다."""
+    level = len(module) - len(module.lstrip("."))
+    if level == 0:
+        return module
+    package = posixpath.dirname(path).split("/") if posixpath.dirname(path) else []
+    if level > 1:
+        package = package[:-(level - 1)] if level - 1 <= len(package) else []
+    return ".".join(part for part in package + [module[level:]] if part)
+
+
+class _LoadedSymbols:
+    """디스크 색인과 이름별 정의 조회 테이블을 함께 보관합니다. 프로세스 안에서 저장소별로 공유됩니다."""
+
+    def __init__(self, entries: dict):
+        self.entries = entries  # "blob SHA:언어" -> {"defs": [...], "imports": [...]} (추출 실패 시 None)
+        self.defs_by_name = {}  # 짧은 이름(소문자) -> [(key, 정규화된 이름, 종류, 줄)]
+        for key, entry in entries.items():
+            self._add_defs(key, entry)
+        self.lock = threading.Lock()
+
+    def _add_defs(self, key: str, entry):
+        if entry is None:
+            return
+        for name, kind, line in entry["defs"]:
+            short = name.rsplit(".", 1)[-1].lower()
+            self.defs_by_name.setdefault(short, []).append((key, name, kind, line))
+
+    def add(self, key: str, entry):
+        self.entries[key] = entry
+        self._add_defs(key, entry)
+
+    def remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for name, _kind, _line in entry["defs"]:
+            short = name.rsplit(".", 1)[-1].lower()
+            remaining = [item for item in self.defs_by_name.get(short, []) if item[0] != key]
+            if remaining:
+                self.defs_by_name[short] = remaining
+            else:
+                self.defs_by_name.pop(short, None)
+
+
+class SymbolIndex:
+    """
+    저장소의 정의(함수, 클래스, 메서드)와 import 관계를 추출해 조회하는 도구.
+    - Python은 ast로, 그 외 언어는 가벼운 정규식 규칙으로 추출합니다.
+    - 추출 결과는 blob SHA 단위로 .git/flash/symbols에 저장되어 변경된 파일만 다시 추출합니다.
+    """
+
+    def __init__(self, git_analyzer, max_workers: int = None):
+        self.git_analyzer = git_analyzer
+        self.repo_path = git_analyzer.repo_path
+        self.max_workers = max_workers
+        self.index_path = os.path.join(git_analyzer.get_cache_dir("symbols"), f"v{INDEX_VERSION}.json")
+
+    @staticmethod
+    def _key(sha: str, language: str) -> str:
+        # 같은 내용이라도 언어(확장자)에 따라 추출 결과가 다르므로 키에 포함합니다.
+        return f"{sha}:{language}"
+
+    def _load(self) -> _LoadedSymbols:
+        return get_loaded_index(self.index_path, _LoadedSymbols)
+
+    def update(self) -> tuple:
+        """
+        `git ls-files -s` 기준 blob SHA와 색인을 비교해 바뀐 파일만 다시 추출합니다.
+        {경로: 색인 키}와 색인 객체를 반환합니다.
+        """
+        keys_by_path = {}
+        for path, sha in self.git_analyzer.get_blob_shas().items():
+            language = LANGUAGE_BY_EXTENSION.get(os.path.splitext(path)[1])
+            if language:
+                keys_by_path[path] = self._key(sha, language)
+
+        index = self._load()
+        with index.lock:
+            pending = {}
+            for path, key in keys_by_path.items():
+                if key not in index.entries and key not in pending:
+                    pending[key] = (os.path.join(self.repo_path, path), key.rsplit(":", 1)[1])
+
+            items = [(key, full_path, language) for key, (full_path, language) in pending.items()]
+            results = run_batched(_extract_batch, items, self.max_workers)
+            for key, entry in results:
+                index.add(key, entry)
+            live = set(keys_by_path.values())
+            stale = [key for key in index.entries if key not in live]
+            for key in stale:
+                index.remove(key)
+            if results or stale:
+                save_json(self.index_path, index.entries)
+        logger.info(f"심볼 색인 갱신: 전체 {len(keys_by_path)}개, 새로 추출 {len(results)}개, 제거 {len(stale)}개")
+        return keys_by_path, index
+
+    def find_definitions(self, symbol: str, keys_by_path: dict, index: _LoadedSymbols) -> list:
+        """이름(또는 'Class.method'처럼 점으로 구분된 이름)이 일치하는 정의 위치를 반환합니다."""
+        paths_by_key = {}
+        for path, key in sorted(keys_by_path.items()):
+            paths_by_key.setdefault(key, []).append(path)
+        wanted = symbol.lower()
+        definitions = []
+        with index.lock:
+            for key, name, kind, line in index.defs_by_name.get(wanted.rsplit(".", 1)[-1], []):
+                lowered = name.lower()
+                if "." in wanted and lowered != wanted and not lowered.endswith(f".{wanted}"):
+                    continue
+                for path in paths_by_key.get(key, []):
+                    definitions.append({"path": path, "name": name, "kind": kind, "line": line})
+        return sorted(definitions, key=lambda item: (item["path"], item["line"]))
+
+    def find_importers(self, module: str, keys_by_path: dict, index: _LoadedSymbols) -> list:
+        """module(또는 그 하위/상위 모듈, 경로 일부)을 import하는 파일과 import 문자열을 반환합니다."""
+        importers = []
+        with index.lock:
+            for path, key in sorted(keys_by_path.items()):
+                entry = index.entries.get(key)
+                if not entry:
+                    continue
+                is_python = key.endswith(":python")
+                matched = []
+                for imported in entry["imports"]:
+                    resolved = resolve_python_import(imported, path) if is_python else imported
+                    normalized = resolved.replace("::", ".").replace("/", ".")
+                    if (normalized == module or normalized.startswith(f"{module}.")
+                            or normalized.endswith(f".{module}") or resolved.endswith(f"/{module}")):
+                        matched.append(resolved)
+                if matched:
+                    importers.append({"path": path, "imports": sorted(set(matched))})
+        return importers
+
+    def lookup_symbol(self, symbol: str = None, module: str = None, max_results: int = 50) -> dict:
+        """심볼이 정의된 위치(symbol)와 모듈을 import하는 파일(module)을 조회합니다."""
+        try:
+            if not symbol and not module:
+                return {"error": "symbol 또는 module 중 하나는 지정해야 합니다."}
+            keys_by_path, index = self.update()
+            result = {"indexed_files": len(keys_by_path)}
+            if symbol:
+                definitions = self.find_definitions(symbol, keys_by_path, index)
+                result["definitions"] = definitions[:max_results]
+                result["definition_count"] = len(definitions)
+            if module:
+                importers = self.find_importers(module, keys_by_path, index)
+                result["importers"] = importers[:max_results]
+                result["importer_count"] = len(importers)
+            return result
+        except Exception as e:
+            logger.error(f"심볼 조회 중 에러 발생: {e}", exc_info=True)
+            return {"error": str(e)}
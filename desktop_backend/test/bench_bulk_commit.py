@@ -0,0 +1,85 @@
+import sys
+import time
+import shutil
+import logging
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+
+# --- Ensure desktop_backend is on sys.path ---
+HERE = Path(__file__).resolve()
+BACKEND_ROOT = HERE.parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from git_commit_module import GitCommitModule
+
+
+def git(repo: Path, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def init_repo(path: Path, files: int):
+    path.mkdir(parents=True)
+    git(path, "init", "-q", "-b", "main")
+    git(path, "config", "user.email", "bench@example.com")
+    git(path, "config", "user.name", "bench")
+    for i in range(files):
+        (path / f"dir{i % 50}").mkdir(exist_ok=True)
+        (path / f"dir{i % 50}" / f"file{i}.txt").write_text(f"seed {i}\n")
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", "seed")
+
+
+def touch_files(repo: Path, files: int, round_no: int) -> list:
+    changed = []
+    for i in range(files):
+        rel = f"dir{i % 50}/file{i}.txt"
+        (repo / rel).write_text(f"round {round_no} {i}\n")
+        changed.append(rel)
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="create_commit vs create_commits_bulk benchmark")
+    parser.add_argument("--files", type=int, default=5000, help="저장소 파일 수")
+    parser.add_argument("--commits", type=int, default=10, help="작성할 커밋 수")
+    parser.add_argument("--changed", type=int, default=500, help="커밋마다 변경할 파일 수")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="flash_bench_"))
+    try:
+        repo_single = work_dir / "single"
+        repo_bulk = work_dir / "bulk"
+        init_repo(repo_single, args.files)
+        init_repo(repo_bulk, args.files)
+
+        module = GitCommitModule(str(repo_single))
+        started = time.perf_counter()
+        for round_no in range(args.commits):
+            changed = touch_files(repo_single, args.changed, round_no)
+            result = module.create_commit(f"round {round_no}", changed)
+            assert result["success"], result
+        single_elapsed = time.perf_counter() - started
+
+        module = GitCommitModule(str(repo_bulk))
+        started = time.perf_counter()
+        # 같은 조건으로 비교하도록 라운드마다 파일을 쓰고 커밋 하나씩 작성합니다.
+        for round_no in range(args.commits):
+            changed = touch_files(repo_bulk, args.changed, round_no)
+            specs = [{"message": f"round {round_no}", "files": changed}]
+            result = module.create_commits_bulk(specs)
+            assert result["success"], result
+        bulk_elapsed = time.perf_counter() - started
+
+        print(f"files={args.files} commits={args.commits} changed/commit={args.changed}")
+        print(f"create_commit:       {single_elapsed:.2f}s")
+        print(f"create_commits_bulk: {bulk_elapsed:.2f}s ({single_elapsed / bulk_elapsed:.1f}x)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+임시 git 저장소에서 desktop_backend 저장소 도구의 동작을 확인하는 pytest 테스트.
+실행: python -m pytest -q desktop_backend/test/test_git_tools.py
+"""
+import sys
+import subprocess
+from pathlib import Path
+
+import pytest
+
+# --- Ensure desktop_backend is on sys.path ---
+HERE = Path(__file__).resolve()
+BACKEND_ROOT = HERE.parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from git_analyzer import GitAnalyzer
+from git_commit_module import GitCommitModule
+from git_object_reader import GitObjectReader
+
+
+def git(repo: Path, *args) -> str:
+    result = subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+    return result.stdout.decode("utf-8").strip()
+
+
+def commit_files(repo: Path, files: dict, message: str, author: str = "dev@example.com") -> str:
+    for name, content in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content, encoding="utf-8")
+    git(repo, "add", "-A")
+    git(repo, "-c", f"user.email={author}", "commit", "-q", "-m", message)
+    return git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    path.mkdir()
+    git(path, "init", "-q", "-b", "main")
+    git(path, "config", "user.email", "dev@example.com")
+    git(path, "config", "user.name", "dev")
+    return path
+
+
+def test_hotspots_track_non_ascii_paths(repo):
+    commit_files(repo, {"한글.py": "a = 1\n", "plain.py": "b = 1\n"}, "initial")
+    commit_files(repo, {"한글.py": "a = 1\na = 2\n"}, "edit", author="other@example.com")
+
+    analyzer = GitAnalyzer(repo_path=str(repo))
+    result = analyzer.analyze_hotspots()
+    hotspots = {h["path"]: h for h in result["hotspots"]}
+    assert result["commits_processed"] == 2
+    assert hotspots["한글.py"]["commits"] == 2
+    assert hotspots["한글.py"]["added"] == 2
+    assert hotspots["한글.py"]["authors"] == 2
+
+    # 증분 집계도 같은 경로 키에 누적합니다.
+    commit_files(repo, {"한글.py": "a = 1\na = 2\na = 3\n"}, "edit again")
+    result = analyzer.analyze_hotspots()
+    hotspots = {h["path"]: h for h in result["hotspots"]}
+    assert result["commits_processed"] == 1
+    assert hotspots["한글.py"]["commits"] == 3
+    assert set(hotspots) == {"한글.py", "plain.py"}
+
+
+def test_get_diff_pages_by_file_and_skips_binary(repo):
+    commit_files(repo, {"seed.txt": "seed\n"}, "initial")
+    files = {f"src/file{i}.py": f"value = {i}\n" for i in range(5)}
+    files["image.bin"] = bytes(range(256))
+    sha = commit_files(repo, files, "add files")
+
+    module = GitCommitModule(repo_path=str(repo))
+    pages, cursor = [], 0
+    while cursor is not None:
+        page = module.get_diff(sha, cursor=cursor, page_size=2)
+        pages.append(page)
+        cursor = page["next_cursor"]
+
+    listed = [path for page in pages for path in page["files"]]
+    skipped = [path for page in pages for path in page["skipped_binary"]]
+    assert listed == sorted(files.keys() - {"image.bin"})
+    assert skipped == ["image.bin"]
+    assert all(len(page["files"]) <= 2 for page in pages)
+    assert "value = 0" in pages[0]["diff"]
+    # 머리말(커밋 정보)은 첫 페이지에만 포함합니다.
+    assert "add files" in pages[0]["diff"]
+    assert all("add files" not in page["diff"] for page in pages[1:])
+
+    truncated = module.get_diff(sha, max_bytes=50)
+    assert truncated.endswith("(diff truncated at 50 bytes)")
+    stat = module.get_diff(sha, stat_only=True)
+    assert "src/file4.py" in stat and "image.bin" in stat
+
+
+def test_create_commits_bulk_fails_when_branch_moves(repo, monkeypatch):
+    base = commit_files(repo, {"a.txt": "a\n"}, "initial")
+    git(repo, "branch", "work")
+    module = GitCommitModule(repo_path=str(repo))
+    (repo / "b.txt").write_text("b\n", encoding="utf-8")
+    (repo / "c.txt").write_text("c\n", encoding="utf-8")
+
+    # 커밋을 만든 뒤 브랜치를 갱신하기 직전에 다른 작업이 브랜치를 움직인 상황을 만듭니다.
+    concurrent = git(repo, "commit-tree", f"{base}^{{tree}}", "-p", base, "-m", "concurrent")
+    run_git = module._run_git
+
+    def move_branch_first(args, *rest, **kwargs):
+        if args[0] == "update-ref":
+            git(repo, "update-ref", "refs/heads/work", concurrent)
+        return run_git(args, *rest, **kwargs)
+
+    monkeypatch.setattr(module, "_run_git", move_branch_first)
+    result = module.create_commits_bulk(
+        [{"message": "add b", "files": ["b.txt"]}, {"message": "add c", "files": ["c.txt"]}],
+        branch="work",
+    )
+    assert result["success"] is False
+    assert git(repo, "rev-parse", "refs/heads/work") == concurrent
+    assert not list((repo / ".git").glob("flash-bulk-index.*"))
+
+    # 브랜치가 그대로면 커밋이 순서대로 쌓이고 브랜치가 마지막 커밋으로 한 번에 갱신됩니다.
+    monkeypatch.setattr(module, "_run_git", run_git)
+    result = module.create_commits_bulk(
+        [{"message": "add b", "files": ["b.txt"]}, {"message": "add c", "files": ["c.txt"]}],
+        branch="work",
+    )
+    assert result["success"] is True
+    assert git(repo, "rev-parse", "refs/heads/work") == result["head"] == result["commit_hashes"][-1]
+    assert git(repo, "rev-parse", f"{result['head']}~2") == concurrent
+    assert git(repo, "rev-parse", "HEAD") == base
+
+
+def test_object_reader_restarts_after_process_dies(repo):
+    sha = commit_files(repo, {"a.txt": "hello\n"}, "initial")
+    reader = GitObjectReader(str(repo))
+    try:
+        assert reader.object_info("HEAD")[0] == sha
+        assert reader.read_object("HEAD:a.txt")[3] == b"hello\n"
+
+        # 종료된 프로세스는 다음 요청에서 새로 시작합니다.
+        for process in (reader._check, reader._batch):
+            old_pid = process.proc.pid
+            process.proc.kill()
+            process.proc.wait()
+            assert process.proc.poll() is not None
+            assert reader.object_info("HEAD")[0] == sha
+            assert reader.read_object("HEAD:a.txt")[3] == b"hello\n"
+            assert process.proc.pid != old_pid
+
+        # 통신 중 파이프가 끊기면 한 번 재시작한 뒤 같은 요청을 다시 보냅니다.
+        reader._check.proc.stdin.close()
+        assert reader.object_sizes(["HEAD:a.txt", "HEAD:missing.txt"]) == {"HEAD:a.txt": 6}
+        assert reader.object_info("HEAD:missing.txt") is None
+    finally:
+        reader.close()
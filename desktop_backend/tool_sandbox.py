@@ -0,0 +1,244 @@
+import os
+import queue
+import atexit
+import pickle
+import signal
+import logging
+import resource
+import threading
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+
+logger = logging.getLogger(__name__)
+
+# 작업자 프로세스 수, 작업자별 메모리 제한(RLIMIT_AS), 작업별 CPU 시간 제한(RLIMIT_CPU), 작업별 대기 제한
+TOOL_SANDBOX_WORKERS = int(os.getenv("TOOL_SANDBOX_WORKERS", str(min(4, os.cpu_count() or 1))))
+TOOL_SANDBOX_MEMORY_MB = int(os.getenv("TOOL_SANDBOX_MEMORY_MB", "2048"))
+TOOL_SANDBOX_CPU_SECONDS = int(os.getenv("TOOL_SANDBOX_CPU_SECONDS", "300"))
+TOOL_SANDBOX_TIMEOUT = float(os.getenv("TOOL_SANDBOX_TIMEOUT", "600"))
+# 이보다 큰 결과는 파이프 대신 공유 메모리로 전달합니다.
+SHARED_MEMORY_THRESHOLD = 1024 * 1024
+
+# 저장소를 읽기만 하는 분석 도구 (인덱스를 변경하는 커밋 도구는 에이전트 프로세스에서 실행합니다)
+SANDBOXED_TOOLS = {
+    "scan_file_tree",
+    "calculate_loc_per_language",
+    "analyze_hotspots",
+    "get_diff",
+    "scan_issues",
+    "search_code",
+    "lookup_symbol",
+}
+
+
+class ToolSandboxError(RuntimeError):
+    pass
+
+
+def build_analysis_tools(repo_path: str, api_base_url: str = None, headers: dict = None) -> dict:
+    """저장소별 분석 도구 함수를 만듭니다. (에이전트 모듈은 부작용이 있어 가져오지 않습니다.)"""
+    from git_analyzer import GitAnalyzer
+    from git_commit_module import GitCommitModule
+    from issue_scanner import IssueScanner
+    from code_search import CodeSearchIndex
+    from symbol_index import SymbolIndex
+
+    analyzer = GitAnalyzer(repo_path=repo_path)
+    commit_module = GitCommitModule(repo_path=repo_path)
+    return {
+        "scan_file_tree": analyzer.scan_file_tree,
+        "calculate_loc_per_language": analyzer.calculate_loc_per_language,
+        "analyze_hotspots": analyzer.analyze_hotspots,
+        "get_diff": commit_module.get_diff,
+        "scan_issues": IssueScanner(analyzer, api_base_url=api_base_url, headers=headers).scan_issues,
+        "search_code": CodeSearchIndex(analyzer).search_code,
+        "lookup_symbol": SymbolIndex(analyzer).lookup_symbol,
+    }
+
+
+def _send_result(conn, status: str, value):
+    data = pickle.dumps((status, value), protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) <= SHARED_MEMORY_THRESHOLD:
+        conn.send(("pipe", data))
+        return
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    shm.buf[:len(data)] = data
+    shm.close()
+    # 공유 메모리는 부모가 읽은 뒤 해제하므로, 작업자 종료 시 자동 정리 대상에서 제외합니다.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    conn.send(("shm", shm.name, len(data)))
+
+
+def _worker_main(conn, memory_limit_mb: int, cpu_seconds: int, api_base_url: str, headers: dict):
+    """작업자 프로세스 루프. 메모리 제한을 걸고, 작업마다 CPU 시간 제한을 새로 설정한 뒤 도구를 실행합니다."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    tools_by_repo = {}
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        repo_path, tool_name, kwargs = task
+        if cpu_seconds > 0:
+            # RLIMIT_CPU는 프로세스 누적 시간 기준이므로 지금까지 사용한 시간에 작업별 제한을 더합니다.
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.getrlimit(resource.RLIMIT_CPU)[1]))
+        try:
+            tools = tools_by_repo.get(repo_path)
+            if tools is None:
+                tools = build_analysis_tools(repo_path, api_base_url, headers)
+                tools_by_repo[repo_path] = tools
+            _send_result(conn, "ok", tools[tool_name](**kwargs))
+        except MemoryError:
+            # 메모리 제한에 걸린 프로세스는 상태를 신뢰할 수 없으므로 결과를 보내고 종료합니다.
+            _send_result(conn, "error", f"memory limit exceeded ({memory_limit_mb}MB)")
+            return
+        except Exception as e:
+            _send_result(conn, "error", f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}")
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_mb, cpu_seconds, api_base_url, headers):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit_mb, cpu_seconds, api_base_url, headers),
+            # 색인/이슈 스캔 도구가 내부에서 프로세스 풀을 쓰므로 daemon 프로세스로 만들지 않습니다.
+            daemon=False,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def describe_exit(self) -> str:
+        self.process.join(timeout=1)
+        code = self.process.exitcode
+        if code is None:
+            return "no response"
+        if code < 0:
+            try:
+                return f"killed by {signal.Signals(-code).name}"
+            except ValueError:
+                return f"killed by signal {-code}"
+        return f"exited with code {code}"
+
+
+class ToolSandbox:
+    """
+    분석 도구를 별도 작업자 프로세스 풀에서 실행합니다.
+    - 작업자마다 RLIMIT_AS 메모리 제한, 작업마다 RLIMIT_CPU 시간 제한과 대기 시간 제한을 둡니다.
+    - 제한을 넘기거나 비정상 종료한 작업자는 종료 후 새로 띄우고, 해당 호출은 ToolSandboxError로 실패 처리합니다.
+    - 큰 결과는 공유 메모리로 전달해 파이프 복사를 줄입니다.
+    """
+
+    def __init__(self, max_workers: int = None, memory_limit_mb: int = None, cpu_seconds: int = None,
+                 timeout: float = None, api_base_url: str = None, headers: dict = None):
+        self.max_workers = max(1, max_workers or TOOL_SANDBOX_WORKERS)
+        self.memory_limit_mb = TOOL_SANDBOX_MEMORY_MB if memory_limit_mb is None else memory_limit_mb
+        self.cpu_seconds = TOOL_SANDBOX_CPU_SECONDS if cpu_seconds is None else cpu_seconds
+        self.timeout = TOOL_SANDBOX_TIMEOUT if timeout is None else timeout
+        self.api_base_url = api_base_url
+        self.headers = headers or {}
+        # 에이전트는 스레드(cat-file 리더, watcher)를 쓰므로 fork 대신 forkserver로 작업자를 만듭니다.
+        self._context = multiprocessing.get_context("forkserver")
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = 0
+        self._closed = False
+        # daemon이 아닌 작업자는 인터프리터 종료 시 join되므로 먼저 정리합니다.
+        atexit.register(self.close)
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, self.memory_limit_mb, self.cpu_seconds, self.api_base_url, self.headers)
+
+    def _acquire(self) -> _Worker:
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise ToolSandboxError("tool sandbox is closed")
+                if self._idle.empty() and self._started < self.max_workers:
+                    self._started += 1
+                    try:
+                        return self._spawn()
+                    except Exception:
+                        self._started -= 1
+                        raise
+            worker = self._idle.get()
+            if worker.process.is_alive():
+                return worker
+            # 대기 중에 종료된 작업자(OOM killer 등)는 버리고 다시 고릅니다.
+            logger.warning(f"유휴 도구 작업자가 종료되어 교체합니다: pid={worker.process.pid} ({worker.describe_exit()})")
+            self._release(worker, healthy=False)
+
+    def _release(self, worker: _Worker, healthy: bool):
+        if healthy:
+            self._idle.put(worker)
+            return
+        worker.kill()
+        with self._lock:
+            self._started -= 1
+
+    @staticmethod
+    def _read_result(message):
+        if message[0] == "pipe":
+            return pickle.loads(message[1])
+        _kind, name, size = message
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            return pickle.loads(bytes(shm.buf[:size]))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def run(self, repo_path: str, tool_name: str, kwargs: dict, timeout: float = None):
+        """도구를 작업자 프로세스에서 실행하고 결과를 반환합니다. 실패하면 ToolSandboxError를 발생시킵니다."""
+        if tool_name not in SANDBOXED_TOOLS:
+            raise ToolSandboxError(f"'{tool_name}' is not a sandboxed tool")
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._acquire()
+        healthy = False
+        try:
+            worker.conn.send((os.path.realpath(repo_path), tool_name, dict(kwargs)))
+            if not worker.conn.poll(timeout):
+                raise ToolSandboxError(f"'{tool_name}' timed out after {timeout:.0f}s")
+            try:
+                message = worker.conn.recv()
+            except EOFError:
+                raise ToolSandboxError(f"'{tool_name}' worker {worker.describe_exit()}")
+            status, value = self._read_result(message)
+            healthy = worker.process.is_alive()
+            if status != "ok":
+                raise ToolSandboxError(f"'{tool_name}' failed: {value}")
+            return value
+        except (OSError, EOFError) as e:
+            raise ToolSandboxError(f"'{tool_name}' worker communication failed: {e}")
+        finally:
+            if not healthy:
+                logger.warning(f"도구 작업자 교체: {tool_name} (pid={worker.process.pid})")
+            self._release(worker, healthy)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.kill()
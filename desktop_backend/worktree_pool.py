@@ -0,0 +1,211 @@
+import os
+import time
+import fcntl
+import shutil
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+
+from git_object_reader import get_object_reader
+
+logger = logging.getLogger(__name__)
+
+# 저장소마다 유지할 worktree 수, 유휴 worktree 전체 디스크 사용량 제한, 임대 대기 시간
+WORKTREE_POOL_SIZE = int(os.getenv("WORKTREE_POOL_SIZE", "4"))
+WORKTREE_MAX_DISK_BYTES = int(os.getenv("WORKTREE_MAX_DISK_MB", "2048")) * 1024 * 1024
+WORKTREE_LEASE_TIMEOUT = float(os.getenv("WORKTREE_LEASE_TIMEOUT", "300"))
+# 유휴 worktree 디스크 사용량을 확인하는 최소 간격(초). 확인은 worktree 전체를 훑으므로 반납할 때마다 하지 않습니다.
+WORKTREE_DISK_CHECK_SECONDS = float(os.getenv("WORKTREE_DISK_CHECK_SECONDS", "60"))
+# 다른 에이전트 프로세스가 worktree를 반납했는지 확인하는 간격(초)
+LEASE_POLL_INTERVAL = 0.5
+
+
+class WorktreePoolError(RuntimeError):
+    pass
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+class WorktreePool:
+    """
+    저장소 하나에 대한 `git worktree` 풀.
+    인덱스를 변경하는 작업은 임대한 worktree에서 실행해 메인 체크아웃과 다른 작업의 index.lock과 경합하지 않습니다.
+    - worktree는 <공용 git 디렉터리>/flash/worktrees/wt-<n>에 만들어지고, 임대 전후로 초기화되어 재사용됩니다.
+    - 슬롯마다 잠금 파일(flock)을 두어 같은 저장소를 쓰는 여러 에이전트 프로세스 사이에서도 하나의 작업만 임대합니다.
+    """
+
+    def __init__(self, repo_path: str, max_worktrees: int = None, max_disk_bytes: int = None):
+        self.repo_path = os.path.realpath(repo_path)
+        self.max_worktrees = max(1, max_worktrees or WORKTREE_POOL_SIZE)
+        self.max_disk_bytes = WORKTREE_MAX_DISK_BYTES if max_disk_bytes is None else max_disk_bytes
+        common_dir = self._run_git(["rev-parse", "--git-common-dir"])
+        self.root = os.path.join(os.path.join(self.repo_path, common_dir), "flash", "worktrees")
+        os.makedirs(self.root, exist_ok=True)
+        self._cond = threading.Condition()
+        self._leased = set()
+        self._last_disk_check = 0.0
+        # 비정상 종료로 남은 worktree 관리 정보를 정리합니다.
+        self._run_git(["worktree", "prune"])
+
+    def _run_git(self, args: list, cwd: str = None) -> str:
+        cmd = ["git"] + args
+        result = subprocess.run(cmd, cwd=cwd or self.repo_path, capture_output=True)
+        if result.returncode != 0:
+            raise WorktreePoolError(f"{' '.join(cmd)} 실패: {result.stderr.decode('utf-8', errors='replace').strip()}")
+        return result.stdout.decode("utf-8", errors="replace").strip()
+
+    def _slot_path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _try_lock(self, name: str):
+        lock_file = open(f"{self._slot_path(name)}.lock", "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _acquire(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for index in range(self.max_worktrees):
+                    name = f"wt-{index}"
+                    if name in self._leased:
+                        continue
+                    lock_file = self._try_lock(name)
+                    if lock_file is not None:
+                        self._leased.add(name)
+                        return name, lock_file
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise WorktreePoolError(f"{timeout:.0f}초 안에 사용 가능한 worktree가 없습니다: {self.repo_path}")
+                self._cond.wait(min(remaining, LEASE_POLL_INTERVAL))
+
+    def _release(self, name: str, lock_file):
+        # 잠금 파일의 mtime을 마지막 사용 시각으로 사용합니다(디스크 정리 시 LRU 기준).
+        os.utime(lock_file.name)
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+        with self._cond:
+            self._leased.discard(name)
+            self._cond.notify()
+
+    def _prepare(self, path: str, sha: str):
+        """worktree를 만들거나, 이미 있으면 sha로 detach 체크아웃하고 추적되지 않는 파일을 지웁니다."""
+        if os.path.exists(os.path.join(path, ".git")):
+            try:
+                self._run_git(["checkout", "-q", "-f", "--detach", sha], cwd=path)
+                self._run_git(["clean", "-q", "-ffdx"], cwd=path)
+                return
+            except WorktreePoolError as e:
+                logger.warning(f"worktree 초기화 실패, 다시 생성합니다: {path} ({e})")
+                self._remove(path)
+        elif os.path.exists(path):
+            shutil.rmtree(path, ignore_errors=True)
+        self._run_git(["worktree", "prune"])
+        self._run_git(["worktree", "add", "-q", "-f", "--detach", path, sha])
+        logger.info(f"worktree 생성: {path} ({sha[:12]})")
+
+    def _reset(self, path: str):
+        try:
+            self._run_git(["reset", "-q", "--hard"], cwd=path)
+            self._run_git(["clean", "-q", "-ffdx"], cwd=path)
+        except WorktreePoolError as e:
+            logger.warning(f"worktree 정리 실패, 제거합니다: {path} ({e})")
+            self._remove(path)
+
+    def _remove(self, path: str):
+        try:
+            self._run_git(["worktree", "remove", "--force", path])
+        except WorktreePoolError:
+            shutil.rmtree(path, ignore_errors=True)
+            self._run_git(["worktree", "prune"])
+        logger.info(f"worktree 제거: {path}")
+
+    def _enforce_disk_limit(self):
+        """
+        유휴 worktree 전체 크기가 제한을 넘으면 오래 사용하지 않은 worktree부터 제거합니다.
+        마지막 확인 후 WORKTREE_DISK_CHECK_SECONDS가 지나지 않았으면 건너뜁니다.
+        """
+        if self.max_disk_bytes <= 0:
+            return
+        with self._cond:
+            if time.monotonic() - self._last_disk_check < WORKTREE_DISK_CHECK_SECONDS:
+                return
+            self._last_disk_check = time.monotonic()
+        idle = []
+        for index in range(self.max_worktrees):
+            name = f"wt-{index}"
+            path = self._slot_path(name)
+            if not os.path.isdir(path):
+                continue
+            with self._cond:
+                if name in self._leased:
+                    continue
+                lock_file = self._try_lock(name)
+                if lock_file is None:
+                    continue
+                self._leased.add(name)
+            idle.append((os.path.getmtime(lock_file.name), name, path, lock_file))
+
+        try:
+            sizes = {name: _directory_size(path) for _, name, path, _ in idle}
+            total = sum(sizes.values())
+            for _, name, path, _ in sorted(idle):
+                if total <= self.max_disk_bytes:
+                    break
+                self._remove(path)
+                total -= sizes[name]
+        finally:
+            for _, name, _, lock_file in idle:
+                self._release(name, lock_file)
+
+    @contextmanager
+    def lease(self, ref: str = "HEAD", timeout: float = None):
+        """
+        ref를 detach 체크아웃한 worktree 경로를 임대합니다. 블록을 벗어나면 worktree를 초기화해 반납합니다.
+        :param ref: 체크아웃할 커밋 또는 브랜치 (메인 저장소 기준으로 해석)
+        :param timeout: 사용 가능한 worktree를 기다릴 최대 시간(초)
+        """
+        commit_info = get_object_reader(self.repo_path).object_info(f"{ref}^{{commit}}")
+        if commit_info is None:
+            raise WorktreePoolError(f"커밋을 찾을 수 없습니다: {ref}")
+        sha = commit_info[0]
+        name, lock_file = self._acquire(WORKTREE_LEASE_TIMEOUT if timeout is None else timeout)
+        path = self._slot_path(name)
+        try:
+            self._prepare(path, sha)
+            logger.debug(f"worktree 임대: {path} ({sha[:12]})")
+            yield path
+        finally:
+            if os.path.exists(path):
+                self._reset(path)
+            self._release(name, lock_file)
+            self._enforce_disk_limit()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_worktree_pool(repo_path: str) -> WorktreePool:
+    """저장소 경로별로 공유되는 WorktreePool을 반환합니다."""
+    key = os.path.realpath(repo_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = WorktreePool(key)
+            _pools[key] = pool
+        return pool
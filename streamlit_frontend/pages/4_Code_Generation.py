@@ -3,7 +3,6 @@ from __future__ import annotations
 import json
 import logging
 import os
-import time
 from datetime import datetime
 
 import streamlit as st
@@ -139,7 +138,7 @@ with st.container(border=True):
     if run_diff:
         run = True
         job_type = "repository_analysis"
-        job_payload = {"tool_name": "get_diff", "tool_args": {}}
+        job_payload = {"tool_name": "get_diff", "tool_args": {"max_bytes": 500_000}}
         language = "diff"
         st.session_state.analysis_mode = "git_diff"
 
@@ -163,15 +162,16 @@ if run and selected:
         st.divider()
 
         progress_area = st.container()
+        # 생성 중인 코드는 한 자리에서 계속 갱신합니다.
+        code_preview = st.empty()
         poll_count = 0
 
-        while True:
+        # SSE 스트림으로 진행 상황을 받고, 스트림을 쓸 수 없으면 증분 폴링으로 대체합니다.
+        for data in client.follow_job(access, project_id, job_id):
             poll_count += 1
-            data = client.get_job(access, project_id, job_id)
             if not data:
                 with progress_area:
                     st.warning("작업 상태 조회가 지연되고 있습니다. 잠시 후 다시 시도합니다...")
-                time.sleep(2.5)
                 continue
 
             status = data.get("status")
@@ -182,6 +182,10 @@ if run and selected:
             is_success = status in ("completed", "success")
             is_failed = status in ("failed", "error")
 
+            partial = data.get("partial_summary")
+            if partial and not is_failed:
+                code_preview.code(partial, language=language)
+
             if poll_count % 3 == 0 or is_success or is_failed:
                 if logs:
                     latest_log = logs[-1]
@@ -212,8 +216,6 @@ if run and selected:
                 st.error(f"작업이 실패했습니다: {error}")
                 break
 
-            time.sleep(2.5)
-
 # ----------------------------------------------------------------------
 # Results
 # ----------------------------------------------------------------------
@@ -267,7 +269,8 @@ if "job_result" in st.session_state and st.session_state.job_result.get("summary
                 handled = True
             elif analysis_mode == "git_diff" and tool_output:
                 st.markdown("##### 📑 Git Diff")
-                st.code(str(tool_output), language="diff")
+                diff_text = tool_output.get("diff", "") if isinstance(tool_output, dict) else str(tool_output)
+                st.code(diff_text, language="diff")
                 handled = True
 
             if not handled:
@@ -1,5 +1,6 @@
 import os
 import json
+import time
 import requests
 import logging
 from typing import Optional, Tuple
@@ -124,6 +125,130 @@ class APIClient:
         except requests.exceptions.RequestException:
             return None
 
+    def poll_job(self, access_token: str, project_id: int, job_id: int, state: dict) -> Optional[dict]:
+        """
+        Job 상태를 증분 조회합니다. state는 호출 사이에 유지하는 dict로, ETag와 지금까지 받은 이벤트를 보관합니다.
+        변경이 없으면(304) 이전 결과를 그대로 반환하고, 반환값은 get_job과 같은 형식(progress_log, tool_invocations 포함)에
+        스트리밍 중인 출력(partial_summary)을 더한 dict입니다.
+        """
+        url = self._url(f"/api/v1/projects/{project_id}/jobs/{job_id}")
+        headers = {"Authorization": f"Bearer {access_token}"}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        try:
+            r = requests.get(url, params={"since": state.get("event_seq", 0)}, headers=headers, timeout=5)
+        except requests.exceptions.RequestException:
+            return None
+        if r.status_code == 304:
+            return state.get("job")
+        if r.status_code != 200:
+            return None
+
+        data = r.json()
+        events = data.pop("events", [])
+        for event in events:
+            self._apply_event(state, event.get("kind"), event)
+
+        job = dict(state.get("job") or {})
+        job.update(data)
+        state["server_log"] = data.get("progress_log") or []
+        # 서버가 직접 쓴 로그(progress_log) 뒤에 에이전트가 보낸 진행 이벤트를 붙입니다.
+        job["progress_log"] = state["server_log"] + state.get("agent_progress", [])
+        job["tool_invocations"] = state.get("tool_invocations", [])
+        job["partial_summary"] = state.get("partial_summary", "")
+        state["job"] = job
+        state["event_seq"] = data.get("event_seq", state.get("event_seq", 0))
+        state["etag"] = r.headers.get("ETag")
+        return job
+
+    @staticmethod
+    def _apply_event(state: dict, kind: str, event: dict):
+        """JobEvent 하나를 state에 반영합니다. output 조각은 offset 위치에 이어 붙여 partial_summary를 만듭니다."""
+        entry = {key: value for key, value in event.items() if key not in ("seq", "kind")}
+        if kind == "output":
+            partial = state.get("partial_summary", "")
+            state["partial_summary"] = partial[:entry.get("offset", len(partial))] + entry.get("text", "")
+        elif kind == "tool":
+            state.setdefault("tool_invocations", []).append(entry)
+        else:
+            state.setdefault("agent_progress", []).append(entry)
+
+    def _stream_job(self, access_token: str, project_id: int, job_id: int, state: dict):
+        """Job SSE 스트림을 state의 위치부터 읽고, 이벤트를 반영할 때마다 state["job"]을 yield합니다."""
+        url = self._url(f"/api/v1/projects/{project_id}/jobs/{job_id}/events/stream")
+        server_log = list(state.get("server_log") or [])
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Accept": "text/event-stream",
+            "Last-Event-ID": f"{state.get('event_seq', 0)}-{len(server_log)}",
+        }
+        # 서버는 15초마다 하트비트를 보내므로 읽기 제한은 그보다 넉넉하게 둡니다.
+        with requests.get(url, headers=headers, stream=True, timeout=(5, 60)) as r:
+            if r.status_code != 200:
+                raise requests.exceptions.HTTPError(f"{r.status_code} {r.text[:200]}")
+            r.encoding = "utf-8"
+            event_id, event, data_lines = None, None, []
+            # 연결이 chunked가 아닐 수 있으므로 도착한 만큼 바로 읽습니다.
+            for line in r.iter_lines(chunk_size=1, decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(":")
+                    value = value[1:] if value.startswith(" ") else value
+                    if field == "id":
+                        event_id = value
+                    elif field == "event":
+                        event = value
+                    elif field == "data":
+                        data_lines.append(value)
+                    continue
+                if not data_lines:
+                    event, data_lines = None, []
+                    continue
+
+                payload = json.loads("\n".join(data_lines))
+                job = dict(state.get("job") or {})
+                if event in ("progress", "tool", "output") and "seq" in payload:
+                    state["event_seq"] = payload["seq"]
+                    self._apply_event(state, event, payload)
+                elif event == "progress":
+                    # 서버 로그는 새로 시작될 수 있으므로 이벤트 ID의 로그 수에 맞춰 덮어씁니다.
+                    count = int((event_id or "0-0").partition("-")[2] or len(server_log) + 1)
+                    server_log = server_log[:count - 1] + [payload]
+                elif event in ("status", "complete"):
+                    job.update(payload)
+                job["progress_log"] = server_log + state.get("agent_progress", [])
+                job["tool_invocations"] = state.get("tool_invocations", [])
+                job["partial_summary"] = state.get("partial_summary", "")
+                state["job"] = job
+                state["server_log"] = server_log
+                yield job
+                event, data_lines = None, []
+
+    def follow_job(self, access_token: str, project_id: int, job_id: int, poll_interval: float = 2.5):
+        """
+        Job이 끝날 때까지 변경될 때마다 poll_job과 같은 형식의 Job dict를 yield합니다. (조회 실패 시 None)
+        SSE 스트림으로 변경을 받고, 스트림을 쓸 수 없거나 끊기면 poll_job 증분 폴링으로 이어갑니다.
+        """
+        terminal = ("completed", "success", "failed", "error")
+        state = {}
+        job = self.poll_job(access_token, project_id, job_id, state)
+        yield job
+        if job and job.get("status") in terminal:
+            return
+        if job:
+            try:
+                for job in self._stream_job(access_token, project_id, job_id, state):
+                    yield job
+                    if job.get("status") in terminal:
+                        return
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"Job 스트림 연결 실패, 폴링으로 전환: {e}")
+        while True:
+            time.sleep(poll_interval)
+            job = self.poll_job(access_token, project_id, job_id, state)
+            yield job
+            if job and job.get("status") in terminal:
+                return
+
     def generate_quiz_from_code(self, code: str, num_questions: int = 5) -> Optional[dict]:
         base = os.getenv("STREAMLIT_LANGCHAIN_BASE_URL") or os.getenv("LANGCHAIN_BASE_URL")
 